@@ -1,11 +1,20 @@
 # app/__init__.py
+import time
+_imports_started = time.perf_counter()
+
 from flask import Flask
 from .signatures import signatures_bp
 from .validation import validation_bp
 from .health import health_bp
+from .jobs import jobs_bp
+from .index import index_bp
 from .config import Config
+from . import metrics, startup, admission, deadline, profiling
+from .signatures.state import check_key_config
 import logging
 
+startup.record("import_segundos", time.perf_counter() - _imports_started)
+
 def _silence_pyhanko():
     logging.basicConfig()
     for mod in ('pyhanko', 'pyhanko.sign', 'pyhanko.sign.validation',
@@ -15,12 +24,21 @@ def _silence_pyhanko():
         lg.propagate = False
 
 def create_app(config_object: str | None = None):
+    t0 = time.perf_counter()
     app = Flask(__name__, instance_relative_config=False)
     app.config.from_object(Config if config_object is None else config_object)
     _silence_pyhanko()
+    check_key_config()
 
     app.register_blueprint(signatures_bp)
     app.register_blueprint(validation_bp)
     app.register_blueprint(health_bp)
+    app.register_blueprint(jobs_bp)
+    app.register_blueprint(index_bp)
+    metrics.init_app(app)
+    deadline.init_app(app)
+    admission.init_app(app)
+    profiling.init_app(app)
 
+    startup.record("create_app_segundos", time.perf_counter() - t0)
     return app
@@ -0,0 +1,88 @@
+# app/__main__.py
+"""
+Processamento em massa sem passar pela API (sem base64, Flask ou timeout do gunicorn):
+
+    python -m app validar /acervo [--modo integridade] [--workers 8] [--saida resultado.ndjson] [--checkpoint feitos.txt]
+    python -m app comparar --original original.pdf /candidatos [...]
+    python -m app preparar /entrada --destino /preparados [--certificados cadeia.pem] [--carimbo-tempo]
+    python -m app finalizar /preparados --destino /assinados [--assinaturas /p7s]
+
+Cada pdf vira uma linha NDJSON (`arquivo`, `referencia`, `status` e o mesmo resultado
+da rota correspondente). Com --checkpoint, os pdfs já processados numa execução
+anterior são pulados e a saída é acrescentada ao arquivo existente.
+"""
+import sys
+import time
+import argparse
+
+from .config import Config
+from .bulk import (pdf_files, run_bulk, Checkpoint, validar_arquivo, comparar_arquivo,
+                   preparar_arquivo, finalizar_arquivo)
+
+
+def _preparar_args(args) -> tuple:
+    from .signatures.sizing import parse_certificates, auto_bytes_reserved
+    field_name = args.field_name or Config.DEFAULT_FIELD_NAME.format(timestamp=int(time.time()))
+    bytes_reserved = args.bytes_reserved
+    if bytes_reserved is None and args.certificados:
+        with open(args.certificados, "rb") as f:
+            bytes_reserved = auto_bytes_reserved(parse_certificates(f.read()), Config.MD_ALGO, args.carimbo_tempo)
+    return args.destino, field_name, bytes_reserved or Config.DEFAULT_BYTES_RESERVED
+
+
+COMMANDS = {
+    "validar": (validar_arquivo, lambda args: (args.modo,)),
+    "comparar": (comparar_arquivo, lambda args: (args.original, args.modo)),
+    "preparar": (preparar_arquivo, _preparar_args),
+    "finalizar": (finalizar_arquivo, lambda args: (args.destino, args.assinaturas)),
+}
+
+
+def main(argv=None) -> int:
+    from .validation.service import MODE_FULL, VALIDATION_MODES
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("caminhos", nargs="+", help="pdfs ou diretórios (percorridos recursivamente)")
+    common.add_argument("--workers", type=int, default=0, help="processos (0 = CPUs disponíveis)")
+    common.add_argument("--saida", help="arquivo NDJSON (padrão: stdout)")
+    common.add_argument("--checkpoint", help="arquivo com os pdfs já processados (retomada)")
+
+    parser = argparse.ArgumentParser(prog="python -m app", description="processamento em massa de pdfs")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("validar", parents=[common], help="como o /validar-pades")
+    p.add_argument("--modo", choices=VALIDATION_MODES, default=MODE_FULL)
+
+    p = sub.add_parser("comparar", parents=[common], help="como o /comparar-assinatura, contra um original")
+    p.add_argument("--original", required=True)
+    p.add_argument("--modo", choices=VALIDATION_MODES, default=MODE_FULL)
+
+    p = sub.add_parser("preparar", parents=[common], help="como o /preparar-pdf; grava <destino>/<pdf> e <pdf>.estado")
+    p.add_argument("--destino", required=True)
+    p.add_argument("--field-name")
+    p.add_argument("--bytes-reserved", type=int)
+    p.add_argument("--certificados", help="cadeia do assinante (PEM) para dimensionar o bytes_reserved")
+    p.add_argument("--carimbo-tempo", action="store_true")
+
+    p = sub.add_parser("finalizar", parents=[common], help="como o /finalizar-assinatura; usa <pdf>.estado e <pdf>.p7s")
+    p.add_argument("--destino", required=True)
+    p.add_argument("--assinaturas", help="diretório com <referencia>.p7s (padrão: ao lado de cada pdf preparado)")
+
+    args = parser.parse_args(argv)
+    fn, make_args = COMMANDS[args.comando]
+    checkpoint = Checkpoint(args.checkpoint)
+    mode = "a" if args.checkpoint else "w"
+    output = open(args.saida, mode, encoding="utf-8") if args.saida else sys.stdout
+    t0 = time.perf_counter()
+    try:
+        counts = run_bulk(fn, pdf_files(args.caminhos), make_args(args), output, args.workers, checkpoint)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - t0
+    print(f"{counts['total']} pdfs em {elapsed:.1f}s ({counts['erro']} com erro)", file=sys.stderr)
+    return 1 if counts["erro"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
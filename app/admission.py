@@ -0,0 +1,167 @@
+# app/admission.py
+import os
+import time
+import threading
+from flask import request, g, jsonify, current_app
+
+from .config import Config
+from .metrics import ADMISSION_INFLIGHT_BYTES, ADMISSION_REJECTED, ADMISSION_WAIT_SECONDS
+
+ADMITTED_BLUEPRINTS = ("signatures", "validation", "index")
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def container_memory_limit() -> int | None:
+    """Limite de memória do container (cgroup v2/v1), ou None sem limite."""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                raw = f.read().strip()
+        except OSError:
+            continue
+        if raw == "max":
+            return None
+        try:
+            limit = int(raw)
+        except ValueError:
+            continue
+        # cgroup v1 sem limite reporta um valor perto de 2**63
+        return limit if limit < 1 << 60 else None
+    return None
+
+
+def default_budget() -> int:
+    """Orçamento por worker: ADMISSION_MEMORY_FRACTION do limite do container dividido pelos workers."""
+    limit = container_memory_limit()
+    if limit is None:
+        return 1024 * 1024 * 1024
+    workers = max(1, int(os.getenv("GUNICORN_WORKERS", 1)))
+    return int(limit * Config.ADMISSION_MEMORY_FRACTION / workers)
+
+
+def estimate_cost(endpoint: str | None, content_length: int | None) -> int:
+    """
+    Memória estimada para atender a requisição: o corpo vezes o fator do endpoint
+    (cópias do base64 decodificado, do pdf de saída e da resposta), mais um fixo.
+    """
+    size = content_length if content_length is not None else Config.ADMISSION_UNKNOWN_LENGTH
+    factor = Config.ADMISSION_COST_FACTORS.get(endpoint, Config.ADMISSION_DEFAULT_COST_FACTOR)
+    return int(size * factor) + Config.ADMISSION_BASE_COST
+
+
+class AdmissionController:
+    """
+    Contabiliza os bytes estimados das requisições em andamento neste worker.
+    Acima do orçamento, a requisição espera na fila até `queue_timeout`; se não
+    couber até lá (ou a fila estiver cheia), é recusada com 503. Uma requisição
+    maior que o orçamento inteiro só entra com o worker vazio.
+    """
+
+    def __init__(self, budget: int, queue_timeout: float, max_queue: int):
+        self.budget = budget
+        self.queue_timeout = queue_timeout
+        self.max_queue = max_queue
+        self.in_flight_bytes = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+
+    def _fits(self, cost: int) -> bool:
+        return self.in_flight == 0 or self.in_flight_bytes + cost <= self.budget
+
+    def acquire(self, cost: int) -> bool:
+        with self._cond:
+            if not self._fits(cost):
+                if self.waiting >= self.max_queue:
+                    self.rejected += 1
+                    return False
+                self.waiting += 1
+                try:
+                    deadline = time.monotonic() + self.queue_timeout
+                    while not self._fits(cost):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.rejected += 1
+                            return False
+                        self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.in_flight_bytes += cost
+            self.in_flight += 1
+            return True
+
+    def release(self, cost: int):
+        with self._cond:
+            self.in_flight_bytes -= cost
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def is_ready(self) -> bool:
+        return self.waiting == 0 and self.in_flight_bytes < self.budget * Config.ADMISSION_READY_THRESHOLD
+
+    def stats(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "orcamento_bytes": self.budget,
+            "em_andamento": self.in_flight,
+            "em_andamento_bytes": self.in_flight_bytes,
+            "na_fila": self.waiting,
+            "recusadas": self.rejected,
+        }
+
+
+def get_admission_controller() -> AdmissionController:
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdmissionController(
+                    Config.ADMISSION_MEMORY_BUDGET or default_budget(),
+                    Config.ADMISSION_QUEUE_TIMEOUT,
+                    Config.ADMISSION_MAX_QUEUE,
+                )
+    return _controller
+
+
+def _before_request():
+    max_length = current_app.config.get("MAX_CONTENT_LENGTH")
+    if max_length and request.content_length and request.content_length > max_length:
+        # checado aqui porque as rotas tratam qualquer exceção (inclusive o 413 do werkzeug) como 500
+        resp = jsonify({"status": "erro", "message": f"corpo da requisição maior que o limite de {max_length} bytes"})
+        resp.status_code = 413
+        return resp
+    if not Config.ADMISSION_ENABLED or request.blueprint not in ADMITTED_BLUEPRINTS or request.method != "POST":
+        return None
+    endpoint = request.url_rule.rule if request.url_rule is not None else None
+    cost = estimate_cost(endpoint, request.content_length)
+    controller = get_admission_controller()
+    t0 = time.perf_counter()
+    admitted = controller.acquire(cost)
+    ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - t0)
+    if not admitted:
+        ADMISSION_REJECTED.labels(endpoint or "desconhecido").inc()
+        resp = jsonify({
+            "status": "erro",
+            "message": "servidor sem memória disponível para esta requisição no momento; tente novamente",
+        })
+        resp.status_code = 503
+        resp.headers["Retry-After"] = str(Config.ADMISSION_RETRY_AFTER)
+        return resp
+    g.admission_cost = cost
+    ADMISSION_INFLIGHT_BYTES.inc(cost)
+    return None
+
+
+def _teardown_request(exc):
+    cost = g.pop("admission_cost", None)
+    if cost is not None:
+        get_admission_controller().release(cost)
+        ADMISSION_INFLIGHT_BYTES.dec(cost)
+
+
+def init_app(app):
+    app.before_request(_before_request)
+    app.teardown_request(_teardown_request)
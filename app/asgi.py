@@ -0,0 +1,159 @@
+# app/asgi.py
+import sys
+import json
+import asyncio
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import Config
+from .startup import run_warmup
+from .jobs.service import start_dispatcher
+
+
+class AsgiAdapter:
+    """
+    Expõe o app WSGI (Flask) para um servidor ASGI.
+
+    O corpo da requisição é recebido no event loop e vai para um spool
+    (memória até UPLOAD_SPOOL_MAX_MEMORY, depois arquivo temporário); só quando o
+    upload termina a requisição ocupa uma das `max_threads` threads que rodam o
+    Flask. Assim uploads lentos não prendem uma thread do SO cada um. Corpos acima
+    de MAX_CONTENT_LENGTH recebem 413 já no Content-Length ou assim que passam do
+    limite, sem ir inteiros para o disco.
+    """
+
+    def __init__(self, wsgi_app, max_threads: int):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="wsgi")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            raise ValueError(f"escopo ASGI não suportado: {scope['type']}")
+
+        max_length = Config.MAX_CONTENT_LENGTH
+        if max_length and (self._content_length(scope) or 0) > max_length:
+            await self._too_large(send, max_length)
+            return
+        body = tempfile.SpooledTemporaryFile(max_size=Config.UPLOAD_SPOOL_MAX_MEMORY)
+        try:
+            size = 0
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                # Content-Length ausente (chunked) ou menor que o corpo enviado
+                if max_length and size > max_length:
+                    await self._too_large(send, max_length)
+                    return
+                body.write(chunk)
+                if not message.get("more_body"):
+                    break
+            body.seek(0)
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self.executor, self._run_wsgi, scope, body, send, loop)
+        finally:
+            body.close()
+
+    @staticmethod
+    def _content_length(scope) -> int | None:
+        for name, value in scope.get("headers", []):
+            if name.lower() == b"content-length":
+                try:
+                    return int(value)
+                except ValueError:
+                    return None
+        return None
+
+    @staticmethod
+    async def _too_large(send, max_length: int):
+        payload = json.dumps({
+            "status": "erro", "message": f"corpo da requisição maior que o limite de {max_length} bytes",
+        }).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode()),
+                        (b"connection", b"close")],
+        })
+        await send({"type": "http.response.body", "body": payload, "more_body": False})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                # aquece o pyhanko antes de o servidor aceitar conexões
+                await asyncio.get_running_loop().run_in_executor(self.executor, run_warmup)
+                start_dispatcher()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    def _environ(scope, body) -> dict:
+        body.seek(0, 2)
+        size = body.tell()
+        body.seek(0)
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("", 0)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode("utf8").decode("latin1"),
+            "PATH_INFO": scope["path"].encode("utf8").decode("latin1"),
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin1"),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "REMOTE_ADDR": client[0],
+            "CONTENT_LENGTH": str(size),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": body,
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+            "wsgi.input_terminated": True,
+        }
+        for name, value in scope.get("headers", []):
+            name = name.decode("latin1").upper().replace("-", "_")
+            # o corpo já chegou inteiro e decodificado; o tamanho real vai em CONTENT_LENGTH
+            if name in ("CONTENT_LENGTH", "TRANSFER_ENCODING"):
+                continue
+            key = name if name == "CONTENT_TYPE" else f"HTTP_{name}"
+            value = value.decode("latin1")
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    def _run_wsgi(self, scope, body, send, loop):
+        def sync_send(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        response_start = {}
+
+        def start_response(status, headers, exc_info=None):
+            response_start["status"] = int(status.split(" ", 1)[0])
+            response_start["headers"] = [(k.lower().encode("latin1"), v.encode("latin1")) for k, v in headers]
+
+        started = False
+        iterable = self.wsgi_app(self._environ(scope, body), start_response)
+        try:
+            for chunk in iterable:
+                if not chunk:
+                    continue
+                if not started:
+                    sync_send({"type": "http.response.start", **response_start})
+                    started = True
+                sync_send({"type": "http.response.body", "body": bytes(chunk), "more_body": True})
+        finally:
+            if hasattr(iterable, "close"):
+                iterable.close()
+        if not started:
+            sync_send({"type": "http.response.start", **response_start})
+        sync_send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -0,0 +1,214 @@
+# app/bulk.py
+import os
+import json
+import time
+import shutil
+import base64
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+from .config import Config
+from .pool import container_cpu_count, _init_pool_process
+from .metrics import endpoint_label
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def pdf_files(paths):
+    """
+    (referencia, caminho) de cada .pdf: diretórios são percorridos recursivamente
+    (referência = caminho relativo ao diretório); arquivos passados direto usam o nome.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(".pdf"):
+                        full = os.path.join(root, name)
+                        yield os.path.relpath(full, path), full
+        else:
+            yield os.path.basename(path), path
+
+
+def _output_path(destino: str, referencia: str) -> str:
+    path = os.path.join(destino, referencia)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return path
+
+
+# Tarefas executadas nos processos do pool. Os pdfs são abertos direto do disco:
+# a leitura e o hash do ByteRange passam pelo mmap (buffer_of), sem carregar o arquivo.
+
+def validar_arquivo(path: str, referencia: str, modo: str) -> dict:
+    from .validation.service import validar_pdf_logic
+    with open(path, "rb") as f:
+        return validar_pdf_logic(f, modo)
+
+
+def comparar_arquivo(path: str, referencia: str, original: str, modo: str) -> dict:
+    from .validation.service import comparar_assinatura_logic
+    with open(original, "rb") as orig, open(path, "rb") as f:
+        return comparar_assinatura_logic(orig, f, modo)
+
+
+def preparar_arquivo(path: str, referencia: str, destino: str, field_name: str, bytes_reserved: int) -> dict:
+    """Grava `<destino>/<referencia>` (pdf preparado) e `<...>.estado` (o prepared_digest do /finalizar-assinatura)."""
+    from .signatures.service import preparar_pdf_logic
+    with open(path, "rb") as f:
+        output, digest_bytes, state, field_name, bytes_reserved = preparar_pdf_logic(
+            f, field_name, bytes_reserved, Config.MD_ALGO, Config.SUBFILTER
+        )
+    prepared_path = _output_path(destino, referencia)
+    with open(prepared_path, "wb") as out:
+        out.write(output.getbuffer())
+    with open(prepared_path + ".estado", "wb") as out:
+        out.write(state)
+    return {
+        "preparado": prepared_path,
+        "digest_b64": base64.b64encode(digest_bytes).decode(),
+        "prepared_digest_b64": base64.b64encode(state).decode(),
+        "field_name": field_name,
+        "bytes_reserved": bytes_reserved,
+        "md_algorithm": Config.MD_ALGO,
+    }
+
+
+def finalizar_arquivo(path: str, referencia: str, destino: str, assinaturas: str | None) -> dict:
+    """
+    Insere `<pdf>.p7s` (ou `<assinaturas>/<referencia>.p7s`) no pdf preparado,
+    usando o `<pdf>.estado` gravado pelo preparar. O pdf é copiado para o destino
+    e assinado no próprio arquivo.
+    """
+    from .signatures.service import finalizar_assinatura_logic
+    p7s_path = os.path.join(assinaturas, referencia) + ".p7s" if assinaturas else path + ".p7s"
+    with open(path + ".estado", "rb") as f:
+        state = f.read()
+    with open(p7s_path, "rb") as f:
+        p7s = f.read()
+    signed_path = _output_path(destino, referencia)
+    tmp_path = signed_path + ".tmp"
+    with open(path, "rb") as src, open(tmp_path, "wb") as dst:
+        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+    try:
+        with open(tmp_path, "r+b") as f:
+            finalizar_assinatura_logic(f, state, p7s)
+        os.replace(tmp_path, signed_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return {"assinado": signed_path}
+
+
+def run_task(fn, path: str, referencia: str, *args) -> dict:
+    t0 = time.perf_counter()
+    try:
+        with endpoint_label(f"cli:{fn.__name__}"):
+            result = fn(path, referencia, *args)
+        result = {"status": "sucesso", **result}
+    except Exception as e:
+        result = {"status": "erro", "message": f"{type(e).__name__}: {e}"}
+    return {"arquivo": path, "referencia": referencia, **result, "segundos": round(time.perf_counter() - t0, 4)}
+
+
+def _json_default(o):
+    if isinstance(o, datetime):
+        return o.isoformat()
+    return str(o)
+
+
+class Checkpoint:
+    """
+    Arquivo texto com o caminho de cada pdf já processado (um por linha, gravado
+    assim que o resultado sai). Numa nova execução com o mesmo arquivo, esses pdfs
+    são pulados. Falhas do pool (processo morto) não entram, então são refeitas.
+    """
+
+    def __init__(self, path: str | None):
+        self.path = path
+        self.done = set()
+        self._file = None
+        if path:
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    self.done = {line.rstrip("\n") for line in f if line.strip()}
+            self._file = open(path, "a", encoding="utf-8")
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.done
+
+    def add(self, path: str):
+        if self._file is not None:
+            self._file.write(path + "\n")
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def run_bulk(fn, files, args: tuple, output, workers: int = 0, checkpoint: Checkpoint | None = None) -> dict:
+    """
+    Executa fn(path, referencia, *args) para cada (referencia, path) de `files`
+    num pool de processos e escreve uma linha NDJSON por pdf em `output`, na ordem
+    em que terminam. No máximo 2 × workers pdfs ficam em andamento, então a lista
+    de arquivos é consumida aos poucos (serve para diretórios com centenas de
+    milhares de pdfs).
+    """
+    workers = workers or container_cpu_count()
+    checkpoint = checkpoint or Checkpoint(None)
+    pending = ((ref, path) for ref, path in files if path not in checkpoint)
+    counts = {"total": 0, "sucesso": 0, "erro": 0}
+
+    def new_pool():
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(Config.BATCH_POOL_START_METHOD),
+            initializer=_init_pool_process,
+        )
+
+    pool = new_pool()
+    in_flight = {}
+    try:
+        exhausted = False
+        while in_flight or not exhausted:
+            while not exhausted and len(in_flight) < 2 * workers:
+                item = next(pending, None)
+                if item is None:
+                    exhausted = True
+                    break
+                ref, path = item
+                in_flight[pool.submit(run_task, fn, path, ref, *args)] = (ref, path)
+            if not in_flight:
+                break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            broken = False
+            for fut in done:
+                ref, path = in_flight.pop(fut)
+                try:
+                    result = fut.result()
+                    checkpoint.add(path)
+                except BrokenProcessPool:
+                    broken = True
+                    result = {"arquivo": path, "referencia": ref, "status": "erro",
+                              "message": "processo do pool encerrado inesperadamente"}
+                output.write(json.dumps(result, ensure_ascii=False, default=_json_default) + "\n")
+                counts["total"] += 1
+                counts[result["status"]] += 1
+            output.flush()
+            if broken:
+                # os demais pdfs em andamento no pool quebrado também falham; o pool é recriado
+                for fut, (ref, path) in in_flight.items():
+                    output.write(json.dumps({"arquivo": path, "referencia": ref, "status": "erro",
+                                             "message": "processo do pool encerrado inesperadamente"}) + "\n")
+                    counts["total"] += 1
+                    counts["erro"] += 1
+                in_flight.clear()
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = new_pool()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        checkpoint.close()
+    return counts
@@ -1,12 +1,138 @@
 # app/config.py
-import time
+import os
+import tempfile
 from pyhanko.sign import fields
-from pyhanko_certvalidator import ValidationContext
 
 class Config:
-    DEFAULT_FIELD_NAME = f"Signature - {int(time.time())}"
+    # formatado a cada requisição ({timestamp} = epoch em segundos); não é congelado no import
+    DEFAULT_FIELD_NAME = "Signature - {timestamp}"
     DEFAULT_BYTES_RESERVED = 15302
     MD_ALGO = "sha256"
     SUBFILTER = fields.SigSeedSubFilter.PADES
-    VC = ValidationContext(trust_roots=[], allow_fetching=False)
-    ERROR_BYTES_INSUFFICIENT = "Final ByteRange payload larger than expected"
\ No newline at end of file
+    ERROR_BYTES_INSUFFICIENT = "Final ByteRange payload larger than expected"
+
+    # bytes_reserved automático (/preparar-pdf com a cadeia do assinante em vez de bytes_reserved):
+    # tamanho estimado do CMS + margem relativa, com um mínimo em bytes; com carimbo de tempo embutido
+    # soma-se a estimativa dos certificados e da assinatura da TSA
+    BYTES_RESERVED_MARGIN = float(os.getenv("BYTES_RESERVED_MARGIN", 0.1))
+    BYTES_RESERVED_MIN_MARGIN = int(os.getenv("BYTES_RESERVED_MIN_MARGIN", 512))
+    BYTES_RESERVED_TIMESTAMP_ESTIMATE = int(os.getenv("BYTES_RESERVED_TIMESTAMP_ESTIMATE", 6144))
+
+    # sessões de assinatura guardadas no servidor (modo opcional "sessao" do /preparar-pdf)
+    # "disk" é compartilhado entre os workers do gunicorn; "memory" só vale dentro de um worker
+    SESSION_STORE_BACKEND = os.getenv("SESSION_STORE_BACKEND", "disk")
+    SESSION_STORE_DIR = os.getenv("SESSION_STORE_DIR", os.path.join(tempfile.gettempdir(), "pades-sessoes"))
+    SESSION_STORE_TTL = int(os.getenv("SESSION_STORE_TTL", 900))
+    SESSION_STORE_MAX_BYTES = int(os.getenv("SESSION_STORE_MAX_BYTES", 512 * 1024 * 1024))
+
+    # uploads binários (application/pdf) acima deste tamanho vão para arquivo temporário
+    UPLOAD_SPOOL_MAX_MEMORY = int(os.getenv("UPLOAD_SPOOL_MAX_MEMORY", 1024 * 1024))
+
+    # endpoints de lote: pool de processos por worker (0 = CPUs do container divididas pelos workers)
+    BATCH_POOL_WORKERS = int(os.getenv("BATCH_POOL_WORKERS", 0))
+    BATCH_POOL_START_METHOD = os.getenv("BATCH_POOL_START_METHOD", "forkserver")
+    BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 500))
+
+    # cache de resultados de validação (SQLite compartilhado entre workers)
+    VALIDATION_CACHE_ENABLED = os.getenv("VALIDATION_CACHE_ENABLED", "1").lower() in ("1", "true", "yes")
+    VALIDATION_CACHE_PATH = os.getenv("VALIDATION_CACHE_PATH", os.path.join(tempfile.gettempdir(), "pades-cache", "validacao.sqlite3"))
+    VALIDATION_CACHE_TTL = int(os.getenv("VALIDATION_CACHE_TTL", 3600))
+    VALIDATION_CACHE_MAX_ENTRIES = int(os.getenv("VALIDATION_CACHE_MAX_ENTRIES", 100_000))
+
+    # entrada ASGI (asgi.py): threads que executam o Flask depois que o upload termina
+    ASGI_THREADS = int(os.getenv("ASGI_THREADS", 4))
+
+    # estado do preparo devolvido ao cliente (prepared_digest_b64): assinado com HMAC-SHA256
+    # sem PREPARED_STATE_KEY, uma chave aleatória é gerada no arquivo abaixo e compartilhada pelos workers da máquina
+    # (com aviso no log); PREPARED_STATE_KEY_REQUIRED=1 impede o serviço de subir sem a chave (várias instâncias/réplicas)
+    PREPARED_STATE_KEY = os.getenv("PREPARED_STATE_KEY", "")
+    PREPARED_STATE_KEY_REQUIRED = os.getenv("PREPARED_STATE_KEY_REQUIRED", "0").lower() in ("1", "true", "yes")
+    PREPARED_STATE_KEY_FILE = os.getenv("PREPARED_STATE_KEY_FILE", os.path.join(tempfile.gettempdir(), "pades-estado", "hmac.key"))
+    PREPARED_STATE_MAX_AGE = int(os.getenv("PREPARED_STATE_MAX_AGE", 24 * 3600))
+
+    # métricas Prometheus (/metrics): diretório dos arquivos do modo multiprocesso do prometheus_client
+    METRICS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "pades-metricas"))
+
+    # aquecimento: um pdf mínimo passa por preparar/finalizar/validar antes do worker aceitar requisições
+    WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1").lower() in ("1", "true", "yes")
+
+    # trust store: TRUST_STORE_DIR/raizes, /intermediarias e /crls (PEM ou DER); vazio = nenhuma raiz confiável
+    # o diretório é verificado a cada TRUST_STORE_RELOAD_INTERVAL segundos e recarregado quando muda;
+    # caminhos/revogação validados ficam em cache por certificado dentro de cada intervalo de TRUST_TIME_BUCKET segundos
+    TRUST_STORE_DIR = os.getenv("TRUST_STORE_DIR", "")
+    TRUST_STORE_RELOAD_INTERVAL = float(os.getenv("TRUST_STORE_RELOAD_INTERVAL", 5))
+    TRUST_TIME_BUCKET = int(os.getenv("TRUST_TIME_BUCKET", 300))
+    TRUST_PATH_CACHE_MAX_ENTRIES = int(os.getenv("TRUST_PATH_CACHE_MAX_ENTRIES", 10_000))
+    TRUST_REVOCATION_MODE = os.getenv("TRUST_REVOCATION_MODE", "soft-fail")
+    TRUST_ALLOW_FETCHING = os.getenv("TRUST_ALLOW_FETCHING", "0").lower() in ("1", "true", "yes")
+
+    # jobs assíncronos (/jobs/<id>): fila SQLite + arquivos em JOBS_DIR, executados num pool de processos próprio
+    # em cada worker (JOBS_POOL_WORKERS por worker); resultados removidos JOBS_RESULT_TTL segundos depois de prontos
+    JOBS_ENABLED = os.getenv("JOBS_ENABLED", "1").lower() in ("1", "true", "yes")
+    JOBS_DIR = os.getenv("JOBS_DIR", os.path.join(tempfile.gettempdir(), "pades-jobs"))
+    JOBS_POOL_WORKERS = int(os.getenv("JOBS_POOL_WORKERS", 1))
+    JOBS_MAX_QUEUE = int(os.getenv("JOBS_MAX_QUEUE", 100))
+    JOBS_RESULT_TTL = int(os.getenv("JOBS_RESULT_TTL", 3600))
+    JOBS_TIMEOUT = int(os.getenv("JOBS_TIMEOUT", 900))
+    JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", 2))
+    JOBS_POLL_INTERVAL = float(os.getenv("JOBS_POLL_INTERVAL", 1))
+    JOBS_RETRY_AFTER = int(os.getenv("JOBS_RETRY_AFTER", 2))
+
+    # índice de digests (/indice, python -m app.index): SQLite com o SHA-256 canônico e o digest do CMS de cada
+    # assinatura dos documentos registrados; em produção aponte para um volume persistente
+    DIGEST_INDEX_PATH = os.getenv("DIGEST_INDEX_PATH", os.path.join(tempfile.gettempdir(), "pades-indice", "indice.sqlite3"))
+    DIGEST_INDEX_MAX_MATCHES = int(os.getenv("DIGEST_INDEX_MAX_MATCHES", 100))
+
+    # original do /comparar-assinatura: o resumo da assinatura de referência é reaproveitado por processo
+    # (LRU, chave = sha256 do arquivo + modo + trust store); originais registrados ficam em ORIGINALS_DIR
+    ORIGINALS_CACHE_MAX_ENTRIES = int(os.getenv("ORIGINALS_CACHE_MAX_ENTRIES", 256))
+    ORIGINALS_CACHE_TTL = int(os.getenv("ORIGINALS_CACHE_TTL", VALIDATION_CACHE_TTL))
+    ORIGINALS_DIR = os.getenv("ORIGINALS_DIR", os.path.join(tempfile.gettempdir(), "pades-originais"))
+    ORIGINALS_TTL = int(os.getenv("ORIGINALS_TTL", 24 * 3600))
+    ORIGINALS_MAX_BYTES = int(os.getenv("ORIGINALS_MAX_BYTES", 1024 * 1024 * 1024))
+
+    # prazo por requisição: checado entre etapas (antes do hash, antes de cada assinatura, a cada item de lote);
+    # quando acaba, o que falta sai como não avaliado e a resposta traz prazo_esgotado. Padrão abaixo do
+    # GUNICORN_TIMEOUT (0 = sem prazo). O cliente pode pedir um prazo menor (header X-Prazo ou ?prazo=), nunca maior.
+    # DEADLINE_STATUS_CODE: 200 (padrão) ou, p.ex., 503 para o cliente não tratar o parcial como resposta completa
+    REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", 0.8 * int(os.getenv("GUNICORN_TIMEOUT", 30))))
+    DEADLINE_STATUS_CODE = int(os.getenv("DEADLINE_STATUS_CODE", 200))
+
+    # perfil sob demanda: só roda quando o header X-Perfilar traz um dos tokens de PROFILING_ALLOWLIST
+    # (vazio = desligado); amostras de pilha (formato collapsed do flamegraph) e tracemalloc em PROFILING_DIR
+    PROFILING_ALLOWLIST = frozenset(t.strip() for t in os.getenv("PROFILING_ALLOWLIST", "").split(",") if t.strip())
+    PROFILING_DIR = os.getenv("PROFILING_DIR", os.path.join(tempfile.gettempdir(), "pades-perfis"))
+    PROFILING_INTERVAL = float(os.getenv("PROFILING_INTERVAL", 0.005))
+    PROFILING_TOP_FUNCTIONS = int(os.getenv("PROFILING_TOP_FUNCTIONS", 20))
+    PROFILING_TOP_ALLOCATIONS = int(os.getenv("PROFILING_TOP_ALLOCATIONS", 20))
+    PROFILING_MAX_PROFILES = int(os.getenv("PROFILING_MAX_PROFILES", 200))
+
+    # limite absoluto do corpo (Flask responde 413 acima disso)
+    MAX_CONTENT_LENGTH = int(os.getenv("MAX_CONTENT_LENGTH", 100 * 1024 * 1024))
+
+    # controle de admissão por memória estimada, por worker (0 = fração do limite do container / GUNICORN_WORKERS)
+    ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1").lower() in ("1", "true", "yes")
+    ADMISSION_MEMORY_BUDGET = int(os.getenv("ADMISSION_MEMORY_BUDGET", 0))
+    ADMISSION_MEMORY_FRACTION = float(os.getenv("ADMISSION_MEMORY_FRACTION", 0.6))
+    ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 5))
+    ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", 16))
+    ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", 5))
+    ADMISSION_READY_THRESHOLD = float(os.getenv("ADMISSION_READY_THRESHOLD", 0.9))
+    # custo estimado = Content-Length × fator do endpoint + ADMISSION_BASE_COST
+    # (json/base64: texto recebido, pdf decodificado, pdf de saída e resposta codificada coexistem)
+    ADMISSION_COST_FACTORS = {
+        "/preparar-pdf": 4.0,
+        "/preparar-pdf/lote": 4.0,
+        "/finalizar-assinatura": 4.0,
+        "/validar-pades": 3.0,
+        "/validar-pades/lote": 3.0,
+        "/comparar-assinatura": 3.0,
+        "/comparar-assinatura/originais": 3.0,
+        "/listar-assinaturas": 2.0,
+        "/indice/documentos": 2.0,
+        "/indice/documentos/lote": 3.0,
+        "/indice/buscar": 2.0,
+    }
+    ADMISSION_DEFAULT_COST_FACTOR = 3.0
+    ADMISSION_BASE_COST = 4 * 1024 * 1024
+    ADMISSION_UNKNOWN_LENGTH = 8 * 1024 * 1024
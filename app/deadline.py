@@ -0,0 +1,87 @@
+# app/deadline.py
+import time
+from contextvars import ContextVar
+from flask import request, g
+
+from .config import Config
+from .metrics import observe_deadline_exceeded
+
+DEADLINE_BLUEPRINTS = ("signatures", "validation", "index")
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+        self.counted = False
+
+
+# prazo da requisição em andamento; fora de uma requisição (pool, jobs, CLI) não há prazo
+_deadline: ContextVar[Deadline | None] = ContextVar("pades_deadline", default=None)
+
+
+def remaining() -> float | None:
+    current = _deadline.get()
+    if current is None:
+        return None
+    return max(0.0, current.expires_at - time.monotonic())
+
+
+def exceeded(etapa: str) -> bool:
+    """
+    True se o prazo acabou; a primeira vez em cada requisição conta no pades_deadline_exceeded.
+    O prazo é checado entre etapas (antes do hash, antes de cada assinatura, a cada item de
+    lote): uma validação do pyhanko já iniciada não é interrompida e termina antes da checagem.
+    """
+    current = _deadline.get()
+    if current is None or time.monotonic() < current.expires_at:
+        return False
+    if not current.counted:
+        current.counted = True
+        observe_deadline_exceeded(etapa)
+    return True
+
+
+def batch_info(results: list[dict], etapa: str = "lote") -> dict:
+    # campos de prazo da resposta de um lote (itens "nao_avaliado" de map_isolated)
+    nao_avaliados = sum(1 for r in results if r.get("status") == "nao_avaliado")
+    if not nao_avaliados:
+        return {}
+    exceeded(etapa)
+    return {"prazo_esgotado": True, "nao_avaliados": nao_avaliados}
+
+
+def status_code(result: dict) -> int:
+    # resultado parcial (prazo esgotado) sai com status próprio
+    return Config.DEADLINE_STATUS_CODE if result.get("prazo_esgotado") else 200
+
+
+def _requested_seconds() -> float | None:
+    raw = request.headers.get("X-Prazo") or request.args.get("prazo")
+    try:
+        seconds = float(raw) if raw else None
+    except ValueError:
+        seconds = None
+    return seconds if seconds is not None and seconds > 0 else None
+
+
+def _before_request():
+    if request.blueprint not in DEADLINE_BLUEPRINTS:
+        return
+    seconds = Config.REQUEST_DEADLINE or None
+    requested = _requested_seconds()
+    if requested is not None:
+        seconds = min(requested, seconds) if seconds else requested
+    if seconds:
+        g.deadline_token = _deadline.set(Deadline(seconds))
+
+
+def _teardown_request(exc):
+    token = g.pop("deadline_token", None)
+    if token is not None:
+        _deadline.reset(token)
+
+
+def init_app(app):
+    # registrado antes do controle de admissão: a espera na fila também consome o prazo
+    app.before_request(_before_request)
+    app.teardown_request(_teardown_request)
@@ -0,0 +1,5 @@
+from flask import Blueprint
+
+index_bp = Blueprint("index", __name__)
+
+from . import routes
@@ -0,0 +1,114 @@
+# app/index/__main__.py
+"""
+Manutenção do índice de digests fora da API (mesmo DIGEST_INDEX_PATH):
+
+    python -m app.index ingerir /arquivo/pdfs [--workers 8] [--lote 500] [--pular-existentes]
+    python -m app.index buscar documento.pdf
+    python -m app.index exportar [--saida indice.ndjson]
+    python -m app.index remover <referencia>
+    python -m app.index estatisticas
+
+Na ingestão, a referência de cada documento é o caminho relativo ao diretório
+informado (ou o nome, para arquivos passados direto).
+"""
+import sys
+import json
+import argparse
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from ..config import Config
+from ..pool import container_cpu_count, _init_pool_process
+from ..bulk import pdf_files
+from .store import get_digest_index
+from .service import indexar_arquivo, indexar_lote, buscar_pdf_logic
+
+
+def _ingerir(args) -> int:
+    index = get_digest_index()
+    files = ((ref, path) for ref, path in pdf_files(args.caminhos)
+             if not (args.pular_existentes and index.contains(ref)))
+    total = erros = 0
+    with ProcessPoolExecutor(
+        max_workers=args.workers or container_cpu_count(),
+        mp_context=multiprocessing.get_context(Config.BATCH_POOL_START_METHOD),
+        initializer=_init_pool_process,
+    ) as pool:
+        while True:
+            chunk = list(itertools.islice(files, args.lote))
+            if not chunk:
+                break
+            itens = list(pool.map(indexar_arquivo, *zip(*chunk)))
+            # um lote = uma transação: interromper a ingestão perde no máximo o lote corrente
+            for r in indexar_lote(itens, [None] * len(itens)):
+                if r["status"] != "sucesso":
+                    erros += 1
+                    print(f"erro: {r.get('referencia')}: {r['message']}", file=sys.stderr)
+            total += len(itens)
+            print(f"{total} documentos processados ({erros} com erro)", file=sys.stderr)
+    return 1 if erros else 0
+
+
+def _buscar(args) -> int:
+    with open(args.arquivo, "rb") as f:
+        result = buscar_pdf_logic(f)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0 if result["encontrado"] else 1
+
+
+def _exportar(args) -> int:
+    out = open(args.saida, "w", encoding="utf-8") if args.saida else sys.stdout
+    try:
+        for doc in get_digest_index().export():
+            out.write(json.dumps(doc, ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+def _remover(args) -> int:
+    if not get_digest_index().remove(args.referencia):
+        print("documento não registrado no índice", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _estatisticas(args) -> int:
+    print(json.dumps({"caminho": Config.DIGEST_INDEX_PATH, **get_digest_index().stats()}))
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.index", description="índice de digests das assinaturas")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("ingerir", help="registra pdfs (arquivos ou diretórios)")
+    p.add_argument("caminhos", nargs="+")
+    p.add_argument("--workers", type=int, default=0, help="processos (0 = CPUs disponíveis)")
+    p.add_argument("--lote", type=int, default=500, help="documentos por transação")
+    p.add_argument("--pular-existentes", action="store_true", help="não reprocessa referências já registradas")
+    p.set_defaults(func=_ingerir)
+
+    p = sub.add_parser("buscar", help="procura as assinaturas de um pdf no índice")
+    p.add_argument("arquivo")
+    p.set_defaults(func=_buscar)
+
+    p = sub.add_parser("exportar", help="exporta o índice em NDJSON")
+    p.add_argument("--saida", help="arquivo de saída (padrão: stdout)")
+    p.set_defaults(func=_exportar)
+
+    p = sub.add_parser("remover", help="remove um documento do índice")
+    p.add_argument("referencia")
+    p.set_defaults(func=_remover)
+
+    p = sub.add_parser("estatisticas", help="contagem de documentos e assinaturas")
+    p.set_defaults(func=_estatisticas)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
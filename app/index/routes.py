@@ -0,0 +1,132 @@
+# app/index/routes.py
+import json
+import base64
+import logging
+import traceback
+from flask import request, jsonify, current_app, Response, stream_with_context
+
+from . import index_bp
+from .store import get_digest_index
+from .service import indexar_pdf_logic, indexar_item, indexar_lote, buscar_pdf_logic, buscar_digest_logic
+from ..config import Config
+from ..pool import map_isolated
+from ..metrics import stage
+from .. import deadline
+from ..uploads import request_params, load_pdf_input
+
+
+def _metadados(params) -> dict | None:
+    # JSON: objeto; multipart/query string: texto JSON
+    value = params.get("metadados") if params else None
+    if isinstance(value, str):
+        value = json.loads(value)
+    if value is not None and not isinstance(value, dict):
+        raise ValueError('"metadados" deve ser um objeto JSON')
+    return value
+
+
+@index_bp.route("/indice/documentos", methods=["POST"])
+def indexar_documento():
+    pdf = None
+    try:
+        with stage("entrada"):
+            params = request_params(silent=True)
+            pdf = load_pdf_input(params, "pdf_base64", "pdf")
+        referencia = params.get("referencia") if params else None
+        if pdf is None or not referencia:
+            return jsonify({"status": "erro", "message": 'As chaves "referencia" e "pdf_base64" (ou o pdf binário) são obrigatórias.'}), 400
+        try:
+            metadados = _metadados(params)
+        except ValueError as e:
+            return jsonify({"status": "erro", "message": str(e)}), 400
+
+        result = indexar_pdf_logic(pdf.stream, str(referencia), metadados)
+        return jsonify({"status": "sucesso", **result}), 200
+
+    except Exception as e:
+        tb = traceback.format_exc()
+        logging.error(tb)
+        return jsonify({"status": "erro", "message": f"Ocorreu um erro ao indexar o PDF: {e}", "traceback": tb}), 500
+
+    finally:
+        if pdf is not None:
+            pdf.close()
+
+
+@index_bp.route("/indice/documentos/lote", methods=["POST"])
+def indexar_documentos_lote():
+    json_data = request.get_json(silent=True)
+    documentos = json_data.get("documentos") if isinstance(json_data, dict) else None
+    if not isinstance(documentos, list) or not documentos or not all(isinstance(d, dict) for d in documentos):
+        return jsonify({"status": "erro", "message": 'A chave "documentos" (lista de {referencia, pdf_base64, metadados}) é obrigatória.'}), 400
+
+    max_items = current_app.config.get("BATCH_MAX_ITEMS", Config.BATCH_MAX_ITEMS)
+    if len(documentos) > max_items:
+        return jsonify({"status": "erro", "message": f"O lote aceita no máximo {max_items} documentos."}), 413
+
+    try:
+        metadados = [_metadados(doc) for doc in documentos]
+    except ValueError as e:
+        return jsonify({"status": "erro", "message": str(e)}), 400
+
+    try:
+        # digests calculados no pool; o registro é uma única transação neste processo
+        itens = map_isolated(indexar_item, [(doc.get("referencia"), doc.get("pdf_base64")) for doc in documentos],
+                             deadline.remaining())
+        resultados = indexar_lote(itens, metadados)
+        response = {"resultados": [{"indice": i, **r} for i, r in enumerate(resultados)], **deadline.batch_info(resultados)}
+        return jsonify(response), deadline.status_code(response)
+
+    except Exception as e:
+        tb = traceback.format_exc()
+        logging.error(tb)
+        return jsonify({"status": "erro", "message": f"Ocorreu um erro ao processar o lote: {e}", "traceback": tb}), 500
+
+
+@index_bp.route("/indice/buscar", methods=["POST"])
+def buscar():
+    # pdf: cada assinatura é procurada pelo SHA-256 canônico; digest_b64 (+ md_algorithm): busca direta
+    pdf = None
+    try:
+        with stage("entrada"):
+            params = request_params(silent=True)
+            digest_b64 = params.get("digest_b64") if params else None
+            pdf = None if digest_b64 else load_pdf_input(params, "pdf_base64", "pdf")
+        if digest_b64:
+            result = buscar_digest_logic(base64.b64decode(digest_b64), params.get("md_algorithm"))
+        elif pdf is not None:
+            result = buscar_pdf_logic(pdf.stream)
+        else:
+            return jsonify({"status": "erro", "message": 'Envie "pdf_base64" (ou o pdf binário) ou "digest_b64".'}), 400
+        with stage("resposta"):
+            return jsonify(result), 200
+
+    except Exception as e:
+        tb = traceback.format_exc()
+        logging.error(tb)
+        return jsonify({"status": "erro", "message": f"Ocorreu um erro ao consultar o índice: {e}", "traceback": tb}), 500
+
+    finally:
+        if pdf is not None:
+            pdf.close()
+
+
+@index_bp.route("/indice/exportar", methods=["GET"])
+def exportar():
+    # NDJSON, um documento por linha, gerado sob demanda (o índice inteiro nunca fica em memória)
+    def generate():
+        for doc in get_digest_index().export():
+            yield json.dumps(doc, ensure_ascii=False) + "\n"
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+@index_bp.route("/indice/documentos/<path:referencia>", methods=["DELETE"])
+def remover_documento(referencia):
+    if not get_digest_index().remove(referencia):
+        return jsonify({"status": "erro", "message": "documento não registrado no índice"}), 404
+    return jsonify({"status": "sucesso"}), 200
+
+
+@index_bp.route("/indice", methods=["GET"])
+def estatisticas():
+    return jsonify(get_digest_index().stats()), 200
@@ -0,0 +1,123 @@
+# app/index/service.py
+from ..utils import as_pdf_stream, buffer_of, release_buffer
+from ..metrics import stage, observe_signatures
+from ..validation.listing import read_signatures, open_reader
+from ..validation.service import _signatures_digests
+from .store import get_digest_index
+
+
+def _signer(sig) -> tuple[str | None, str | None]:
+    try:
+        cert = sig.signer_cert
+        return cert.subject.native.get("common_name"), cert.sha256.hex()
+    except Exception:
+        return None, None
+
+
+def signature_entries(pdf) -> tuple[list[dict], int]:
+    """
+    Digests de cada assinatura do documento (um único passe sobre o arquivo) no
+    formato do índice, mais o tamanho do arquivo. Assinaturas com ByteRange
+    inválido ficam de fora.
+    """
+    stream = as_pdf_stream(pdf)
+    pdf_buffer = buffer_of(stream)
+    try:
+        with stage("ler_pdf"):
+            sigs = read_signatures(open_reader(stream, pdf_buffer), pdf_buffer)
+        observe_signatures(len(sigs))
+        entries = []
+        for sig, digests in zip(sigs, _signatures_digests(sigs, pdf_buffer)):
+            if not digests or "sha256" not in digests:
+                continue
+            nome_assinante, certificado_sha256 = _signer(sig)
+            timestamp = sig.self_reported_timestamp
+            entries.append({
+                "campo": sig.field_name,
+                "revisao": sig.signed_revision,
+                "canonical_sha256": digests["sha256"],
+                "md_algorithm": sig.external_md_algorithm,
+                "md_digest": digests.get(sig.external_md_algorithm),
+                "assinante": nome_assinante,
+                "certificado_sha256": certificado_sha256,
+                "timestamp": timestamp.isoformat() if timestamp is not None else None,
+            })
+        return entries, len(pdf_buffer)
+    finally:
+        release_buffer(pdf_buffer)
+
+
+def indexar_pdf_logic(pdf, referencia: str, metadados: dict | None = None) -> dict:
+    entries, tamanho = signature_entries(pdf)
+    get_digest_index().register(referencia, entries, tamanho, metadados)
+    return {"referencia": referencia, "assinaturas": len(entries)}
+
+
+def indexar_item(referencia: str, pdf) -> dict:
+    # item de ingestão em lote (pool de processos): só calcula; o registro é feito em lote pelo chamador
+    if not referencia or not pdf:
+        return {"status": "erro", "referencia": referencia, "message": 'As chaves "referencia" e "pdf_base64" são obrigatórias.'}
+    try:
+        entries, tamanho = signature_entries(pdf)
+        return {"status": "sucesso", "referencia": referencia, "entries": entries, "tamanho": tamanho}
+    except Exception as e:
+        return {"status": "erro", "referencia": referencia, "message": f"Ocorreu um erro ao processar o PDF: {e}"}
+
+
+def indexar_arquivo(referencia: str, path: str) -> dict:
+    # item da ingestão pela CLI (python -m app.index): o processo do pool lê o arquivo direto do disco
+    with open(path, "rb") as f:
+        return indexar_item(referencia, f)
+
+
+def indexar_lote(itens: list[dict], metadados: list) -> list[dict]:
+    """Registra numa única transação os itens calculados por indexar_item que deram certo."""
+    ok = [(item, meta) for item, meta in zip(itens, metadados) if item.get("status") == "sucesso"]
+    get_digest_index().register_many(
+        (item["referencia"], item["entries"], item["tamanho"], meta) for item, meta in ok
+    )
+    resultados = []
+    for item in itens:
+        resultado = {k: v for k, v in item.items() if k not in ("entries", "tamanho")}
+        if item.get("status") == "sucesso":
+            resultado["assinaturas"] = len(item["entries"])
+        resultados.append(resultado)
+    return resultados
+
+
+def buscar_pdf_logic(pdf) -> dict:
+    """
+    Para cada assinatura do pdf enviado, os documentos registrados que têm uma
+    assinatura sobre exatamente o mesmo conteúdo (mesmo SHA-256 canônico do
+    ByteRange). `mesmo_certificado` indica se foi o mesmo certificado.
+    """
+    entries, _ = signature_entries(pdf)
+    index = get_digest_index()
+    resultados = []
+    with stage("buscar_indice"):
+        for e in entries:
+            matches = index.lookup(e["canonical_sha256"])
+            for m in matches:
+                m["mesmo_certificado"] = m["certificado_sha256"] is not None \
+                    and m["certificado_sha256"] == e["certificado_sha256"]
+            resultados.append({
+                "campo": e["campo"],
+                "revisao": e["revisao"],
+                "nome_assinante": e["assinante"],
+                "canonical_sha256": e["canonical_sha256"].hex(),
+                "md_algorithm": e["md_algorithm"],
+                "encontrado": bool(matches),
+                "correspondencias": matches,
+            })
+    return {
+        "assinado": bool(entries),
+        "encontrado": any(r["encontrado"] for r in resultados),
+        "assinaturas": resultados,
+    }
+
+
+def buscar_digest_logic(digest: bytes, md_algorithm: str | None = None) -> dict:
+    # digest já calculado pelo cliente (ex.: digest_b64 do /preparar-pdf, no algoritmo MD_ALGO)
+    with stage("buscar_indice"):
+        matches = get_digest_index().lookup(digest, md_algorithm)
+    return {"encontrado": bool(matches), "correspondencias": matches}
@@ -0,0 +1,183 @@
+# app/index/store.py
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from ..config import Config
+
+_local = threading.local()
+_index = None
+_index_lock = threading.Lock()
+
+# documentos lidos por consulta na exportação (paginação por id, sem transação de leitura longa)
+EXPORT_PAGE_SIZE = 1000
+
+
+class DigestIndex:
+    """
+    Índice persistente (SQLite, WAL) dos digests do ByteRange de cada assinatura
+    dos documentos registrados: SHA-256 canônico, digest no algoritmo do CMS e
+    identificação do assinante. A busca de uma assinatura é uma consulta por
+    chave nos índices de `canonical_sha256`/`md_digest`, independente de quantos
+    documentos estão registrados.
+    """
+
+    def __init__(self, path: str, max_matches: int):
+        self.path = path
+        self.max_matches = max_matches
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS documentos ("
+                " id INTEGER PRIMARY KEY, referencia TEXT NOT NULL UNIQUE, tamanho INTEGER,"
+                " registrado REAL NOT NULL, metadados TEXT)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS assinaturas ("
+                " documento INTEGER NOT NULL, campo TEXT NOT NULL, revisao INTEGER,"
+                " canonical_sha256 BLOB NOT NULL, md_algorithm TEXT, md_digest BLOB,"
+                " assinante TEXT, certificado_sha256 TEXT, timestamp TEXT,"
+                " PRIMARY KEY (documento, campo))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS assinaturas_canonical ON assinaturas (canonical_sha256)")
+            conn.execute("CREATE INDEX IF NOT EXISTS assinaturas_md ON assinaturas (md_digest)")
+            conn.execute("CREATE INDEX IF NOT EXISTS assinaturas_certificado ON assinaturas (certificado_sha256)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # uma conexão por thread e por processo (o pid muda depois de fork)
+        conns = getattr(_local, "conns", None)
+        if conns is None or getattr(_local, "pid", None) != os.getpid():
+            conns = _local.conns = {}
+            _local.pid = os.getpid()
+        conn = conns.get(self.path)
+        if conn is None:
+            conn = conns[self.path] = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @staticmethod
+    def _insert(conn, referencia: str, entries: list[dict], tamanho: int | None, metadados: dict | None):
+        # registrar de novo a mesma referência substitui as assinaturas anteriores
+        conn.execute(
+            "DELETE FROM assinaturas WHERE documento = (SELECT id FROM documentos WHERE referencia = ?)", (referencia,)
+        )
+        conn.execute(
+            "INSERT INTO documentos (referencia, tamanho, registrado, metadados) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT (referencia) DO UPDATE SET tamanho = excluded.tamanho,"
+            " registrado = excluded.registrado, metadados = excluded.metadados",
+            (referencia, tamanho, time.time(), json.dumps(metadados) if metadados else None),
+        )
+        doc_id = conn.execute("SELECT id FROM documentos WHERE referencia = ?", (referencia,)).fetchone()[0]
+        conn.executemany(
+            "INSERT OR REPLACE INTO assinaturas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(doc_id, e["campo"], e["revisao"], e["canonical_sha256"], e["md_algorithm"], e["md_digest"],
+              e["assinante"], e["certificado_sha256"], e["timestamp"]) for e in entries],
+        )
+
+    def register(self, referencia: str, entries: list[dict], tamanho: int | None = None, metadados: dict | None = None):
+        conn = self._conn()
+        with conn:
+            self._insert(conn, referencia, entries, tamanho, metadados)
+
+    def register_many(self, documents):
+        """Registra vários documentos (referencia, entries, tamanho, metadados) numa única transação."""
+        conn = self._conn()
+        with conn:
+            for referencia, entries, tamanho, metadados in documents:
+                self._insert(conn, referencia, entries, tamanho, metadados)
+
+    def contains(self, referencia: str) -> bool:
+        return self._conn().execute(
+            "SELECT 1 FROM documentos WHERE referencia = ?", (referencia,)
+        ).fetchone() is not None
+
+    def remove(self, referencia: str) -> bool:
+        conn = self._conn()
+        with conn:
+            row = conn.execute("SELECT id FROM documentos WHERE referencia = ?", (referencia,)).fetchone()
+            if row is None:
+                return False
+            conn.execute("DELETE FROM assinaturas WHERE documento = ?", (row[0],))
+            conn.execute("DELETE FROM documentos WHERE id = ?", (row[0],))
+        return True
+
+    def lookup(self, digest: bytes, md_algorithm: str | None = None) -> list[dict]:
+        """
+        Assinaturas registradas cujo conteúdo assinado tem este digest: o SHA-256
+        canônico ou, com `md_algorithm`, o digest no algoritmo do CMS.
+        """
+        if md_algorithm and md_algorithm != "sha256":
+            where, args = "a.md_digest = ? AND a.md_algorithm = ?", (digest, md_algorithm)
+        else:
+            where, args = "a.canonical_sha256 = ?", (digest,)
+        rows = self._conn().execute(
+            "SELECT d.referencia, d.metadados, a.campo, a.revisao, a.assinante, a.certificado_sha256, a.timestamp"
+            " FROM assinaturas a JOIN documentos d ON d.id = a.documento"
+            f" WHERE {where} ORDER BY d.id LIMIT ?", (*args, self.max_matches)
+        ).fetchall()
+        return [{
+            "referencia": r[0],
+            "metadados": json.loads(r[1]) if r[1] else None,
+            "campo": r[2],
+            "revisao": r[3],
+            "nome_assinante": r[4],
+            "certificado_sha256": r[5],
+            "timestamp": r[6],
+        } for r in rows]
+
+    def export(self):
+        """Gera um dict por documento (com as assinaturas), em ordem de registro."""
+        conn = self._conn()
+        last_id = 0
+        while True:
+            docs = conn.execute(
+                "SELECT id, referencia, tamanho, registrado, metadados FROM documentos WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, EXPORT_PAGE_SIZE),
+            ).fetchall()
+            if not docs:
+                return
+            sigs = {}
+            for row in conn.execute(
+                "SELECT documento, campo, revisao, canonical_sha256, md_algorithm, md_digest, assinante,"
+                " certificado_sha256, timestamp FROM assinaturas WHERE documento BETWEEN ? AND ?"
+                " ORDER BY documento, revisao", (docs[0][0], docs[-1][0]),
+            ):
+                sigs.setdefault(row[0], []).append({
+                    "campo": row[1],
+                    "revisao": row[2],
+                    "canonical_sha256": row[3].hex(),
+                    "md_algorithm": row[4],
+                    "md_digest": row[5].hex() if row[5] is not None else None,
+                    "nome_assinante": row[6],
+                    "certificado_sha256": row[7],
+                    "timestamp": row[8],
+                })
+            for doc_id, referencia, tamanho, registrado, metadados in docs:
+                yield {
+                    "referencia": referencia,
+                    "tamanho": tamanho,
+                    "registrado_em": registrado,
+                    "metadados": json.loads(metadados) if metadados else None,
+                    "assinaturas": sigs.get(doc_id, []),
+                }
+            last_id = docs[-1][0]
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        return {
+            "documentos": conn.execute("SELECT COUNT(*) FROM documentos").fetchone()[0],
+            "assinaturas": conn.execute("SELECT COUNT(*) FROM assinaturas").fetchone()[0],
+        }
+
+
+def get_digest_index() -> DigestIndex:
+    # lido de Config (e não do current_app) porque também roda nos processos do pool e na CLI
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = DigestIndex(Config.DIGEST_INDEX_PATH, Config.DIGEST_INDEX_MAX_MATCHES)
+    return _index
@@ -0,0 +1,6 @@
+# app/jobs/__init__.py
+from flask import Blueprint
+
+jobs_bp = Blueprint("jobs", __name__)
+
+from . import routes
@@ -0,0 +1,110 @@
+# app/jobs/routes.py
+import os
+import base64
+from flask import jsonify, url_for
+
+from . import jobs_bp
+from .store import get_job_store, JobQueueFull, QUEUED, RUNNING, DONE
+from .service import submit_job
+from ..config import Config
+from ..uploads import wants_binary_response, pdf_response
+
+
+def enqueue(kind: str, params: dict, inputs: dict):
+    """Resposta 202 (ou 503 com a fila cheia) para as rotas que aceitam o modo assíncrono."""
+    if not Config.JOBS_ENABLED:
+        return jsonify({"status": "erro", "message": "modo assíncrono desabilitado (JOBS_ENABLED=0)"}), 400
+    try:
+        job_id = submit_job(kind, params, inputs)
+    except JobQueueFull as e:
+        resp = jsonify({"status": "erro", "message": f"{e}; tente novamente"})
+        resp.status_code = 503
+        resp.headers["Retry-After"] = str(Config.JOBS_RETRY_AFTER)
+        return resp
+    resp = jsonify(_describe(get_job_store().get(job_id)))
+    resp.status_code = 202
+    resp.headers["Location"] = url_for("jobs.job_status", job_id=job_id)
+    resp.headers["Retry-After"] = str(Config.JOBS_RETRY_AFTER)
+    return resp
+
+
+def _describe(job: dict) -> dict:
+    store = get_job_store()
+    info = {
+        "job_id": job["id"],
+        "tipo": job["tipo"],
+        "estado": job["estado"],
+        "criado_em": job["criado"],
+        "iniciado_em": job["iniciado"],
+        "concluido_em": job["concluido"],
+        "expira_em": job["expira"],
+        "tentativas": job["tentativas"],
+        "status_url": url_for("jobs.job_status", job_id=job["id"]),
+    }
+    if job["estado"] == QUEUED:
+        info["posicao_na_fila"] = store.queue_position(job)
+    if job["estado"] not in (QUEUED, RUNNING):
+        info["status_http"] = job["status_http"]
+        info["resultado_url"] = url_for("jobs.job_result", job_id=job["id"])
+    return info
+
+
+def _not_found():
+    return jsonify({"status": "erro", "message": "job não encontrado ou expirado"}), 404
+
+
+@jobs_bp.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = get_job_store().get(job_id)
+    if job is None:
+        return _not_found()
+    resp = jsonify(_describe(job))
+    if job["estado"] in (QUEUED, RUNNING):
+        resp.headers["Retry-After"] = str(Config.JOBS_RETRY_AFTER)
+    return resp, 200
+
+
+@jobs_bp.route("/jobs/<job_id>/resultado", methods=["GET"])
+def job_result(job_id):
+    store = get_job_store()
+    job = store.get(job_id)
+    if job is None:
+        return _not_found()
+    if job["estado"] in (QUEUED, RUNNING):
+        # ainda não terminou: mesmo corpo do /jobs/<id>, com 202
+        resp = jsonify(_describe(job))
+        resp.headers["Retry-After"] = str(Config.JOBS_RETRY_AFTER)
+        return resp, 202
+
+    result = job["resultado"]
+    if job["estado"] != DONE or job["tipo"] != "preparar":
+        # mesmo corpo e status que a rota síncrona devolveria
+        return jsonify(result), job["status_http"]
+
+    output_path = store.output_path(job_id)
+    if not os.path.exists(output_path):
+        return _not_found()
+    if wants_binary_response():
+        return pdf_response(open(output_path, "rb"), "preparado.pdf", {
+            "X-Digest-B64": result["digest_b64"],
+            "X-Prepared-Digest-B64": result["prepared_digest_b64"],
+            "X-Field-Name": result["field_name"],
+            "X-Bytes-Reserved": result["bytes_reserved"],
+            "X-Md-Algorithm": result["md_algorithm"],
+        })
+    with open(output_path, "rb") as f:
+        prepared_pdf_b64 = base64.b64encode(f.read()).decode()
+    return jsonify({"prepared_pdf_b64": prepared_pdf_b64, **result}), 200
+
+
+@jobs_bp.route("/jobs/<job_id>", methods=["DELETE"])
+def delete_job(job_id):
+    # cancela um job na fila ou descarta o resultado; um job em execução termina, mas o resultado é descartado
+    if not get_job_store().delete(job_id):
+        return _not_found()
+    return jsonify({"status": "sucesso"}), 200
+
+
+@jobs_bp.route("/jobs", methods=["GET"])
+def jobs_stats():
+    return jsonify({"habilitado": Config.JOBS_ENABLED, **get_job_store().stats()}), 200
@@ -0,0 +1,212 @@
+# app/jobs/service.py
+import os
+import time
+import signal
+import base64
+import logging
+import threading
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, CancelledError
+from concurrent.futures.process import BrokenProcessPool
+
+from ..config import Config
+from ..pool import _init_pool_process
+from ..metrics import endpoint_label, JOBS_FINISHED, JOB_WAIT_SECONDS, JOB_SECONDS
+from .store import get_job_store
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def _run_preparar(store, job) -> dict:
+    from ..signatures.service import preparar_pdf_logic
+    params = job["parametros"]
+    with open(store.input_path(job["id"], "pdf"), "rb") as pdf:
+        output, digest_bytes, state, field_name, bytes_reserved = preparar_pdf_logic(
+            pdf, params["field_name"], int(params["bytes_reserved"]), params["md_algo"], Config.SUBFILTER
+        )
+    # o pdf preparado fica em arquivo; o resultado guarda só os metadados
+    with open(store.output_path(job["id"]), "wb") as f:
+        f.write(output.getbuffer())
+    return {
+        "digest_b64": base64.b64encode(digest_bytes).decode(),
+        "prepared_digest_b64": base64.b64encode(state).decode(),
+        "field_name": field_name,
+        "bytes_reserved": bytes_reserved,
+        "md_algorithm": params["md_algo"],
+    }
+
+
+def _run_validar(store, job) -> dict:
+    from ..validation.service import validar_pdf_logic, MODE_FULL
+    with open(store.input_path(job["id"], "pdf"), "rb") as pdf:
+        return validar_pdf_logic(pdf, job["parametros"].get("modo", MODE_FULL))
+
+
+def _run_comparar(store, job) -> dict:
+    from ..validation.service import comparar_assinatura_logic, MODE_FULL
+    with open(store.input_path(job["id"], "original"), "rb") as original, \
+            open(store.input_path(job["id"], "validar"), "rb") as validar:
+        return comparar_assinatura_logic(original, validar, job["parametros"].get("modo", MODE_FULL))
+
+
+JOB_KINDS = {
+    "preparar": _run_preparar,
+    "validar": _run_validar,
+    "comparar": _run_comparar,
+}
+
+
+def executar_job(job_id: str):
+    """Executa um job já reservado (estado `executando`); roda nos processos do pool de jobs."""
+    from ..validation.service import OriginalNotSigned
+    store = get_job_store()
+    job = store.get(job_id)
+    if job is None:
+        return
+    store.set_process(job_id, os.getpid())
+    kind = job["tipo"]
+    JOB_WAIT_SECONDS.labels(kind).observe(max(0.0, job["iniciado"] - job["criado"]))
+    t0 = time.perf_counter()
+    try:
+        with endpoint_label(f"job:{kind}"):
+            result = JOB_KINDS[kind](store, job)
+        status_http = 200
+    except OriginalNotSigned:
+        result, status_http = {"status": "erro", "message": "O pdf original não contém assinatura."}, 400
+    except Exception as e:
+        tb = traceback.format_exc()
+        logging.error(tb)
+        result, status_http = {"status": "erro", "message": str(e), "traceback": tb}, 500
+    JOB_SECONDS.labels(kind).observe(time.perf_counter() - t0)
+    JOBS_FINISHED.labels(kind, "sucesso" if status_http < 400 else "erro").inc()
+    store.finish(job_id, status_http, result)
+
+
+class JobDispatcher:
+    """
+    Thread de cada worker do gunicorn que reserva jobs da fila SQLite e os executa
+    num pool de processos próprio (separado do pool de lotes), no máximo
+    `pool_size` por vez. Também faz a limpeza periódica (TTL, timeout, donos mortos).
+    Job que passa de JOBS_TIMEOUT tem o processo do pool encerrado: o pool quebra,
+    os demais jobs dele voltam para a fila e um pool novo é criado, então um pdf
+    patológico não segura a vaga para sempre.
+    """
+
+    def __init__(self, pool_size: int, poll_interval: float):
+        self.pool_size = max(1, pool_size)
+        self.poll_interval = poll_interval
+        self.pid = os.getpid()
+        self._pool = None
+        self._running = 0
+        self._started = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._last_sweep = 0.0
+        self._thread = threading.Thread(target=self._loop, name="jobs-dispatcher", daemon=True)
+        self._thread.start()
+
+    def wake(self):
+        self._wake.set()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # chamado com self._lock
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.pool_size,
+                mp_context=multiprocessing.get_context(Config.BATCH_POOL_START_METHOD),
+                initializer=_init_pool_process,
+            )
+        return self._pool
+
+    def _discard_pool(self, pool: ProcessPoolExecutor):
+        # chamado com self._lock; callbacks atrasados do pool quebrado não derrubam o pool novo
+        if self._pool is pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _loop(self):
+        store = get_job_store()
+        while True:
+            try:
+                self._kill_timed_out(store)
+                if time.monotonic() - self._last_sweep >= self.poll_interval * 10:
+                    self._last_sweep = time.monotonic()
+                    store.sweep()
+                while self._running < self.pool_size:
+                    job = store.claim(self.pid)
+                    if job is None:
+                        break
+                    self._submit(job["id"])
+            except Exception:
+                logging.exception("falha no despacho de jobs")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _submit(self, job_id: str):
+        with self._lock:
+            self._running += 1
+            self._started[job_id] = time.monotonic()
+            pool = self._get_pool()
+            try:
+                future = pool.submit(executar_job, job_id)
+            except BrokenProcessPool:
+                # o pool quebrou e o callback que o descarta ainda não rodou
+                self._discard_pool(pool)
+                pool = self._get_pool()
+                future = pool.submit(executar_job, job_id)
+        # fora do lock: se o future já terminou, o callback roda nesta mesma thread
+        future.add_done_callback(lambda fut: self._done(job_id, pool, fut))
+
+    def _kill_timed_out(self, store):
+        # a vaga só é liberada no _done, quando o pool percebe o processo morto: até lá nada novo é reservado
+        now = time.monotonic()
+        with self._lock:
+            timed_out = [job_id for job_id, started in self._started.items() if started + store.timeout <= now]
+            for job_id in timed_out:
+                del self._started[job_id]
+        for job_id in timed_out:
+            store.finish_timed_out(job_id)
+            pid = store.process_of(job_id)
+            if pid:
+                logging.error("job %s excedeu JOBS_TIMEOUT; encerrando o processo %s do pool", job_id, pid)
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+    def _done(self, job_id: str, pool: ProcessPoolExecutor, future):
+        try:
+            future.result()
+        except (BrokenProcessPool, CancelledError):
+            # processo do pool morto (timeout, OOM killer) ou job cancelado no descarte do pool: o job volta
+            # para a fila enquanto houver tentativas (o que passou do timeout já está como erro 504 e fica
+            # como está) e o pool é recriado
+            get_job_store().requeue(job_id, "processo do pool encerrado inesperadamente")
+            with self._lock:
+                self._discard_pool(pool)
+        except Exception as e:
+            get_job_store().finish(job_id, 500, {"status": "erro", "message": str(e)})
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._started.pop(job_id, None)
+            self._wake.set()
+
+
+def start_dispatcher() -> JobDispatcher | None:
+    """Sobe o despachante deste processo (idempotente; depois de um fork cria outro)."""
+    global _dispatcher
+    if not Config.JOBS_ENABLED:
+        return None
+    with _dispatcher_lock:
+        if _dispatcher is None or _dispatcher.pid != os.getpid():
+            _dispatcher = JobDispatcher(Config.JOBS_POOL_WORKERS, Config.JOBS_POLL_INTERVAL)
+        return _dispatcher
+
+
+def submit_job(kind: str, params: dict, inputs: dict) -> str:
+    job_id = get_job_store().submit(kind, params, inputs)
+    start_dispatcher().wake()
+    return job_id
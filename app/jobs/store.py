@@ -0,0 +1,260 @@
+# app/jobs/store.py
+import os
+import re
+import json
+import time
+import shutil
+import secrets
+import sqlite3
+import threading
+
+from ..config import Config
+from ..utils import json_encode, json_decode
+
+QUEUED = "na_fila"
+RUNNING = "executando"
+DONE = "concluido"
+FAILED = "erro"
+
+OUTPUT_NAME = "saida.pdf"
+CHUNK_SIZE = 1024 * 1024
+
+_ID_RE = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+_local = threading.local()
+_store = None
+_store_lock = threading.Lock()
+
+
+class JobQueueFull(RuntimeError):
+    """A fila de jobs atingiu JOBS_MAX_QUEUE."""
+
+
+def _pid_alive(pid: int | None) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobStore:
+    """
+    Fila de jobs em SQLite (WAL) compartilhada pelos workers do gunicorn e pelos
+    processos do pool de jobs. Os pdfs de entrada e de saída ficam em
+    `<directory>/<id>/`; a tabela guarda estado, parâmetros e o resultado JSON.
+    Jobs concluídos (ou com erro) são removidos `result_ttl` segundos depois.
+    """
+
+    def __init__(self, directory: str, max_queue: int, result_ttl: int, timeout: int, max_attempts: int):
+        self.directory = directory
+        self.path = os.path.join(directory, "jobs.sqlite3")
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        os.makedirs(directory, exist_ok=True)
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, tipo TEXT NOT NULL, estado TEXT NOT NULL,"
+                " parametros TEXT NOT NULL, criado REAL NOT NULL, iniciado REAL, concluido REAL,"
+                " expira REAL, dono INTEGER, tentativas INTEGER NOT NULL DEFAULT 0,"
+                " status_http INTEGER, resultado TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_estado ON jobs (estado, criado)")
+            # pid do processo do pool que executa o job (para encerrá-lo no timeout); filas criadas antes não têm a coluna
+            columns = {r[1] for r in conn.execute("PRAGMA table_info(jobs)")}
+            if "processo" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN processo INTEGER")
+
+    def _conn(self) -> sqlite3.Connection:
+        # uma conexão por thread e por processo (o pid muda depois de fork)
+        conns = getattr(_local, "conns", None)
+        if conns is None or getattr(_local, "pid", None) != os.getpid():
+            conns = _local.conns = {}
+            _local.pid = os.getpid()
+        conn = conns.get(self.path)
+        if conn is None:
+            conn = conns[self.path] = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def job_dir(self, job_id: str) -> str:
+        return os.path.join(self.directory, job_id)
+
+    def input_path(self, job_id: str, name: str) -> str:
+        return os.path.join(self.job_dir(job_id), name + ".pdf")
+
+    def output_path(self, job_id: str) -> str:
+        return os.path.join(self.job_dir(job_id), OUTPUT_NAME)
+
+    def submit(self, kind: str, params: dict, inputs: dict) -> str:
+        """Grava os pdfs de `inputs` (nome -> stream) e enfileira o job."""
+        conn = self._conn()
+        queued = conn.execute("SELECT COUNT(*) FROM jobs WHERE estado = ?", (QUEUED,)).fetchone()[0]
+        if queued >= self.max_queue:
+            raise JobQueueFull(f"fila de jobs cheia ({self.max_queue})")
+        job_id = secrets.token_urlsafe(16)
+        os.makedirs(self.job_dir(job_id))
+        try:
+            for name, stream in inputs.items():
+                stream.seek(0)
+                with open(self.input_path(job_id, name), "wb") as f:
+                    shutil.copyfileobj(stream, f, CHUNK_SIZE)
+            with conn:
+                conn.execute(
+                    "INSERT INTO jobs (id, tipo, estado, parametros, criado) VALUES (?, ?, ?, ?, ?)",
+                    (job_id, kind, QUEUED, json.dumps(params), time.time()),
+                )
+        except BaseException:
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+            raise
+        return job_id
+
+    def claim(self, owner: int) -> dict | None:
+        """Passa o job mais antigo da fila para `executando` em nome do processo `owner`."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE estado = ? ORDER BY criado LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET estado = ?, iniciado = ?, dono = ?, tentativas = tentativas + 1 WHERE id = ?",
+                    (RUNNING, time.time(), owner, row[0]),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(row[0]) if row is not None else None
+
+    def set_process(self, job_id: str, pid: int):
+        conn = self._conn()
+        with conn:
+            conn.execute("UPDATE jobs SET processo = ? WHERE id = ? AND estado = ?", (pid, job_id, RUNNING))
+
+    def process_of(self, job_id: str) -> int | None:
+        row = self._conn().execute("SELECT processo FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row is not None else None
+
+    def requeue(self, job_id: str, message: str):
+        """Devolve à fila um job interrompido sem culpa própria; esgotadas as tentativas, vira erro 500."""
+        row = self._conn().execute(
+            "SELECT tentativas FROM jobs WHERE id = ? AND estado = ?", (job_id, RUNNING)
+        ).fetchone()
+        if row is None:
+            return
+        if row[0] < self.max_attempts:
+            conn = self._conn()
+            with conn:
+                conn.execute(
+                    "UPDATE jobs SET estado = ?, iniciado = NULL, dono = NULL, processo = NULL WHERE id = ? AND estado = ?",
+                    (QUEUED, job_id, RUNNING),
+                )
+        else:
+            self.finish(job_id, 500, {"status": "erro", "message": message})
+
+    def finish(self, job_id: str, status_http: int, result: dict):
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            # um job removido ou vencido por timeout enquanto rodava não volta a ser gravado
+            conn.execute(
+                "UPDATE jobs SET estado = ?, concluido = ?, expira = ?, status_http = ?, resultado = ?"
+                " WHERE id = ? AND estado = ?",
+                (DONE if status_http < 400 else FAILED, now, now + self.result_ttl, status_http,
+                 json_encode(result), job_id, RUNNING),
+            )
+
+    def finish_timed_out(self, job_id: str):
+        self.finish(job_id, 504, {"status": "erro", "message": f"job excedeu o tempo limite de {self.timeout}s"})
+
+    def get(self, job_id: str) -> dict | None:
+        if not isinstance(job_id, str) or not _ID_RE.match(job_id):
+            return None
+        row = self._conn().execute(
+            "SELECT id, tipo, estado, parametros, criado, iniciado, concluido, expira, tentativas, status_http, resultado"
+            " FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None or (row[7] is not None and row[7] <= time.time()):
+            return None
+        return {
+            "id": row[0], "tipo": row[1], "estado": row[2], "parametros": json.loads(row[3]),
+            "criado": row[4], "iniciado": row[5], "concluido": row[6], "expira": row[7],
+            "tentativas": row[8], "status_http": row[9],
+            "resultado": json_decode(row[10]) if row[10] is not None else None,
+        }
+
+    def queue_position(self, job: dict) -> int | None:
+        if job["estado"] != QUEUED:
+            return None
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM jobs WHERE estado = ? AND criado < ?", (QUEUED, job["criado"])
+        ).fetchone()[0]
+
+    def delete(self, job_id: str) -> bool:
+        if self.get(job_id) is None:
+            return False
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+        return True
+
+    def sweep(self):
+        """
+        Remove jobs vencidos, devolve à fila os que estavam com um worker que morreu
+        (até `max_attempts` tentativas) e marca como erro os que passaram de `timeout`
+        (inclusive os de despachantes de outros workers).
+        """
+        now = time.time()
+        conn = self._conn()
+        expired = [r[0] for r in conn.execute("SELECT id FROM jobs WHERE expira <= ?", (now,))]
+        for job_id in expired:
+            with conn:
+                conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+
+        running = conn.execute(
+            "SELECT id, iniciado, dono FROM jobs WHERE estado = ?", (RUNNING,)
+        ).fetchall()
+        for job_id, started, owner in running:
+            if started + self.timeout <= now:
+                # o despachante dono do job encerra o processo do pool (JobDispatcher._kill_timed_out)
+                self.finish_timed_out(job_id)
+            elif not _pid_alive(owner):
+                self.requeue(job_id, "processo que executava o job foi encerrado")
+
+        # diretórios sem registro (ex.: processo morto no meio do submit)
+        known = {r[0] for r in conn.execute("SELECT id FROM jobs")}
+        with os.scandir(self.directory) as it:
+            for de in it:
+                if de.is_dir() and de.name not in known and de.stat().st_mtime + self.result_ttl <= now:
+                    shutil.rmtree(de.path, ignore_errors=True)
+
+    def stats(self) -> dict:
+        counts = dict(self._conn().execute("SELECT estado, COUNT(*) FROM jobs GROUP BY estado").fetchall())
+        return {estado: counts.get(estado, 0) for estado in (QUEUED, RUNNING, DONE, FAILED)}
+
+
+def get_job_store() -> JobStore:
+    # lido de Config (e não do current_app) porque também roda nos processos do pool de jobs
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = JobStore(
+                    Config.JOBS_DIR,
+                    Config.JOBS_MAX_QUEUE,
+                    Config.JOBS_RESULT_TTL,
+                    Config.JOBS_TIMEOUT,
+                    Config.JOBS_MAX_ATTEMPTS,
+                )
+    return _store
@@ -0,0 +1,157 @@
+# app/metrics.py
+import os
+import sys
+import time
+import atexit
+import shutil
+import tempfile
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import request, g, Response
+
+from .config import Config
+
+# modo multiprocesso do prometheus_client: cada processo (workers do gunicorn e do pool)
+# grava seus valores em arquivos mmap neste diretório e o /metrics soma todos.
+# Precisa estar no ambiente antes do primeiro import do prometheus_client.
+
+
+def _cli_run() -> bool:
+    # python -m app / python -m app.index: o pacote é importado antes do __main__ da CLI
+    argv = getattr(sys, "orig_argv", [])
+    try:
+        target = argv[argv.index("-m") + 1]
+    except (ValueError, IndexError):
+        return False
+    return target.split(".")[0] == __package__
+
+
+if _cli_run():
+    # as CLIs (e os processos do pool delas, que herdam o ambiente) gravam num diretório próprio,
+    # descartado no fim: as séries cli:* não vazam para o /metrics do servidor
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="pades-metricas-cli-")
+    atexit.register(shutil.rmtree, os.environ["PROMETHEUS_MULTIPROC_DIR"], True)
+else:
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", Config.METRICS_DIR)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+from prometheus_client import (CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+                               CONTENT_TYPE_LATEST, multiprocess)
+
+INSTRUMENTED_BLUEPRINTS = ("signatures", "validation", "jobs", "index")
+
+_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+_SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(11))  # 1 KiB .. 1 GiB
+_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+REQUEST_SECONDS = Histogram(
+    "pades_request_seconds", "Duração total da requisição", ["endpoint", "status"], buckets=_TIME_BUCKETS
+)
+STAGE_SECONDS = Histogram(
+    "pades_stage_seconds", "Duração de cada etapa do processamento", ["endpoint", "etapa"], buckets=_TIME_BUCKETS
+)
+PAYLOAD_BYTES = Histogram(
+    "pades_payload_bytes", "Tamanho do corpo da requisição e da resposta", ["endpoint", "direcao"], buckets=_SIZE_BUCKETS
+)
+SIGNATURES_PER_DOCUMENT = Histogram(
+    "pades_signatures_per_document", "Assinaturas embutidas por documento processado", ["endpoint"], buckets=_COUNT_BUCKETS
+)
+IN_FLIGHT = Gauge(
+    "pades_requests_in_flight", "Requisições em andamento (soma dos workers vivos)", ["endpoint"],
+    multiprocess_mode="livesum"
+)
+ERRORS = Counter("pades_request_errors", "Respostas com status >= 500", ["endpoint"])
+ADMISSION_INFLIGHT_BYTES = Gauge(
+    "pades_admission_inflight_bytes", "Memória estimada das requisições admitidas em andamento", multiprocess_mode="livesum"
+)
+ADMISSION_REJECTED = Counter("pades_admission_rejected", "Requisições recusadas com 503 por falta de memória", ["endpoint"])
+ADMISSION_WAIT_SECONDS = Histogram(
+    "pades_admission_wait_seconds", "Tempo na fila de admissão", buckets=_TIME_BUCKETS
+)
+
+DEADLINE_EXCEEDED = Counter(
+    "pades_deadline_exceeded", "Requisições que esgotaram o prazo e devolveram resultado parcial", ["endpoint", "etapa"]
+)
+
+JOBS_FINISHED = Counter("pades_jobs", "Jobs assíncronos terminados", ["tipo", "resultado"])
+JOB_WAIT_SECONDS = Histogram(
+    "pades_job_wait_seconds", "Tempo do job na fila até começar a executar", ["tipo"], buckets=_TIME_BUCKETS
+)
+JOB_SECONDS = Histogram(
+    "pades_job_seconds", "Duração da execução do job no pool", ["tipo"], buckets=_TIME_BUCKETS + (120, 300, 600)
+)
+
+# rota da requisição em andamento; fora de uma requisição (pool de lotes, CLI) fica "-"
+_endpoint: ContextVar[str] = ContextVar("pades_metrics_endpoint", default="-")
+
+
+@contextmanager
+def stage(name: str):
+    """Mede uma etapa (ex.: "ler_pdf", "hash_byterange") no histograma da rota atual."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(_endpoint.get(), name).observe(time.perf_counter() - t0)
+
+
+@contextmanager
+def endpoint_label(name: str):
+    """Atribui as etapas medidas dentro do bloco a `name` (ex.: aquecimento), fora de uma requisição."""
+    token = _endpoint.set(name)
+    try:
+        yield
+    finally:
+        _endpoint.reset(token)
+
+
+def observe_signatures(count: int):
+    SIGNATURES_PER_DOCUMENT.labels(_endpoint.get()).observe(count)
+
+
+def observe_deadline_exceeded(etapa: str):
+    DEADLINE_EXCEEDED.labels(_endpoint.get(), etapa).inc()
+
+
+def _before_request():
+    if request.blueprint not in INSTRUMENTED_BLUEPRINTS:
+        return
+    endpoint = request.url_rule.rule if request.url_rule is not None else "desconhecido"
+    g.metrics = (endpoint, _endpoint.set(endpoint), time.perf_counter())
+    IN_FLIGHT.labels(endpoint).inc()
+    if request.content_length:
+        PAYLOAD_BYTES.labels(endpoint, "entrada").observe(request.content_length)
+
+
+def _after_request(response):
+    metrics = g.get("metrics")
+    if metrics is not None:
+        endpoint, _, t0 = metrics
+        REQUEST_SECONDS.labels(endpoint, str(response.status_code)).observe(time.perf_counter() - t0)
+        if response.content_length is not None:
+            PAYLOAD_BYTES.labels(endpoint, "saida").observe(response.content_length)
+        if response.status_code >= 500:
+            ERRORS.labels(endpoint).inc()
+    return response
+
+
+def _teardown_request(exc):
+    # teardown roda mesmo quando a view levanta exceção, então o gauge nunca fica preso
+    metrics = g.pop("metrics", None)
+    if metrics is not None:
+        endpoint, token, _ = metrics
+        IN_FLIGHT.labels(endpoint).dec()
+        _endpoint.reset(token)
+
+
+def init_app(app):
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+
+
+def metrics_response() -> Response:
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
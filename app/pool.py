@@ -0,0 +1,113 @@
+# app/pool.py
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .config import Config
+
+NOT_EVALUATED = {"status": "nao_avaliado", "message": "prazo da requisição esgotado"}
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def container_cpu_count() -> int:
+    """CPUs realmente disponíveis para o container (cota do cgroup / afinidade)."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        # cgroup v2: "max 100000" ou "<quota> <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        try:
+            # cgroup v1
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                quota = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read())
+            if quota > 0:
+                cpus = min(cpus, max(1, quota // period))
+        except (OSError, ValueError):
+            pass
+    return max(1, cpus)
+
+
+def default_pool_size() -> int:
+    """
+    Processos do pool de lotes por worker: as CPUs do container divididas entre os
+    GUNICORN_WORKERS workers (cada um tem o seu pool), com no mínimo um.
+    """
+    workers = max(1, int(os.getenv("GUNICORN_WORKERS", 1)))
+    return max(1, container_cpu_count() // workers)
+
+
+def _init_pool_process():
+    # processos do pool não passam pelo create_app
+    from . import _silence_pyhanko
+    _silence_pyhanko()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Pool de processos do worker atual, criado sob demanda e reaproveitado entre requisições.
+    Usa forkserver: o worker do gunicorn já tem threads, e fork direto dele não é seguro.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        # depois de um fork (preload do gunicorn) o pool herdado não pertence a este processo
+        if _pool is None or _pool_pid != os.getpid():
+            size = Config.BATCH_POOL_WORKERS or default_pool_size()
+            _pool = ProcessPoolExecutor(
+                max_workers=size,
+                mp_context=multiprocessing.get_context(Config.BATCH_POOL_START_METHOD),
+                initializer=_init_pool_process,
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def reset_process_pool():
+    # descarta um pool quebrado (ex.: processo filho morto pelo OOM killer)
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def map_isolated(fn, args_list, timeout: float | None = None) -> list[dict]:
+    """
+    Executa fn(*args) no pool para cada item e devolve os resultados na mesma ordem.
+    Falha de um item (inclusive a morte do processo que o executava) vira um resultado
+    de erro daquele item, sem derrubar o lote inteiro. Itens que não terminam em
+    `timeout` segundos (prazo da requisição) voltam com status "nao_avaliado".
+    """
+    pool = get_process_pool()
+    futures = [pool.submit(fn, *args) for args in args_list]
+    expires_at = time.monotonic() + timeout if timeout is not None else None
+    results = []
+    broken = False
+    for fut in futures:
+        try:
+            results.append(fut.result(None if expires_at is None else max(0.0, expires_at - time.monotonic())))
+        except TimeoutError:
+            # os que ainda não começaram são cancelados; o que está rodando termina, mas é descartado
+            fut.cancel()
+            results.append(dict(NOT_EVALUATED))
+        except BrokenProcessPool:
+            broken = True
+            results.append({"status": "erro", "message": "processo do pool encerrado inesperadamente"})
+        except Exception as e:
+            results.append({"status": "erro", "message": str(e)})
+    if broken:
+        reset_process_pool()
+    return results
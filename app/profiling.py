@@ -0,0 +1,198 @@
+# app/profiling.py
+import os
+import sys
+import json
+import time
+import uuid
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+from flask import request, g
+
+from .config import Config
+
+PROFILING_BLUEPRINTS = ("signatures", "validation", "index")
+TOP_CPU_HEADER = 3
+
+# tracemalloc é global no processo: no máximo um perfil por vez em cada worker. Com gthread, as
+# alocações (pico e top_alocacoes) incluem as das outras requisições em andamento no mesmo worker;
+# só as amostras de pilha são da thread da requisição perfilada
+_lock = threading.Lock()
+
+
+def _frame_name(frame) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+
+
+def _collapse(frame) -> str:
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler(threading.Thread):
+    """
+    Lê a pilha da thread da requisição a cada `interval` segundos. O loop asyncio
+    da validação roda na mesma thread (run_sync), então o pyhanko aparece inteiro;
+    o trabalho feito no pool de processos (lotes, jobs) fica de fora.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="pades-perfil", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._finished = threading.Event()
+
+    def run(self):
+        while not self._finished.wait(self.interval):
+            stack = self._sample()
+            if stack is not None:
+                self.stacks[stack] += 1
+
+    def _sample(self) -> str | None:
+        # a referência ao frame não pode sobreviver à amostra: um frame guardado mantém vivos os locais da
+        # requisição (memoryviews do upload, por exemplo) e o close() do stream falha com BufferError
+        frame = sys._current_frames().get(self.thread_id)
+        return _collapse(frame) if frame is not None else None
+
+    def stop(self):
+        self._finished.set()
+        self.join()
+
+
+class Profile:
+    def __init__(self, endpoint: str):
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.endpoint = endpoint
+        # PYTHONTRACEMALLOC já ligado: só zera o pico e não desliga no fim
+        self.owns_tracemalloc = not tracemalloc.is_tracing()
+        if self.owns_tracemalloc:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self.sampler = StackSampler(threading.get_ident(), Config.PROFILING_INTERVAL)
+        self.t0 = time.perf_counter()
+        try:
+            self.sampler.start()
+        except BaseException:
+            if self.owns_tracemalloc:
+                tracemalloc.stop()
+            raise
+
+    def finish(self, status_code: int | None) -> dict:
+        self.sampler.stop()
+        elapsed = time.perf_counter() - self.t0
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        if self.owns_tracemalloc:
+            tracemalloc.stop()
+
+        stacks = self.sampler.stacks
+        total = sum(stacks.values())
+        leaves = Counter()
+        for stack, count in stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        summary = {
+            "id": self.id,
+            "endpoint": self.endpoint,
+            "status": status_code,
+            "segundos": round(elapsed, 4),
+            "amostras": total,
+            "intervalo": Config.PROFILING_INTERVAL,
+            "pico_memoria_bytes": peak,
+            "top_cpu": [{"funcao": name, "amostras": count, "percentual": round(100 * count / total, 1)}
+                        for name, count in leaves.most_common(Config.PROFILING_TOP_FUNCTIONS)],
+            "top_alocacoes": [
+                {"local": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}", "bytes": stat.size, "blocos": stat.count}
+                for stat in snapshot.statistics("lineno")[:Config.PROFILING_TOP_ALLOCATIONS]
+            ],
+        }
+        self._write(stacks, summary)
+        return summary
+
+    def _write(self, stacks: Counter, summary: dict):
+        # <id>.folded: entrada direta do flamegraph.pl, inferno e speedscope; <id>.json: resumo e alocações
+        os.makedirs(Config.PROFILING_DIR, exist_ok=True)
+        base = os.path.join(Config.PROFILING_DIR, self.id)
+        with open(base + ".folded", "w", encoding="utf-8") as f:
+            for stack, count in stacks.items():
+                f.write(f"{stack} {count}\n")
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        _prune()
+
+
+def _prune():
+    # mantém só os PROFILING_MAX_PROFILES perfis mais recentes (o id começa pelo horário)
+    ids = sorted(name[:-len(".json")] for name in os.listdir(Config.PROFILING_DIR) if name.endswith(".json"))
+    for old in ids[:max(0, len(ids) - Config.PROFILING_MAX_PROFILES)]:
+        for ext in (".json", ".folded"):
+            try:
+                os.remove(os.path.join(Config.PROFILING_DIR, old + ext))
+            except FileNotFoundError:
+                pass
+
+
+def _summary_headers(summary: dict) -> dict:
+    top = ", ".join(f"{item['funcao']}={item['percentual']}%" for item in summary["top_cpu"][:TOP_CPU_HEADER])
+    return {
+        "X-Perfil-Id": summary["id"],
+        "X-Perfil-Resumo": (f"segundos={summary['segundos']}; amostras={summary['amostras']}; "
+                            f"pico_memoria={summary['pico_memoria_bytes']}"),
+        "X-Perfil-Top-Cpu": top,
+    }
+
+
+def _finish(status_code: int | None) -> dict | None:
+    profile = g.pop("profile", None)
+    if profile is None:
+        return None
+    try:
+        return profile.finish(status_code)
+    finally:
+        _lock.release()
+
+
+def _before_request():
+    # desligado (allowlist vazia) o custo é só esta checagem
+    if not Config.PROFILING_ALLOWLIST or request.blueprint not in PROFILING_BLUEPRINTS:
+        return
+    if request.headers.get("X-Perfilar") not in Config.PROFILING_ALLOWLIST:
+        return
+    if not _lock.acquire(blocking=False):
+        g.profile_busy = True
+        return
+    endpoint = request.url_rule.rule if request.url_rule is not None else "desconhecido"
+    try:
+        g.profile = Profile(endpoint)
+    except Exception:
+        # sem perfil a requisição segue normalmente; o lock não pode ficar preso
+        _lock.release()
+        logging.exception("falha ao iniciar o perfil da requisição")
+
+
+def _after_request(response):
+    if g.pop("profile_busy", False):
+        response.headers["X-Perfil"] = "ocupado"
+    summary = _finish(response.status_code)
+    if summary is not None:
+        response.headers.update(_summary_headers(summary))
+    return response
+
+
+def _teardown_request(exc):
+    # exceção que pulou o after_request: o perfil é gravado assim mesmo e o lock liberado
+    _finish(None)
+
+
+def init_app(app):
+    # registrado depois da admissão: a espera na fila não entra no perfil
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
@@ -1,40 +1,154 @@
 # app/signatures/routes.py
+import time
 import base64
+import binascii
 import traceback
 import logging
 from flask import request, jsonify, current_app
 from pyhanko.sign.general import SigningError
 from . import signatures_bp
-from .service import preparar_pdf_logic, finalizar_assinatura_logic
+from .service import (preparar_pdf_logic, finalizar_assinatura_logic, preparar_pdf_item,
+                      preparar_pdf_sessao_logic, finalizar_assinatura_sessao_logic)
+from .store import get_session_store, SessionNotFound, SessionTooLarge
+from .state import InvalidPreparedState, decode_prepared_state
+from .sizing import parse_certificates, auto_bytes_reserved, check_p7s_fit, InvalidCertificates
 from ..config import Config
+from ..pool import map_isolated
+from ..metrics import stage
+from .. import deadline
+from ..jobs.routes import enqueue
+from ..uploads import (request_params, param_flag, load_pdf_input, load_blob, spool_stream,
+                       wants_binary_response, wants_async_job, pdf_response)
+
+def default_field_name() -> str:
+    template = current_app.config.get("DEFAULT_FIELD_NAME", Config.DEFAULT_FIELD_NAME)
+    return template.format(timestamp=int(time.time()))
+
+
+def resolve_bytes_reserved(params: dict, md_algo: str, certificados=None) -> int:
+    """
+    bytes_reserved informado; senão, estimado pela cadeia do assinante
+    (`certificados_b64` ou a parte multipart `certificados`) com `carimbo_tempo`
+    e `revogacao_bytes`; senão, DEFAULT_BYTES_RESERVED.
+    """
+    if params.get("bytes_reserved") not in (None, ""):
+        return int(params["bytes_reserved"])
+    certs = parse_certificates(certificados or params.get("certificados_b64"))
+    if certs:
+        return auto_bytes_reserved(
+            certs, md_algo, param_flag(params.get("carimbo_tempo")), int(params.get("revogacao_bytes") or 0)
+        )
+    return int(current_app.config.get("DEFAULT_BYTES_RESERVED", Config.DEFAULT_BYTES_RESERVED))
+
 
 @signatures_bp.route("/preparar-pdf", methods=["POST"])
 def preparar_pdf():
     try:
-        body = request.get_json(force=True)
-        pdf_b64 = body.get("pdf")
-        if not pdf_b64:
-            return jsonify({"message": "campo 'pdf' (base64) é obrigatório"}), 400
+        with stage("entrada"):
+            body = request_params()
+            pdf = load_pdf_input(body, "pdf", "pdf")
+        if pdf is None:
+            return jsonify({"message": "campo 'pdf' (base64, application/pdf ou multipart) é obrigatório"}), 400
 
-        field_name = body.get("field_name", current_app.config.get("DEFAULT_FIELD_NAME", Config.DEFAULT_FIELD_NAME))
-        bytes_reserved = int(body.get("bytes_reserved", current_app.config.get("DEFAULT_BYTES_RESERVED", Config.DEFAULT_BYTES_RESERVED)))
+        field_name = body.get("field_name") or default_field_name()
+        md_algo = current_app.config.get("MD_ALGO", Config.MD_ALGO)
+        certificados = request.files.get("certificados") if request.mimetype == "multipart/form-data" else None
+        bytes_reserved = resolve_bytes_reserved(body, md_algo, certificados.read() if certificados else None)
 
-        prepared_pdf_bytes, digest_bytes, pickled, field_name, bytes_reserved = preparar_pdf_logic(
-            pdf_b64, field_name, bytes_reserved,
-            current_app.config.get("MD_ALGO", Config.MD_ALGO),
+        if wants_async_job(body):
+            # modo assíncrono: 202 com o id do job; o resultado sai em /jobs/<id>/resultado
+            return enqueue("preparar", {
+                "field_name": field_name, "bytes_reserved": bytes_reserved, "md_algo": md_algo
+            }, {"pdf": pdf.stream})
+
+        if param_flag(body.get("sessao")):
+            # modo sessão: o pdf preparado fica no servidor e o cliente recebe só um token
+            token, digest_bytes, field_name, bytes_reserved = preparar_pdf_sessao_logic(
+                get_session_store(), pdf.stream, field_name, bytes_reserved, md_algo,
+                current_app.config.get("SUBFILTER", Config.SUBFILTER)
+            )
+            return jsonify({
+                "token": token,
+                "digest_b64": base64.b64encode(digest_bytes).decode(),
+                "field_name": field_name,
+                "bytes_reserved": bytes_reserved,
+                "md_algorithm": md_algo,
+                "expira_em_segundos": current_app.config.get("SESSION_STORE_TTL", Config.SESSION_STORE_TTL)
+            }), 200
+
+        prepared_pdf, digest_bytes, state, field_name, bytes_reserved = preparar_pdf_logic(
+            pdf.stream, field_name, bytes_reserved, md_algo,
             current_app.config.get("SUBFILTER", Config.SUBFILTER)
         )
 
-        prepared_digest_b64 = base64.b64encode(pickled).decode()
+        prepared_digest_b64 = base64.b64encode(state).decode()
+
+        if wants_binary_response():
+            # metadados vão nos headers; o corpo é o pdf preparado
+            return pdf_response(prepared_pdf, "preparado.pdf", {
+                "X-Digest-B64": base64.b64encode(digest_bytes).decode(),
+                "X-Prepared-Digest-B64": prepared_digest_b64,
+                "X-Field-Name": field_name,
+                "X-Bytes-Reserved": bytes_reserved,
+                "X-Md-Algorithm": md_algo,
+            })
+
+        with stage("resposta"):
+            return jsonify({
+                "prepared_pdf_b64": base64.b64encode(prepared_pdf.getbuffer()).decode(),
+                "digest_b64": base64.b64encode(digest_bytes).decode(),
+                "prepared_digest_b64": prepared_digest_b64,
+                "field_name": field_name,
+                "bytes_reserved": bytes_reserved,
+                "md_algorithm": md_algo
+            }), 200
+
+    except InvalidCertificates as e:
+        return jsonify({"message": str(e)}), 400
 
-        return jsonify({
-            "prepared_pdf_b64": base64.b64encode(prepared_pdf_bytes).decode(),
-            "digest_b64": base64.b64encode(digest_bytes).decode(),
-            "prepared_digest_b64": prepared_digest_b64,
-            "field_name": field_name,
-            "bytes_reserved": bytes_reserved,
-            "md_algorithm": current_app.config.get("MD_ALGO", Config.MD_ALGO)
-        }), 200
+    except SessionTooLarge as e:
+        return jsonify({"message": str(e)}), 413
+
+    except Exception as e:
+        tb = traceback.format_exc()
+        logging.error(tb)
+        return jsonify({"message": str(e), "traceback": tb}), 500
+
+
+@signatures_bp.route("/preparar-pdf/lote", methods=["POST"])
+def preparar_pdf_lote():
+    try:
+        body = request.get_json(force=True)
+        documentos = body.get("documentos")
+        if not isinstance(documentos, list) or not documentos:
+            return jsonify({"message": "campo 'documentos' (lista de {pdf, field_name?, bytes_reserved? ou certificados_b64?}) é obrigatório"}), 400
+
+        max_items = current_app.config.get("BATCH_MAX_ITEMS", Config.BATCH_MAX_ITEMS)
+        if len(documentos) > max_items:
+            return jsonify({"message": f"o lote aceita no máximo {max_items} documentos"}), 413
+
+        field_name = default_field_name()
+        md_algo = current_app.config.get("MD_ALGO", Config.MD_ALGO)
+        subfilter = current_app.config.get("SUBFILTER", Config.SUBFILTER)
+
+        args_list = []
+        for i, doc in enumerate(documentos):
+            doc = doc if isinstance(doc, dict) else {}
+            try:
+                bytes_reserved = resolve_bytes_reserved(doc, md_algo)
+            except InvalidCertificates as e:
+                return jsonify({"message": f"documento {i}: {e}"}), 400
+            args_list.append((
+                doc.get("pdf"),
+                doc.get("field_name") or field_name,
+                bytes_reserved,
+                md_algo,
+                subfilter,
+            ))
+
+        results = map_isolated(preparar_pdf_item, args_list, deadline.remaining())
+        response = {"resultados": [{"indice": i, **r} for i, r in enumerate(results)], **deadline.batch_info(results)}
+        return jsonify(response), deadline.status_code(response)
 
     except Exception as e:
         tb = traceback.format_exc()
@@ -45,19 +159,42 @@ def preparar_pdf():
 @signatures_bp.route("/finalizar-assinatura", methods=["POST"])
 def finalizar_assinatura():
     try:
-        body = request.get_json(force=True)
-        prepared_pdf_b64 = body.get("prepared_pdf_b64")
-        prepared_digest_b64 = body.get("prepared_digest_b64")
-        p7s_b64 = body.get("p7s_b64")
+        with stage("entrada"):
+            body = request_params()
+            token = body.get("token")
+            p7s = load_blob(body, "p7s_b64", "p7s")
+            if not token:
+                prepared_digest = load_blob(body, "prepared_digest_b64", "prepared_digest")
+                prepared_pdf = load_pdf_input(body, "prepared_pdf_b64", "prepared_pdf")
+
+        if token:
+            if not p7s:
+                return jsonify({"message": "token e p7s_b64 são obrigatórios"}), 400
+            final_pdf = finalizar_assinatura_sessao_logic(get_session_store(), token, p7s)
+        else:
+            if not (prepared_pdf and prepared_digest and p7s):
+                return jsonify({"message": "prepared_pdf_b64, prepared_digest_b64 e p7s_b64 são obrigatórios"}), 400
+
+            # o pdf é assinado no próprio stream; partes multipart são fechadas pelo werkzeug
+            # ao fim da requisição, antes da resposta ser transmitida, então vão para um spool próprio
+            stream = prepared_pdf.stream
+            if request.mimetype == "multipart/form-data":
+                stream = spool_stream(stream, request.content_length)
+            final_pdf = finalizar_assinatura_logic(stream, prepared_digest, p7s)
+
+        if wants_binary_response():
+            return pdf_response(final_pdf, "assinado.pdf")
 
-        if not (prepared_pdf_b64 and prepared_digest_b64 and p7s_b64):
-            return jsonify({"message": "prepared_pdf_b64, prepared_digest_b64 e p7s_b64 são obrigatórios"}), 400
+        with stage("resposta"):
+            return jsonify({
+                "pades_pdf_b64": base64.b64encode(final_pdf.read()).decode()
+            }), 200
 
-        final_pdf_bytes = finalizar_assinatura_logic(prepared_pdf_b64, prepared_digest_b64, p7s_b64)
+    except SessionNotFound:
+        return jsonify({"message": "sessão de assinatura não encontrada ou expirada; prepare o pdf novamente"}), 404
 
-        return jsonify({
-            "pades_pdf_b64": base64.b64encode(final_pdf_bytes).decode()
-        }), 200
+    except InvalidPreparedState as e:
+        return jsonify({"message": f"prepared_digest_b64 rejeitado: {e}"}), 400
 
     except SigningError as e:
         tb = traceback.format_exc()
@@ -72,3 +209,32 @@ def finalizar_assinatura():
         tb = traceback.format_exc()
         logging.error(tb)
         return jsonify({"message": str(e), "traceback": tb}), 500
+
+
+@signatures_bp.route("/finalizar-assinatura/verificar", methods=["POST"])
+def verificar_p7s():
+    # pré-checagem barata antes do /finalizar-assinatura: só o estado do preparo e o p7s, sem o pdf
+    try:
+        body = request_params()
+        token = body.get("token")
+        p7s = load_blob(body, "p7s_b64", "p7s")
+        state = get_session_store().get_state(token) if token else load_blob(body, "prepared_digest_b64", "prepared_digest")
+        if not (p7s and state):
+            return jsonify({"message": "p7s_b64 e token (ou prepared_digest_b64) são obrigatórios"}), 400
+
+        prepared_digest, _ = decode_prepared_state(state)
+        return jsonify(check_p7s_fit(prepared_digest, p7s)), 200
+
+    except SessionNotFound:
+        return jsonify({"message": "sessão de assinatura não encontrada ou expirada; prepare o pdf novamente"}), 404
+
+    except InvalidPreparedState as e:
+        return jsonify({"message": f"prepared_digest_b64 rejeitado: {e}"}), 400
+
+    except binascii.Error as e:
+        return jsonify({"message": f"p7s_b64 ou prepared_digest_b64 não é base64 válido: {e}"}), 400
+
+    except Exception as e:
+        tb = traceback.format_exc()
+        logging.error(tb)
+        return jsonify({"message": str(e), "traceback": tb}), 500
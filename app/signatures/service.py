@@ -1,18 +1,18 @@
 # app/signatures/service.py
-import io
 import base64
-import pickle
 from pyhanko.pdf_utils.incremental_writer import IncrementalPdfFileWriter
 from pyhanko.sign import signers, fields
 from pyhanko.sign.signers.pdf_signer import PdfTBSDocument
 
-from ..utils import run_sync
+from ..utils import run_sync, as_pdf_stream, as_bytes
+from .state import encode_prepared_state, decode_prepared_state
+from ..metrics import stage
 
-def preparar_pdf_logic(pdf_b64: str, field_name: str, bytes_reserved: int, md_algo: str, subfilter):
-    pdf_bytes = base64.b64decode(pdf_b64)
-
-    buf_in = io.BytesIO(pdf_bytes)
-    writer = IncrementalPdfFileWriter(buf_in)
+async def _preparar_pdf_async(pdf, field_name: str, bytes_reserved: int, md_algo: str, subfilter):
+    # pdf: base64 (contrato JSON) ou stream binário seekable (upload application/pdf / multipart)
+    buf_in = as_pdf_stream(pdf)
+    with stage("ler_pdf"):
+        writer = IncrementalPdfFileWriter(buf_in)
 
     # garante campo de assinatura (invisível)
     fields.append_signature_field(
@@ -33,42 +33,96 @@ def preparar_pdf_logic(pdf_b64: str, field_name: str, bytes_reserved: int, md_al
     )
     pdf_signer = signers.PdfSigner(meta, signer=ext_signer)
 
-    result = run_sync(pdf_signer.async_digest_doc_for_signing(
-        pdf_out=writer,
-        bytes_reserved=bytes_reserved,
-        in_place=False
-    ))
+    with stage("preparar_digest"):
+        result = await pdf_signer.async_digest_doc_for_signing(
+            pdf_out=writer,
+            bytes_reserved=bytes_reserved,
+            in_place=False
+        )
     prepared_digest, tbs_document, output = result
 
     output.seek(0)
-    prepared_pdf_bytes = output.read()
 
-    payload = {
-        "prepared_digest": prepared_digest,
-        "post_sign_instr": getattr(tbs_document, "post_sign_instructions", None)
-    }
-    pickled = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+    # estado compacto e autenticado (HMAC) que o cliente devolve na finalização
+    state = encode_prepared_state(prepared_digest, getattr(tbs_document, "post_sign_instructions", None))
+
+    # devolve o stream de saída (e não bytes) para evitar mais uma cópia do documento
+    return output, prepared_digest.document_digest, state, field_name, bytes_reserved
 
-    return prepared_pdf_bytes, prepared_digest.document_digest, pickled, field_name, bytes_reserved
 
+def preparar_pdf_logic(pdf, field_name: str, bytes_reserved: int, md_algo: str, subfilter):
+    return run_sync(_preparar_pdf_async(pdf, field_name, bytes_reserved, md_algo, subfilter))
 
-def finalizar_assinatura_logic(prepared_pdf_b64: str, prepared_digest_pickled_b64: str, p7s_b64: str):
-    prepared_pdf_bytes = base64.b64decode(prepared_pdf_b64)
-    pickled = base64.b64decode(prepared_digest_pickled_b64)
-    stored = pickle.loads(pickled)
 
-    prepared_digest = stored.get("prepared_digest")
-    post_sign_instr = stored.get("post_sign_instr")
+def preparar_pdf_item(pdf_b64: str, field_name: str, bytes_reserved, md_algo: str, subfilter) -> dict:
+    # item do /preparar-pdf/lote, executado nos processos do pool; erros ficam isolados no item
+    if not pdf_b64:
+        return {"status": "erro", "message": "campo 'pdf' (base64) é obrigatório"}
+    try:
+        output, digest_bytes, state, field_name, bytes_reserved = preparar_pdf_logic(
+            pdf_b64, field_name, int(bytes_reserved), md_algo, subfilter
+        )
+        return {
+            "status": "sucesso",
+            "prepared_pdf_b64": base64.b64encode(output.getbuffer()).decode(),
+            "digest_b64": base64.b64encode(digest_bytes).decode(),
+            "prepared_digest_b64": base64.b64encode(state).decode(),
+            "field_name": field_name,
+            "bytes_reserved": bytes_reserved,
+            "md_algorithm": md_algo
+        }
+    except Exception as e:
+        return {"status": "erro", "message": str(e)}
 
-    signature_bytes = base64.b64decode(p7s_b64)
 
-    buf = io.BytesIO(prepared_pdf_bytes)
-    PdfTBSDocument.finish_signing(
-        buf,
-        prepared_digest=prepared_digest,
-        signature_cms=signature_bytes,
-        post_sign_instr=post_sign_instr
+async def _preparar_pdf_sessao_async(store, pdf, field_name: str, bytes_reserved: int, md_algo: str, subfilter):
+    # mesmo preparo, mas o pdf preparado e o estado do digest ficam no servidor
+    output, digest_bytes, state, field_name, bytes_reserved = await _preparar_pdf_async(
+        pdf, field_name, bytes_reserved, md_algo, subfilter
     )
+    token = store.put(output.getvalue(), state)
+    return token, digest_bytes, field_name, bytes_reserved
+
+
+def preparar_pdf_sessao_logic(store, pdf, field_name: str, bytes_reserved: int, md_algo: str, subfilter):
+    return run_sync(_preparar_pdf_sessao_async(store, pdf, field_name, bytes_reserved, md_algo, subfilter))
+
+
+async def _finish_signing(prepared_pdf, state: bytes, signature_bytes: bytes):
+    prepared_digest, post_sign_instr = decode_prepared_state(state)
+
+    # finish_signing escreve o CMS no próprio stream (precisa ser gravável)
+    buf = as_pdf_stream(prepared_pdf)
+    with stage("finalizar_cms"):
+        await PdfTBSDocument.async_finish_signing(
+            buf,
+            prepared_digest=prepared_digest,
+            signature_cms=signature_bytes,
+            post_sign_instr=post_sign_instr
+        )
     buf.seek(0)
-    final_pdf_bytes = buf.read()
-    return final_pdf_bytes
+    return buf
+
+
+async def _finalizar_assinatura_async(prepared_pdf, prepared_digest_state, p7s):
+    # cada argumento pode vir em base64 (contrato JSON) ou já binário
+    state = as_bytes(prepared_digest_state)
+    signature_bytes = as_bytes(p7s)
+    return await _finish_signing(prepared_pdf, state, signature_bytes)
+
+
+def finalizar_assinatura_logic(prepared_pdf, prepared_digest_state, p7s):
+    return run_sync(_finalizar_assinatura_async(prepared_pdf, prepared_digest_state, p7s))
+
+
+async def _finalizar_assinatura_sessao_async(store, token: str, p7s):
+    prepared_pdf_bytes, state = store.get(token)
+    signature_bytes = as_bytes(p7s)
+    final_pdf = await _finish_signing(prepared_pdf_bytes, state, signature_bytes)
+    # só consome a sessão depois de assinar com sucesso (um 507 permite reenviar outro p7s)
+    store.delete(token)
+    return final_pdf
+
+
+def finalizar_assinatura_sessao_logic(store, token: str, p7s):
+    return run_sync(_finalizar_assinatura_sessao_async(store, token, p7s))
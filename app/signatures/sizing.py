@@ -0,0 +1,142 @@
+# app/signatures/sizing.py
+import math
+import base64
+import hashlib
+from asn1crypto import cms, x509, pem
+
+from ..config import Config
+
+# estrutura do SignedData sem certificados/assinatura (ContentInfo, SignerInfo, OIDs e
+# moldura dos atributos assinados); medido em CMS PAdES gerados pelo pyhanko, com folga
+_CMS_BASE_OVERHEAD = 300
+# TSTInfo + SignedData do carimbo sem os certificados da TSA
+_TIMESTAMP_BASE_OVERHEAD = 800
+ALIGNMENT = 64
+# EdDSA (RFC 8032) tem assinatura de tamanho fixo; algoritmo desconhecido usa o de uma RSA 4096
+_EDDSA_SIGNATURE_SIZE = {"ed25519": 64, "ed448": 114}
+_UNKNOWN_SIGNATURE_SIZE = 512
+
+
+class InvalidCertificates(ValueError):
+    """`certificados_b64` / parte `certificados` que não é uma cadeia X.509 legível."""
+
+
+def _load_certificate(der: bytes) -> x509.Certificate:
+    # o asn1crypto só decodifica sob demanda: .native força a leitura inteira aqui, e não no meio da estimativa
+    cert = x509.Certificate.load(der)
+    cert.native
+    return cert
+
+
+def _parse_certificates(value) -> list[x509.Certificate]:
+    if isinstance(value, str):
+        value = value.encode()
+    if isinstance(value, bytes):
+        if pem.detect(value):
+            return [_load_certificate(der) for _, _, der in pem.unarmor(value, multiple=True)]
+        if value.lstrip()[:1] == b"\x30":
+            return [_load_certificate(value)]
+        value = [v for v in value.split(b",") if v.strip()]
+    certs = []
+    for item in value:
+        if isinstance(item, str):
+            item = item.encode()
+        if pem.detect(item):
+            certs.extend(_parse_certificates(item))
+        else:
+            der = base64.b64decode(b"".join(item.split()), validate=True)
+            certs.extend(_parse_certificates(der) if pem.detect(der) else [_load_certificate(der)])
+    return certs
+
+
+def parse_certificates(value) -> list[x509.Certificate]:
+    """
+    Cadeia do assinante (assinante primeiro) a partir de uma lista de base64 (DER
+    ou PEM), de um texto com um ou mais blocos PEM, de base64 separados por vírgula
+    ou de bytes (PEM ou DER). Entrada ilegível => InvalidCertificates.
+    """
+    if not value:
+        return []
+    try:
+        return _parse_certificates(value)
+    except Exception as e:
+        raise InvalidCertificates(f"certificados inválidos: {e}") from e
+
+
+def _signature_size(cert: x509.Certificate) -> int:
+    public_key = cert.public_key
+    algorithm = public_key.algorithm
+    if algorithm in _EDDSA_SIGNATURE_SIZE:
+        return _EDDSA_SIGNATURE_SIZE[algorithm]
+    if algorithm not in ("rsa", "rsassa_pss", "ec", "dsa"):
+        return _UNKNOWN_SIGNATURE_SIZE
+    if algorithm == "rsa" or algorithm == "rsassa_pss":
+        return math.ceil(public_key.bit_size / 8)
+    # ECDSA/DSA: SEQUENCE de dois INTEGERs do tamanho da curva (com o byte de sinal)
+    return 2 * (math.ceil(public_key.bit_size / 8) + 3) + 3
+
+
+def estimate_cms_size(certs: list[x509.Certificate], md_algo: str, carimbo_tempo: bool = False,
+                      revogacao_bytes: int = 0) -> int:
+    """
+    Tamanho (DER) esperado do CMS que o assinador externo vai devolver: os
+    certificados embutidos, o valor da assinatura (pelo tamanho da chave do
+    assinante), o issuer/serial do assinante (aparece no SignerInfo e no
+    signing-certificate-v2), os digests e a estrutura fixa. Carimbo de tempo e
+    dados de revogação embutidos entram pelas estimativas da configuração.
+    """
+    signer = certs[0]
+    issuer_serial = len(signer.issuer.dump()) + len(signer["tbs_certificate"]["serial_number"].dump())
+    digest_size = hashlib.new(md_algo).digest_size
+    size = (
+        _CMS_BASE_OVERHEAD
+        + sum(len(c.dump()) for c in certs)
+        + _signature_size(signer)
+        + 2 * issuer_serial
+        + 2 * digest_size
+        + revogacao_bytes
+    )
+    if carimbo_tempo:
+        size += _TIMESTAMP_BASE_OVERHEAD + Config.BYTES_RESERVED_TIMESTAMP_ESTIMATE
+    return size
+
+
+def auto_bytes_reserved(certs: list[x509.Certificate], md_algo: str, carimbo_tempo: bool = False,
+                        revogacao_bytes: int = 0) -> int:
+    # estimativa + margem (relativa, com um mínimo absoluto), alinhada a ALIGNMENT bytes;
+    # o bytes_reserved do pyhanko conta dígitos hex do /Contents, dois por byte do CMS
+    estimate = estimate_cms_size(certs, md_algo, carimbo_tempo, revogacao_bytes)
+    margin = max(estimate * Config.BYTES_RESERVED_MARGIN, Config.BYTES_RESERVED_MIN_MARGIN)
+    return 2 * math.ceil((estimate + margin) / ALIGNMENT) * ALIGNMENT
+
+
+def check_p7s_fit(prepared_digest, p7s: bytes) -> dict:
+    """
+    Pré-checagem do /finalizar-assinatura sem tocar no pdf: o p7s cabe na região
+    reservada (mesma conta do pyhanko: hex do CMS <= região - 2) e o messageDigest
+    assinado é o digest do documento preparado.
+    """
+    bytes_reserved = prepared_digest.reserved_region_end - prepared_digest.reserved_region_start - 2
+    capacidade = bytes_reserved // 2
+    result = {
+        "cabe": len(p7s) <= capacidade,
+        "tamanho_p7s": len(p7s),
+        "bytes_reserved": bytes_reserved,
+        "capacidade_p7s": capacidade,
+        "folga_bytes": capacidade - len(p7s),
+        "cms_valido": False,
+        "digest_confere": None,
+    }
+    try:
+        signed_data = cms.ContentInfo.load(p7s)["content"]
+        signer_info = signed_data["signer_infos"][0]
+        message_digest = next(
+            (attr["values"][0].native for attr in signer_info["signed_attrs"] if attr["type"].native == "message_digest"),
+            None,
+        )
+        result["cms_valido"] = True
+        if message_digest is not None:
+            result["digest_confere"] = message_digest == prepared_digest.document_digest
+    except Exception:
+        pass
+    return result
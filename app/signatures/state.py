@@ -0,0 +1,125 @@
+# app/signatures/state.py
+import os
+import hmac
+import time
+import struct
+import hashlib
+import logging
+import threading
+from pyhanko.sign.signers.pdf_byterange import PreparedByteRangeDigest
+
+from ..config import Config
+
+# Estado do preparo que o cliente devolve no /finalizar-assinatura (prepared_digest_b64).
+# Layout (big-endian):
+#   versão u8 | flags u8 | emitido_em u32 | início reservado u64 | fim reservado u64 |
+#   tamanho do digest u8 | digest | HMAC-SHA256 (32 bytes) de tudo o que vem antes
+FORMAT_VERSION = 1
+_HEADER = struct.Struct(">BBIQQB")
+_MAC_SIZE = hashlib.sha256().digest_size
+
+_key = None
+_key_lock = threading.Lock()
+
+
+class InvalidPreparedState(ValueError):
+    """Estado do preparo malformado, adulterado, expirado ou de versão desconhecida."""
+
+
+def check_key_config():
+    """
+    Chamado no create_app. Com PREPARED_STATE_KEY_REQUIRED o serviço não sobe sem
+    PREPARED_STATE_KEY; sem a exigência, avisa que a chave será gerada localmente e
+    que tokens emitidos aqui não serão aceitos por outras máquinas ou réplicas.
+    """
+    if Config.PREPARED_STATE_KEY:
+        return
+    if Config.PREPARED_STATE_KEY_REQUIRED:
+        raise RuntimeError("PREPARED_STATE_KEY não configurada (exigida por PREPARED_STATE_KEY_REQUIRED)")
+    logging.getLogger(__name__).warning(
+        "PREPARED_STATE_KEY não configurada: a chave do HMAC do estado do preparo será gerada em %s. "
+        "Tokens emitidos aqui não serão aceitos por outras máquinas ou réplicas; com mais de uma instância "
+        "configure PREPARED_STATE_KEY (e PREPARED_STATE_KEY_REQUIRED=1)", Config.PREPARED_STATE_KEY_FILE
+    )
+
+
+def _load_key() -> bytes:
+    global _key
+    if _key is not None:
+        return _key
+    with _key_lock:
+        if _key is not None:
+            return _key
+        if Config.PREPARED_STATE_KEY:
+            _key = Config.PREPARED_STATE_KEY.encode()
+            return _key
+        # sem chave configurada: gera uma no diretório compartilhado, para que todos os
+        # workers (e reinícios) usem a mesma. A chave é escrita num arquivo temporário e
+        # publicada com os.link, que falha se o arquivo já existir: resolve a corrida entre
+        # workers e ninguém lê um arquivo pela metade
+        path = Config.PREPARED_STATE_KEY_FILE
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        key = os.urandom(32)
+        try:
+            with open(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as f:
+                f.write(key)
+                f.flush()
+                os.fsync(f.fileno())
+            os.link(tmp, path)
+        except FileExistsError:
+            with open(path, "rb") as f:
+                key = f.read()
+            if len(key) != 32:
+                raise RuntimeError(
+                    f"{path} não tem uma chave de 32 bytes ({len(key)} lidos); remova o arquivo ou configure PREPARED_STATE_KEY"
+                )
+        else:
+            logging.getLogger(__name__).warning("chave do HMAC do estado do preparo gerada em %s", path)
+        finally:
+            try:
+                os.unlink(tmp)
+            except FileNotFoundError:
+                pass
+        _key = key
+        return _key
+
+
+def _mac(data: bytes) -> bytes:
+    return hmac.new(_load_key(), data, hashlib.sha256).digest()
+
+
+def encode_prepared_state(prepared_digest: PreparedByteRangeDigest, post_sign_instr=None) -> bytes:
+    if post_sign_instr is not None:
+        # o preparo desta API nunca gera instruções pós-assinatura (sem LTV / carimbo de tempo)
+        raise ValueError("instruções pós-assinatura não são suportadas pelo formato do estado do preparo")
+    digest = prepared_digest.document_digest
+    body = _HEADER.pack(
+        FORMAT_VERSION, 0, int(time.time()),
+        prepared_digest.reserved_region_start, prepared_digest.reserved_region_end,
+        len(digest),
+    ) + digest
+    return body + _mac(body)
+
+
+def decode_prepared_state(blob: bytes):
+    """Valida o HMAC, a versão e a idade do estado; devolve (prepared_digest, post_sign_instr)."""
+    if len(blob) < _HEADER.size + _MAC_SIZE:
+        raise InvalidPreparedState("estado do preparo truncado")
+    body, mac = blob[:-_MAC_SIZE], blob[-_MAC_SIZE:]
+    if not hmac.compare_digest(mac, _mac(body)):
+        raise InvalidPreparedState("estado do preparo inválido ou adulterado")
+    version, flags, issued_at, start, end, digest_len = _HEADER.unpack_from(body)
+    if version != FORMAT_VERSION:
+        raise InvalidPreparedState(f"versão do estado do preparo não suportada: {version}")
+    if len(body) != _HEADER.size + digest_len:
+        raise InvalidPreparedState("estado do preparo malformado")
+    max_age = Config.PREPARED_STATE_MAX_AGE
+    if max_age and time.time() - issued_at > max_age:
+        raise InvalidPreparedState("estado do preparo expirado; prepare o pdf novamente")
+    prepared_digest = PreparedByteRangeDigest(
+        document_digest=body[_HEADER.size:],
+        reserved_region_start=start,
+        reserved_region_end=end,
+    )
+    return prepared_digest, None
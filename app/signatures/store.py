@@ -0,0 +1,216 @@
+# app/signatures/store.py
+import os
+import re
+import time
+import fcntl
+import secrets
+import threading
+from collections import OrderedDict
+from flask import current_app
+
+from ..config import Config
+
+_TOKEN_RE = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+_store_lock = threading.Lock()
+
+
+class SessionNotFound(LookupError):
+    """Token desconhecido, expirado ou já consumido."""
+
+
+class SessionTooLarge(ValueError):
+    """Pdf preparado maior que o orçamento inteiro do armazenamento de sessões (SESSION_STORE_MAX_BYTES)."""
+
+
+def _new_token() -> str:
+    return secrets.token_urlsafe(16)
+
+
+def _check_token(token: str):
+    if not isinstance(token, str) or not _TOKEN_RE.match(token):
+        raise SessionNotFound(token)
+
+
+class MemorySessionStore:
+    """
+    Guarda (pdf preparado, estado do digest) em memória do próprio worker.
+    Eviction por TTL, LRU e orçamento total de bytes.
+    """
+
+    def __init__(self, ttl: int, max_bytes: int):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # token -> (expira_em, pdf, estado)
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def _drop(self, token):
+        _, pdf, state = self._entries.pop(token)
+        self._total -= len(pdf) + len(state)
+
+    def _evict(self, now):
+        for token in [t for t, (exp, _, _) in self._entries.items() if exp <= now]:
+            self._drop(token)
+        while self._entries and self._total > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+
+    def put(self, prepared_pdf_bytes: bytes, state: bytes) -> str:
+        size = len(prepared_pdf_bytes) + len(state)
+        if size > self.max_bytes:
+            raise SessionTooLarge("documento maior que o limite do armazenamento de sessões (SESSION_STORE_MAX_BYTES)")
+        token = _new_token()
+        now = time.time()
+        with self._lock:
+            self._entries[token] = (now + self.ttl, prepared_pdf_bytes, state)
+            self._total += size
+            self._evict(now)
+        return token
+
+    def get(self, token: str):
+        _check_token(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    self._drop(token)
+                raise SessionNotFound(token)
+            self._entries.move_to_end(token)
+            return entry[1], entry[2]
+
+    def get_state(self, token: str) -> bytes:
+        return self.get(token)[1]
+
+    def delete(self, token: str):
+        with self._lock:
+            if token in self._entries:
+                self._drop(token)
+
+
+class DiskSessionStore:
+    """
+    Spool local em disco compartilhado por todos os workers do gunicorn.
+    Cada sessão vira dois arquivos (<token>.pdf e <token>.state); o mtime do .pdf
+    marca o último uso (LRU) e a expiração é mtime + ttl.
+    """
+
+    def __init__(self, directory: str, ttl: int, max_bytes: int):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock_path = os.path.join(directory, ".lock")
+
+    def _paths(self, token):
+        return (os.path.join(self.directory, token + ".pdf"),
+                os.path.join(self.directory, token + ".state"))
+
+    def _write(self, path, data: bytes):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _remove(self, token):
+        for path in self._paths(token):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _evict(self):
+        now = time.time()
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for de in it:
+                if not de.name.endswith(".pdf"):
+                    continue
+                token = de.name[:-4]
+                try:
+                    st = de.stat()
+                    state_size = os.path.getsize(self._paths(token)[1])
+                except FileNotFoundError:
+                    continue
+                if st.st_mtime + self.ttl <= now:
+                    self._remove(token)
+                    continue
+                size = st.st_size + state_size
+                entries.append((st.st_mtime, token, size))
+                total += size
+        entries.sort()
+        for _, token, size in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(token)
+            total -= size
+
+    def put(self, prepared_pdf_bytes: bytes, state: bytes) -> str:
+        if len(prepared_pdf_bytes) + len(state) > self.max_bytes:
+            raise SessionTooLarge("documento maior que o limite do armazenamento de sessões (SESSION_STORE_MAX_BYTES)")
+        token = _new_token()
+        pdf_path, state_path = self._paths(token)
+        # o .state vai primeiro: a presença do .pdf indica sessão completa
+        self._write(state_path, state)
+        self._write(pdf_path, prepared_pdf_bytes)
+        with open(self._lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self._evict()
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+        return token
+
+    def get(self, token: str):
+        _check_token(token)
+        pdf_path, state_path = self._paths(token)
+        try:
+            if os.path.getmtime(pdf_path) + self.ttl <= time.time():
+                self._remove(token)
+                raise SessionNotFound(token)
+            with open(pdf_path, "rb") as f:
+                prepared_pdf_bytes = f.read()
+            with open(state_path, "rb") as f:
+                state = f.read()
+            os.utime(pdf_path)
+        except FileNotFoundError:
+            raise SessionNotFound(token)
+        return prepared_pdf_bytes, state
+
+    def get_state(self, token: str) -> bytes:
+        # só o .state (sem ler o pdf); não conta como uso da sessão
+        _check_token(token)
+        pdf_path, state_path = self._paths(token)
+        try:
+            if os.path.getmtime(pdf_path) + self.ttl <= time.time():
+                raise SessionNotFound(token)
+            with open(state_path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise SessionNotFound(token)
+
+    def delete(self, token: str):
+        _check_token(token)
+        self._remove(token)
+
+
+def create_session_store(config):
+    backend = config.get("SESSION_STORE_BACKEND", Config.SESSION_STORE_BACKEND)
+    ttl = int(config.get("SESSION_STORE_TTL", Config.SESSION_STORE_TTL))
+    max_bytes = int(config.get("SESSION_STORE_MAX_BYTES", Config.SESSION_STORE_MAX_BYTES))
+    if backend == "memory":
+        return MemorySessionStore(ttl, max_bytes)
+    if backend == "disk":
+        return DiskSessionStore(config.get("SESSION_STORE_DIR", Config.SESSION_STORE_DIR), ttl, max_bytes)
+    raise ValueError(f"SESSION_STORE_BACKEND desconhecido: {backend}")
+
+
+def get_session_store():
+    app = current_app._get_current_object()
+    store = app.extensions.get("session_store")
+    if store is None:
+        with _store_lock:
+            store = app.extensions.get("session_store")
+            if store is None:
+                store = app.extensions["session_store"] = create_session_store(app.config)
+    return store
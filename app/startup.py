@@ -0,0 +1,136 @@
+# app/startup.py
+import os
+import time
+import logging
+import datetime
+
+from .config import Config
+from .metrics import endpoint_label
+from .utils import run_sync
+
+# tempos de inicialização deste processo (com preload, imports e create_app vêm do master)
+_report = {
+    "preload": False,
+    "import_segundos": None,
+    "create_app_segundos": None,
+    "aquecimento": None,
+}
+_signer = None
+
+
+def record(name: str, seconds: float):
+    _report[name] = round(seconds, 4)
+
+
+def set_preload(enabled: bool):
+    _report["preload"] = enabled
+
+
+def startup_report() -> dict:
+    return {"pid": os.getpid(), **_report}
+
+
+def format_report(report: dict) -> str:
+    parts = [f"pid={report['pid']}", f"preload={report['preload']}",
+             f"imports={report['import_segundos']}s", f"create_app={report['create_app_segundos']}s"]
+    warmup = report.get("aquecimento")
+    if warmup:
+        if warmup.get("erro"):
+            parts.append(f"aquecimento=erro ({warmup['erro']})")
+        else:
+            steps = " ".join(f"{k}={v}s" for k, v in warmup.items() if k not in ("total", "erro"))
+            parts.append(f"aquecimento={warmup['total']}s ({steps})")
+    return "inicialização " + " ".join(parts)
+
+
+def _tiny_pdf() -> bytes:
+    """Pdf mínimo de uma página (xref calculado aqui mesmo), usado só no aquecimento."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 200 200] /Resources << >> >>",
+    ]
+    out = bytearray(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (num, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def _warmup_signer():
+    # chave e certificado descartáveis, gerados uma vez por processo
+    global _signer
+    if _signer is None:
+        from asn1crypto import x509 as asn1_x509, keys as asn1_keys
+        from cryptography import x509
+        from cryptography.x509.oid import NameOID
+        from cryptography.hazmat.primitives import hashes, serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        from pyhanko.sign import signers
+
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "Aquecimento")])
+        now = datetime.datetime.now(datetime.timezone.utc)
+        cert = (
+            x509.CertificateBuilder()
+            .subject_name(name).issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(minutes=5))
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .sign(key, hashes.SHA256())
+        )
+        _signer = signers.SimpleSigner(
+            signing_cert=asn1_x509.Certificate.load(cert.public_bytes(serialization.Encoding.DER)),
+            signing_key=asn1_keys.PrivateKeyInfo.load(key.private_bytes(
+                serialization.Encoding.DER, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+            )),
+            cert_registry=None,
+        )
+    return _signer
+
+
+def run_warmup() -> dict | None:
+    """
+    Passa um pdf mínimo por preparar → assinar → finalizar → validar, para que as
+    inicializações preguiçosas do pyhanko/asn1crypto/cryptography aconteçam antes
+    da primeira requisição real. Falhas são registradas, nunca derrubam o processo.
+    """
+    if not Config.WARMUP_ENABLED:
+        return None
+    from .signatures.service import preparar_pdf_logic, finalizar_assinatura_logic
+    from .validation.service import validar_pdf_logic
+
+    timings = {}
+
+    def step(name, fn):
+        t0 = time.perf_counter()
+        result = fn()
+        timings[name] = round(time.perf_counter() - t0, 4)
+        return result
+
+    t_start = time.perf_counter()
+    try:
+        with endpoint_label("aquecimento"):
+            output, digest, state, _, _ = step("preparar", lambda: preparar_pdf_logic(
+                _tiny_pdf(), "Aquecimento", Config.DEFAULT_BYTES_RESERVED, Config.MD_ALGO, Config.SUBFILTER
+            ))
+            signer = step("chave", _warmup_signer)
+            cms = step("assinar", lambda: run_sync(signer.async_sign(digest, Config.MD_ALGO, use_pades=True)))
+            final_pdf = step("finalizar", lambda: finalizar_assinatura_logic(output, state, cms.dump()))
+            result = step("validar", lambda: validar_pdf_logic(final_pdf))
+        validacoes = result.get("validacoes") or []
+        if not validacoes or not all(v["intacto"] for v in validacoes):
+            raise RuntimeError("assinatura do aquecimento não ficou íntegra")
+        timings["total"] = round(time.perf_counter() - t_start, 4)
+    except Exception as e:
+        logging.getLogger(__name__).exception("falha no aquecimento")
+        timings["erro"] = str(e)
+    _report["aquecimento"] = timings
+    return timings
@@ -0,0 +1,138 @@
+# app/uploads.py
+import io
+import base64
+import shutil
+import tempfile
+from urllib.parse import quote
+from flask import request, Response
+from werkzeug.wsgi import wrap_file
+
+from .config import Config
+from .utils import buffer_of, release_buffer
+
+BINARY_MIMETYPES = ("application/pdf", "application/octet-stream")
+CHUNK_SIZE = 1024 * 1024
+
+
+class PdfInput:
+    """
+    Pdf recebido na requisição como stream binário seekable.
+    `getbuffer()` expõe o conteúdo sem cópia (mmap para arquivos em disco,
+    memoryview para BytesIO), que é o que o cálculo do ByteRange precisa.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._buffer = None
+
+    def getbuffer(self):
+        if self._buffer is None:
+            self._buffer = buffer_of(self.stream)
+        return self._buffer
+
+    def close(self):
+        if self._buffer is not None:
+            release_buffer(self._buffer)
+            self._buffer = None
+        self.stream.close()
+
+
+def size_of(stream) -> int:
+    pos = stream.tell()
+    stream.seek(0, io.SEEK_END)
+    size = stream.tell()
+    stream.seek(pos)
+    return size
+
+
+def spool_stream(src, content_length: int | None = None):
+    # pequenos ficam em memória, grandes vão para arquivo temporário (fora do RSS do worker)
+    limit = Config.UPLOAD_SPOOL_MAX_MEMORY
+    if content_length is not None and content_length <= limit:
+        dst = io.BytesIO()
+    else:
+        dst = tempfile.TemporaryFile("w+b")
+    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+    dst.seek(0)
+    return dst
+
+
+def request_params(silent: bool = False) -> dict | None:
+    """
+    Parâmetros da requisição: o corpo JSON (contrato base64 legado) ou, para
+    uploads binários/multipart, os campos do formulário mais a query string.
+    """
+    if request.mimetype in BINARY_MIMETYPES:
+        return request.args.to_dict()
+    if request.mimetype == "multipart/form-data":
+        params = request.args.to_dict()
+        params.update(request.form.to_dict())
+        return params
+    if silent:
+        return request.get_json(silent=True)
+    return request.get_json(force=True)
+
+
+def param_flag(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "sim", "yes", "on")
+    return bool(value)
+
+
+def load_pdf_input(params: dict, b64_key: str, part_name: str) -> PdfInput | None:
+    """Pdf do corpo application/pdf, da parte multipart `part_name` ou do campo base64 `b64_key`."""
+    if request.mimetype in BINARY_MIMETYPES:
+        if not request.content_length:
+            return None
+        return PdfInput(spool_stream(request.stream, request.content_length))
+    if request.mimetype == "multipart/form-data":
+        part = request.files.get(part_name)
+        if part is None:
+            return None
+        part.stream.seek(0)
+        return PdfInput(part.stream)
+    pdf_b64 = params.get(b64_key) if params else None
+    if not pdf_b64:
+        return None
+    return PdfInput(io.BytesIO(base64.b64decode(pdf_b64)))
+
+
+def load_blob(params: dict, b64_key: str, part_name: str) -> bytes | None:
+    """Blob pequeno (p7s, estado do digest) vindo de parte multipart ou de campo base64."""
+    if request.mimetype == "multipart/form-data":
+        part = request.files.get(part_name)
+        if part is not None:
+            return part.read()
+    value = params.get(b64_key) if params else None
+    if not value:
+        return None
+    return base64.b64decode(value)
+
+
+def wants_async_job(params: dict | None) -> bool:
+    """Modo assíncrono: parâmetro `assincrono` ou header `Prefer: respond-async`."""
+    if params and param_flag(params.get("assincrono")):
+        return True
+    return "respond-async" in request.headers.get("Prefer", "")
+
+
+def wants_binary_response() -> bool:
+    best = request.accept_mimetypes.best_match(["application/json", "application/pdf"])
+    return best == "application/pdf"
+
+
+def pdf_response(stream, filename: str, headers: dict | None = None, status: int = 200) -> Response:
+    """Resposta application/pdf transmitida em blocos direto do stream (sem base64)."""
+    size = size_of(stream)
+    stream.seek(0)
+    resp = Response(
+        wrap_file(request.environ, stream, CHUNK_SIZE),
+        status=status,
+        mimetype="application/pdf",
+        direct_passthrough=True,
+    )
+    resp.content_length = size
+    resp.headers["Content-Disposition"] = f"attachment; filename*=UTF-8''{quote(filename)}"
+    for key, value in (headers or {}).items():
+        resp.headers[key] = quote(str(value), safe=" -_.:/=+")
+    return resp
@@ -1,11 +1,82 @@
 # app/utils.py
+import io
+import os
+import mmap
+import json
+import base64
 import asyncio
+import threading
+from datetime import datetime
+
+_loop_local = threading.local()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Event loop persistente da thread atual (uma por thread do gthread), criado na
+    primeira chamada e reaproveitado pelas requisições seguintes.
+    """
+    loop = getattr(_loop_local, "loop", None)
+    # depois de um fork (preload do gunicorn) o loop herdado não pertence a este processo
+    if loop is None or loop.is_closed() or _loop_local.pid != os.getpid():
+        loop = _loop_local.loop = asyncio.new_event_loop()
+        _loop_local.pid = os.getpid()
+    return loop
+
 
 def run_sync(maybe_awaitable):
     if asyncio.iscoroutine(maybe_awaitable):
-        loop = asyncio.new_event_loop()
-        try:
-            return loop.run_until_complete(maybe_awaitable)
-        finally:
-            loop.close()
+        return get_event_loop().run_until_complete(maybe_awaitable)
     return maybe_awaitable
+
+
+def as_bytes(data) -> bytes:
+    # str é tratado como base64 (contrato JSON); bytes passam direto
+    if isinstance(data, str):
+        return base64.b64decode(data)
+    return bytes(data)
+
+
+def as_pdf_stream(pdf):
+    if isinstance(pdf, (str, bytes, bytearray, memoryview)):
+        return io.BytesIO(as_bytes(pdf))
+    return pdf
+
+
+def buffer_of(stream):
+    """
+    Visão sem cópia do conteúdo inteiro do stream: memoryview para BytesIO,
+    mmap para arquivos em disco.
+    """
+    # SpooledTemporaryFile (werkzeug) guarda o arquivo real em _file
+    raw = getattr(stream, "_file", stream)
+    if hasattr(raw, "getbuffer"):
+        return raw.getbuffer()
+    raw.flush()
+    if os.fstat(raw.fileno()).st_size == 0:
+        return memoryview(b"")
+    return mmap.mmap(raw.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def release_buffer(buf):
+    if isinstance(buf, memoryview):
+        buf.release()
+    else:
+        buf.close()
+
+
+def json_encode(value) -> str:
+    # datetimes dos resultados de validação sobrevivem à volta (json_decode)
+    def default(o):
+        if isinstance(o, datetime):
+            return {"__datetime__": o.isoformat()}
+        return str(o)
+    return json.dumps(value, default=default)
+
+
+def json_decode(raw: str):
+    def hook(d):
+        if len(d) == 1 and "__datetime__" in d:
+            return datetime.fromisoformat(d["__datetime__"])
+        return d
+    return json.loads(raw, object_hook=hook)
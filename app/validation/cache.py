@@ -0,0 +1,130 @@
+# app/validation/cache.py
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+
+from ..config import Config
+from ..utils import json_encode, json_decode
+
+# entra na chave: muda quando o formato do valor guardado muda (entradas antigas viram miss)
+VALUE_FORMAT = b"v2"
+
+_local = threading.local()
+_cache = None
+_cache_lock = threading.Lock()
+
+
+class ValidationCache:
+    """
+    Cache de resultados de validação em SQLite (WAL), compartilhado por todos os
+    workers do gunicorn e pelos processos do pool de lotes.
+    Chave: sha256 do conteúdo coberto pelo ByteRange + sha256 do CMS em /Contents
+    + fingerprint do trust store e intervalo de TRUST_TIME_BUCKET (um certificado
+    revogado deixa de sair do cache no intervalo seguinte). Eviction por TTL e LRU
+    (max_entries).
+    O valor é só o que não depende do documento (CMS e certificado do assinante):
+    a cobertura do ByteRange e as alterações posteriores variam entre arquivos que
+    carregam a mesma assinatura e nunca saem daqui.
+    """
+
+    def __init__(self, path: str, ttl: int, max_entries: int):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._puts = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS resultados ("
+                " chave TEXT PRIMARY KEY, valor TEXT NOT NULL,"
+                " criado REAL NOT NULL, acessado REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS resultados_acessado ON resultados (acessado)")
+            conn.execute("CREATE TABLE IF NOT EXISTS contadores (nome TEXT PRIMARY KEY, valor INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO contadores VALUES ('hits', 0), ('misses', 0)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # uma conexão por thread e por processo (o pid muda depois de fork)
+        conns = getattr(_local, "conns", None)
+        if conns is None or getattr(_local, "pid", None) != os.getpid():
+            conns = _local.conns = {}
+            _local.pid = os.getpid()
+        conn = conns.get(self.path)
+        if conn is None:
+            conn = conns[self.path] = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @staticmethod
+    def make_key(signed_content_sha256: bytes, contents: bytes, vc_fingerprint: str) -> str:
+        h = hashlib.sha256()
+        h.update(VALUE_FORMAT)
+        h.update(signed_content_sha256)
+        h.update(hashlib.sha256(contents).digest())
+        h.update(vc_fingerprint.encode())
+        return h.hexdigest()
+
+    def get(self, key: str):
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT valor FROM resultados WHERE chave = ? AND criado > ?", (key, now - self.ttl)
+        ).fetchone()
+        with conn:
+            if row is None:
+                conn.execute("UPDATE contadores SET valor = valor + 1 WHERE nome = 'misses'")
+                return None
+            conn.execute("UPDATE resultados SET acessado = ? WHERE chave = ?", (now, key))
+            conn.execute("UPDATE contadores SET valor = valor + 1 WHERE nome = 'hits'")
+        return json_decode(row[0])
+
+    def put(self, key: str, value):
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO resultados VALUES (?, ?, ?, ?)", (key, json_encode(value), now, now)
+            )
+        self._puts += 1
+        if self._puts % 100 == 0:
+            self.evict()
+
+    def evict(self):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM resultados WHERE criado <= ?", (time.time() - self.ttl,))
+            conn.execute(
+                "DELETE FROM resultados WHERE chave IN ("
+                " SELECT chave FROM resultados ORDER BY acessado DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def invalidate(self):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM resultados")
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        counters = dict(conn.execute("SELECT nome, valor FROM contadores").fetchall())
+        entries = conn.execute("SELECT COUNT(*) FROM resultados").fetchone()[0]
+        return {"hits": counters.get("hits", 0), "misses": counters.get("misses", 0), "entradas": entries}
+
+
+def get_validation_cache() -> ValidationCache | None:
+    # lido de Config (e não do current_app) porque também roda nos processos do pool
+    global _cache
+    if not Config.VALIDATION_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ValidationCache(
+                    Config.VALIDATION_CACHE_PATH,
+                    Config.VALIDATION_CACHE_TTL,
+                    Config.VALIDATION_CACHE_MAX_ENTRIES,
+                )
+    return _cache
@@ -0,0 +1,318 @@
+# app/validation/listing.py
+import io
+import re
+import mmap
+import binascii
+from asn1crypto import cms
+from pyhanko.pdf_utils import generic
+from pyhanko.pdf_utils.reader import PdfFileReader
+from pyhanko.sign.general import extract_signer_info
+from pyhanko.sign.validation.generic_cms import extract_certs_for_validation, extract_self_reported_ts
+from pyhanko.sign.validation.pdf_embedded import EmbeddedPdfSignature
+
+from ..utils import as_pdf_stream, buffer_of, release_buffer
+from ..metrics import stage, observe_signatures
+
+# tokens do dicionário da assinatura; strings literais são puladas à parte (parênteses aninhados e escapes)
+_TOKEN_RE = re.compile(rb"""
+    (?P<space>[\s\x00]+|%[^\r\n]*)
+  | (?P<dict_open><<)
+  | (?P<dict_close>>>)
+  | (?P<hex><[0-9A-Fa-f\s]*>)
+  | (?P<string>\()
+  | (?P<array_open>\[)
+  | (?P<array_close>\])
+  | (?P<name>/[^\s\x00/<>\[\]()%{}]*)
+  | (?P<regular>[^\s\x00/<>\[\]()%{}]+)
+""", re.X)
+_STRING_RE = re.compile(rb"\\.|[()]", re.S)
+_OBJ_HEADER_RE = re.compile(rb"\s*\d+\s+\d+\s+obj")
+_BYTE_RANGE_RE = re.compile(rb"\[\s*(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s*\]")
+_INTEGER_RE = re.compile(rb"[+-]?\d+")
+# o dicionário de assinatura termina antes disso; limita a varredura
+_MAX_SIG_OBJECT = 4 * 1024 * 1024
+
+
+class RawSignature:
+    """
+    Assinatura lida direto do buffer, com os mesmos atributos do
+    EmbeddedPdfSignature do pyhanko que o resto do serviço usa (sig_object,
+    signer_info, signer_cert, md_algorithm, ...). `sig_object` traz só as
+    chaves lidas do dicionário (/ByteRange, /Type, /SubFilter, /M).
+    """
+
+    def __init__(self, field_name: str, sig_object: dict, pkcs7_content: bytes, signed_revision: int):
+        self.field_name = field_name
+        self.sig_object = sig_object
+        self.pkcs7_content = pkcs7_content
+        self.signed_revision = signed_revision
+        self.signed_data = cms.ContentInfo.load(pkcs7_content)["content"]
+        self.signer_info = extract_signer_info(self.signed_data)
+        self.md_algorithm = self.signer_info["digest_algorithm"]["algorithm"].native.lower()
+        eci = self.signed_data["encap_content_info"]
+        if eci["content_type"].native == "tst_info":
+            # carimbo do documento: o ByteRange é resumido com o algoritmo do messageImprint
+            self.external_md_algorithm = eci["content"].parsed["message_imprint"]["hash_algorithm"]["algorithm"].native
+        else:
+            self.external_md_algorithm = self.md_algorithm
+        self.external_digests = {}
+        self._signer_cert = None
+
+    @property
+    def byte_range(self) -> list[int]:
+        return self.sig_object["/ByteRange"]
+
+    @property
+    def sig_object_type(self) -> str:
+        return self.sig_object.get("/Type", "/Sig")
+
+    @property
+    def signer_cert(self):
+        if self._signer_cert is None:
+            self._signer_cert = extract_certs_for_validation(self.signed_data).signer_cert
+        return self._signer_cert
+
+    @property
+    def self_reported_timestamp(self):
+        ts = extract_self_reported_ts(self.signer_info)
+        if ts is None and "/M" in self.sig_object:
+            # PAdES não usa o atributo signing-time; o horário declarado fica no /M do dicionário
+            try:
+                ts = generic.parse_pdf_date(self.sig_object["/M"])
+            except Exception:
+                ts = None
+        return ts
+
+
+def _sig_fields(fields, parent_name: str = "", inherited_type=None, seen=None):
+    """
+    Percorre /AcroForm /Fields e devolve (nome, campo, /V sem resolver) dos campos
+    de assinatura preenchidos. Diferente do enumerate_sig_fields do pyhanko, o /V
+    não é dereferenciado aqui: resolver o dicionário da assinatura faz o tokenizer
+    ler o /Contents (dezenas de KB em hex) um caractere por vez.
+    """
+    seen = seen if seen is not None else set()
+    if not isinstance(fields, generic.ArrayObject):
+        return
+    for field_ref in fields:
+        if not isinstance(field_ref, generic.IndirectObject) or field_ref.reference in seen:
+            continue
+        seen.add(field_ref.reference)
+        field = field_ref.get_object()
+        if not isinstance(field, generic.DictionaryObject) or "/T" not in field:
+            continue
+        fq_name = f"{parent_name}.{field['/T']}" if parent_name else str(field["/T"])
+        field_type = field.raw_get("/FT") if "/FT" in field else inherited_type
+        if field_type == "/Sig" and "/V" in field:
+            yield fq_name, field, field.raw_get("/V")
+        if "/Kids" in field:
+            yield from _sig_fields(field["/Kids"], fq_name, field_type, seen)
+
+
+def _skip_string(pdf_buffer, pos: int, end: int) -> int | None:
+    # pos aponta para o "(" de abertura; devolve a posição logo depois do ")" correspondente
+    depth = 0
+    for match in _STRING_RE.finditer(pdf_buffer, pos, end):
+        token = match.group()
+        if token == b"(":
+            depth += 1
+        elif token == b")":
+            depth -= 1
+            if depth == 0:
+                return match.end()
+    return None
+
+
+def _next_token(pdf_buffer, pos: int, end: int):
+    """Próximo token (tipo, início, fim) que não é espaço nem comentário; None se não houver um válido."""
+    while True:
+        match = _TOKEN_RE.match(pdf_buffer, pos, end)
+        if match is None:
+            return None
+        kind = match.lastgroup
+        if kind == "space":
+            pos = match.end()
+            continue
+        if kind == "string":
+            string_end = _skip_string(pdf_buffer, match.start(), end)
+            return None if string_end is None else (kind, match.start(), string_end)
+        return kind, match.start(), match.end()
+
+
+def _skip_value(pdf_buffer, token, end: int) -> int | None:
+    # fim do valor que começa em `token`; dicionários e arrays aninhados são pulados inteiros
+    kind, _, pos = token
+    if kind in ("dict_close", "array_close"):
+        return None
+    if kind == "regular" and _INTEGER_RE.fullmatch(pdf_buffer[token[1]:pos]):
+        # referência indireta "N G R": três tokens num valor só
+        generation = _next_token(pdf_buffer, pos, end)
+        if generation is not None and generation[0] == "regular" \
+                and _INTEGER_RE.fullmatch(pdf_buffer[generation[1]:generation[2]]):
+            ref = _next_token(pdf_buffer, generation[2], end)
+            if ref is not None and ref[0] == "regular" and bytes(pdf_buffer[ref[1]:ref[2]]) == b"R":
+                return ref[2]
+        return pos
+    if kind not in ("dict_open", "array_open"):
+        return pos
+    depth = 1
+    while depth:
+        token = _next_token(pdf_buffer, pos, end)
+        if token is None:
+            return None
+        if token[0] in ("dict_open", "array_open"):
+            depth += 1
+        elif token[0] in ("dict_close", "array_close"):
+            depth -= 1
+        pos = token[2]
+    return pos
+
+
+def _scan_dictionary(pdf_buffer, offset: int, end: int) -> tuple[dict, int] | None:
+    """
+    Chaves do primeiro nível do dicionário do objeto em `offset`, com o intervalo
+    (início, fim) de cada valor no buffer, e o fim do dicionário. Strings, hex e
+    dicionários aninhados são pulados como um todo, então um /Reason ou /Name que
+    contenha "/ByteRange [...]" não se confunde com a chave. Chave repetida ou
+    sintaxe inesperada devolve None.
+    """
+    header = _OBJ_HEADER_RE.match(pdf_buffer, offset, end)
+    if header is None:
+        return None
+    token = _next_token(pdf_buffer, header.end(), end)
+    if token is None or token[0] != "dict_open":
+        return None
+    entries = {}
+    pos = token[2]
+    while True:
+        token = _next_token(pdf_buffer, pos, end)
+        if token is None:
+            return None
+        if token[0] == "dict_close":
+            return entries, token[2]
+        if token[0] != "name":
+            return None
+        key = bytes(pdf_buffer[token[1]:token[2]])
+        value = _next_token(pdf_buffer, token[2], end)
+        if value is None or key in entries:
+            return None
+        value_end = _skip_value(pdf_buffer, value, end)
+        if value_end is None:
+            return None
+        entries[key] = (value[1], value_end)
+        pos = value_end
+
+
+def _signature_from_buffer(reader, pdf_buffer, fq_name: str, sig_ref) -> RawSignature | None:
+    """
+    Lê o dicionário da assinatura direto do buffer: offset pela xref, chaves do
+    primeiro nível por _scan_dictionary e o CMS do intervalo que o próprio
+    ByteRange deixa de fora, que precisa ser exatamente o valor do /Contents.
+    Devolve None quando algo foge do layout usual (objeto em object stream,
+    valores indiretos, hex com espaços), e aí o chamador usa o caminho completo
+    do pyhanko.
+    """
+    if not isinstance(sig_ref, generic.IndirectObject):
+        return None
+    offset = reader.xrefs[sig_ref.reference]
+    if not isinstance(offset, int):
+        return None
+    scanned = _scan_dictionary(pdf_buffer, offset, min(len(pdf_buffer), offset + _MAX_SIG_OBJECT))
+    if scanned is None:
+        return None
+    entries, _ = scanned
+    if b"/ByteRange" not in entries or b"/Contents" not in entries:
+        return None
+
+    def value(key: bytes):
+        start, stop = entries[key]
+        return pdf_buffer[start:stop]
+
+    match = _BYTE_RANGE_RE.fullmatch(value(b"/ByteRange"))
+    if match is None:
+        return None
+    byte_range = [int(x) for x in match.groups()]
+    hole_start, hole_end = byte_range[0] + byte_range[1], byte_range[2]
+    if entries[b"/Contents"] != (hole_start, hole_end) or pdf_buffer[hole_start:hole_start + 1] != b"<":
+        return None
+    try:
+        pkcs7_content = binascii.unhexlify(pdf_buffer[hole_start + 1:hole_end - 1])
+    except (binascii.Error, ValueError):
+        return None
+
+    sig_object = {"/ByteRange": byte_range}
+    for key in (b"/Type", b"/SubFilter"):
+        if key in entries:
+            name = bytes(value(key))
+            if not name.startswith(b"/"):
+                return None
+            sig_object[key.decode()] = name.decode("latin-1")
+    if sig_object.get("/Type", "/Sig") not in ("/Sig", "/DocTimeStamp"):
+        return None
+    if b"/M" in entries:
+        signing_time = bytes(value(b"/M"))
+        if not signing_time.startswith(b"("):
+            return None
+        sig_object["/M"] = str(generic.read_string_from_stream(io.BytesIO(signing_time)))
+    return RawSignature(fq_name, sig_object, pkcs7_content, reader.xrefs.get_last_change(sig_ref.reference))
+
+
+def read_signatures(reader: PdfFileReader, pdf_buffer) -> list:
+    """
+    Assinaturas do documento em ordem de revisão, como o embedded_signatures do
+    pyhanko, mas sem passar o /Contents pelo tokenizer: dos objetos, só os campos
+    do formulário são resolvidos. Documentos criptografados e layouts fora do
+    usual usam o EmbeddedPdfSignature do pyhanko.
+    """
+    try:
+        fields = reader.root["/AcroForm"]["/Fields"]
+    except KeyError:
+        return []
+    sigs = []
+    for fq_name, field, sig_ref in _sig_fields(fields):
+        sig = None
+        if reader.encrypt_dict is None:
+            sig = _signature_from_buffer(reader, pdf_buffer, fq_name, sig_ref)
+        sigs.append(sig if sig is not None else EmbeddedPdfSignature(reader, field, fq_name))
+    sigs.sort(key=lambda s: s.signed_revision)
+    return sigs
+
+
+def open_reader(stream, pdf_buffer) -> PdfFileReader:
+    # arquivos em disco são lidos pelo mmap: só as páginas tocadas entram na memória
+    return PdfFileReader(pdf_buffer if isinstance(pdf_buffer, mmap.mmap) else stream)
+
+
+def _signature_listing(sig, file_size: int) -> dict:
+    byte_range = [int(x) for x in sig.sig_object.get("/ByteRange") or []] or None
+    subfilter = sig.sig_object.get("/SubFilter")
+    return {
+        "campo": sig.field_name,
+        "tipo": str(sig.sig_object_type).lstrip("/"),
+        "subfilter": str(subfilter).lstrip("/") if subfilter is not None else None,
+        "byte_range": byte_range,
+        "cobre_arquivo_inteiro": bool(byte_range) and byte_range[-2] + byte_range[-1] == file_size,
+        "nome_assinante": getattr(sig.signer_cert, "subject", None) and sig.signer_cert.subject.native.get("common_name"),
+        "timestamp": sig.self_reported_timestamp,
+        "md_algorithm": sig.md_algorithm,
+        "revisao": sig.signed_revision,
+    }
+
+
+def listar_assinaturas_logic(pdf) -> dict:
+    """
+    Lista as assinaturas sem validar nada. O PdfFileReader lê só o trailer e a
+    cadeia de xref a partir do fim do arquivo e o dicionário/CMS de cada
+    assinatura sai do buffer (read_signatures). O custo cresce com o número de
+    assinaturas, não com o tamanho do documento.
+    """
+    stream = as_pdf_stream(pdf)
+    pdf_buffer = buffer_of(stream)
+    try:
+        with stage("ler_pdf"):
+            sigs = read_signatures(open_reader(stream, pdf_buffer), pdf_buffer)
+            assinaturas = [_signature_listing(sig, len(pdf_buffer)) for sig in sigs]
+        observe_signatures(len(assinaturas))
+    finally:
+        release_buffer(pdf_buffer)
+    return {"assinado": bool(assinaturas), "quantidade": len(assinaturas), "assinaturas": assinaturas}
@@ -0,0 +1,183 @@
+# app/validation/originals.py
+import os
+import re
+import time
+import fcntl
+import hashlib
+import threading
+from collections import OrderedDict
+
+from ..config import Config
+
+CHUNK_SIZE = 1024 * 1024
+_ID_RE = re.compile(r"^[0-9a-f]{64}$")
+
+_cache = None
+_store = None
+_singletons_lock = threading.Lock()
+
+
+class OriginalNotFound(LookupError):
+    """`original_id` desconhecido ou expirado."""
+
+
+class OriginalCache:
+    """
+    Resumo da assinatura de referência do original do /comparar-assinatura
+    (o `original` da resposta), por processo. Chave: sha256 do arquivo + modo +
+    fingerprint do trust store; LRU com TTL, porque o status de revogação envelhece.
+    """
+
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, info: dict):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, info)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entradas": len(self._entries)}
+
+
+class OriginalStore:
+    """
+    Originais registrados em /comparar-assinatura/originais, em disco e
+    compartilhados pelos workers: <sha256>.pdf, com o mtime marcando o último uso.
+    O sha256 do arquivo é o `original_id`, então registrar o mesmo pdf de novo
+    devolve o mesmo id.
+    """
+
+    def __init__(self, directory: str, ttl: int, max_bytes: int):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock_path = os.path.join(directory, ".lock")
+
+    def _path(self, original_id: str) -> str:
+        if not _ID_RE.match(original_id or ""):
+            raise OriginalNotFound(original_id)
+        return os.path.join(self.directory, original_id + ".pdf")
+
+    def _evict(self):
+        now = time.time()
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for de in it:
+                if not de.name.endswith(".pdf"):
+                    continue
+                try:
+                    st = de.stat()
+                except FileNotFoundError:
+                    continue
+                if st.st_mtime + self.ttl <= now:
+                    self._remove(de.path)
+                    continue
+                entries.append((st.st_mtime, de.path, st.st_size))
+                total += st.st_size
+        entries.sort()
+        for _, path, size in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def put(self, stream) -> str:
+        # copia para um temporário calculando o sha256 no caminho; o nome final é o próprio hash
+        h = hashlib.sha256()
+        tmp = os.path.join(self.directory, f".tmp-{os.getpid()}-{threading.get_ident()}")
+        stream.seek(0)
+        try:
+            with open(tmp, "wb") as dst:
+                while chunk := stream.read(CHUNK_SIZE):
+                    h.update(chunk)
+                    dst.write(chunk)
+            original_id = h.hexdigest()
+            os.replace(tmp, self._path(original_id))
+        except BaseException:
+            self._remove(tmp)
+            raise
+        finally:
+            stream.seek(0)
+        with open(self._lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self._evict()
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+        return original_id
+
+    def open(self, original_id: str):
+        path = self._path(original_id)
+        try:
+            if os.path.getmtime(path) + self.ttl <= time.time():
+                self._remove(path)
+                raise OriginalNotFound(original_id)
+            f = open(path, "rb")
+            os.utime(path)
+        except FileNotFoundError:
+            raise OriginalNotFound(original_id)
+        return f
+
+    def delete(self, original_id: str) -> bool:
+        path = self._path(original_id)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def stats(self) -> dict:
+        sizes = [de.stat().st_size for de in os.scandir(self.directory) if de.name.endswith(".pdf")]
+        return {"registrados": len(sizes), "bytes": sum(sizes)}
+
+
+def get_original_cache() -> OriginalCache:
+    # lido de Config (e não do current_app) porque também roda nos processos do pool e da CLI
+    global _cache
+    if _cache is None:
+        with _singletons_lock:
+            if _cache is None:
+                _cache = OriginalCache(Config.ORIGINALS_CACHE_MAX_ENTRIES, Config.ORIGINALS_CACHE_TTL)
+    return _cache
+
+
+def get_original_store() -> OriginalStore:
+    global _store
+    if _store is None:
+        with _singletons_lock:
+            if _store is None:
+                _store = OriginalStore(Config.ORIGINALS_DIR, Config.ORIGINALS_TTL, Config.ORIGINALS_MAX_BYTES)
+    return _store
@@ -1,168 +1,224 @@
 # app/validation/routes.py
-import io
-import base64
 import traceback
-from flask import request, jsonify
-from pyhanko.pdf_utils.reader import PdfFileReader
-from pyhanko.sign import validation
+from flask import request, jsonify, current_app
 import logging
 from ..config import Config
-from .service import _signed_content_from_byte_range, _extract_byte_range, _canonical_sha256, _digest_with_algo
+from .service import (validar_pdf_logic, validar_pdf_item, comparar_assinatura_logic, registrar_original_logic,
+                      OriginalNotSigned, MODE_FULL, VALIDATION_MODES)
+from .listing import listar_assinaturas_logic
+from .cache import get_validation_cache
+from .trust import get_trust_store_manager
+from .originals import get_original_cache, get_original_store, OriginalNotFound
+from ..pool import map_isolated
+from ..metrics import stage
+from .. import deadline
+from ..jobs.routes import enqueue
+from ..uploads import request_params, load_pdf_input, wants_async_job, PdfInput
 from . import validation_bp
 
+
+def _validation_mode(params) -> str | None:
+    # "completo" (padrão) ou "integridade"; None para valores desconhecidos
+    modo = (params.get('modo') if isinstance(params, dict) else None) or MODE_FULL
+    return modo if modo in VALIDATION_MODES else None
+
+
+def _invalid_mode():
+    return jsonify({'status': 'erro', 'message': f'"modo" deve ser um de: {", ".join(VALIDATION_MODES)}.'}), 400
+
 @validation_bp.route('/validar-pades', methods=['POST'])
 def validar_pades():
-    json_data = request.get_json(silent=True)
-    if not json_data or 'pdf_base64' not in json_data:
-        return jsonify({'status': 'erro', 'message': 'A chave "pdf_base64" é obrigatória.'}), 400
+    pdf = None
+    try:
+        with stage('entrada'):
+            json_data = request_params(silent=True)
+            pdf = load_pdf_input(json_data, 'pdf_base64', 'pdf')
+        if pdf is None:
+            return jsonify({'status': 'erro', 'message': 'A chave "pdf_base64" (ou o pdf binário) é obrigatória.'}), 400
+        modo = _validation_mode(json_data)
+        if modo is None:
+            return _invalid_mode()
+
+        if wants_async_job(json_data):
+            return enqueue('validar', {'modo': modo}, {'pdf': pdf.stream})
+
+        result = validar_pdf_logic(pdf.stream, modo)
+        with stage('resposta'):
+            return jsonify(result), deadline.status_code(result)
+
+    except Exception as e:
+        tb = traceback.format_exc()
+        logging.error(tb)
+        return jsonify({'status': 'erro', 'message': f'Ocorreu um erro ao processar o PDF: {e}', 'traceback': tb}), 500
+
+    finally:
+        if pdf is not None:
+            pdf.close()
 
+@validation_bp.route('/listar-assinaturas', methods=['POST'])
+def listar_assinaturas():
+    # pré-filtro barato: campos, ByteRanges e assinante, sem validação criptográfica
+    pdf = None
     try:
-        pdf_bytes = base64.b64decode(json_data['pdf_base64'])
+        with stage('entrada'):
+            json_data = request_params(silent=True)
+            pdf = load_pdf_input(json_data, 'pdf_base64', 'pdf')
+        if pdf is None:
+            return jsonify({'status': 'erro', 'message': 'A chave "pdf_base64" (ou o pdf binário) é obrigatória.'}), 400
+
+        result = listar_assinaturas_logic(pdf.stream)
+        with stage('resposta'):
+            return jsonify(result), 200
 
-        reader = PdfFileReader(io.BytesIO(pdf_bytes))
+    except Exception as e:
+        tb = traceback.format_exc()
+        logging.error(tb)
+        return jsonify({'status': 'erro', 'message': f'Ocorreu um erro ao ler o PDF: {e}', 'traceback': tb}), 500
 
-        # Verifica se há assinaturas no PDF
-        if not reader.embedded_signatures:
-            return jsonify({'assinado': False,
-                            'message': 'O documento PDF não contém nenhuma assinatura.'}), 200
+    finally:
+        if pdf is not None:
+            pdf.close()
 
-        validation_results = []
-        for sig in reader.embedded_signatures:
-            status = validation.validate_pdf_signature(sig, signer_validation_context=Config.VC, skip_diff=True)
+@validation_bp.route('/validar-pades/lote', methods=['POST'])
+def validar_pades_lote():
+    json_data = request.get_json(silent=True)
+    documentos = json_data.get('documentos') if isinstance(json_data, dict) else None
+    if not isinstance(documentos, list) or not documentos:
+        return jsonify({'status': 'erro', 'message': 'A chave "documentos" (lista de {pdf_base64}) é obrigatória.'}), 400
 
-            validation_results.append({
-                'nome_assinante': getattr(sig.signer_cert, 'subject', None) and sig.signer_cert.subject.native.get("common_name"),
-                'timestamp': getattr(status, 'signer_reported_dt', None),
-                'valido': bool(getattr(status, 'valid', False)),
-                'intacto': bool(getattr(status, 'intact', None)),
-                'pkcs7_signature_mechanism': getattr(status, 'pkcs7_signature_mechanism', None),
-                'md_algorithm': getattr(status, 'md_algorithm', None),
-                'resumo_validacao': status.summary() if hasattr(status, 'summary') else None,
-                'erros': [str(e) for e in getattr(status, 'errors', [])] if getattr(status, 'errors', None) else [],
-                'avisos': [str(w) for w in getattr(status, 'warnings', [])] if getattr(status, 'warnings', None) else [],
-            })
+    max_items = current_app.config.get('BATCH_MAX_ITEMS', Config.BATCH_MAX_ITEMS)
+    if len(documentos) > max_items:
+        return jsonify({'status': 'erro', 'message': f'O lote aceita no máximo {max_items} documentos.'}), 413
+    modo = _validation_mode(json_data)
+    if modo is None:
+        return _invalid_mode()
 
-        return jsonify({'assinado': True, 'validacoes': validation_results}), 200
+    try:
+        # aceita tanto {"pdf_base64": ...} quanto a string base64 direto
+        args_list = [((doc.get('pdf_base64') if isinstance(doc, dict) else doc), modo) for doc in documentos]
+        results = map_isolated(validar_pdf_item, args_list, deadline.remaining())
+        response = {'resultados': [{'indice': i, **r} for i, r in enumerate(results)], **deadline.batch_info(results)}
+        return jsonify(response), deadline.status_code(response)
 
     except Exception as e:
         tb = traceback.format_exc()
         logging.error(tb)
-        return jsonify({'status': 'erro', 'message': f'Ocorreu um erro ao processar o PDF: {e}', 'traceback': tb}), 500
+        return jsonify({'status': 'erro', 'message': f'Ocorreu um erro ao processar o lote: {e}', 'traceback': tb}), 500
 
 @validation_bp.route('/comparar-assinatura', methods=['POST'])
 def comparar_assinatura():
-    json_data = request.get_json(silent=True)
-    if not json_data or 'pdf_original_b64' not in json_data or 'pdf_validar_b64' not in json_data:
-        return jsonify({
-            'status': 'erro',
-            'message': 'As chaves "pdf_original_b64" e "pdf_validar_b64" (base64) são obrigatórias.'
-        }), 400
-
+    original = validar = None
     try:
-        pdf_original_b64 = json_data['pdf_original_b64']
-        pdf_para_validar_b64 = json_data['pdf_validar_b64']
-
-        original_bytes = base64.b64decode(pdf_original_b64)
-        validar_bytes = base64.b64decode(pdf_para_validar_b64)
-
-        # readers
-        reader_orig = PdfFileReader(io.BytesIO(original_bytes))
-        reader_val = PdfFileReader(io.BytesIO(validar_bytes))
-
-        if not reader_orig.embedded_signatures:
-            return jsonify({'status': 'erro', 'message': 'O pdf original não contém assinatura.'}), 400
-
-        original_signatures = list(reader_orig.embedded_signatures)
-        original_multi = len(original_signatures) > 1
-        ref_sig = original_signatures[0]
-
-        orig_status = validation.validate_pdf_signature(ref_sig, signer_validation_context=Config.VC, skip_diff=True)
-
-        # extrair conteúdo assinado do original
-        orig_br = _extract_byte_range(ref_sig)
-        orig_signed_content = _signed_content_from_byte_range(original_bytes, orig_br) if orig_br else None
-        orig_canonical = _canonical_sha256(orig_signed_content) if orig_signed_content is not None else None
-
-        # também tenta calcular o digest com o algoritmo da assinatura (se disponível)
-        orig_md_algo = getattr(orig_status, 'md_algorithm', None) if orig_status is not None else None
-        orig_algo_digest = _digest_with_algo(orig_signed_content, orig_md_algo)
-
-        # preparar resposta do original
-        original_info = {
-            'assinado': True,
-            'assinaturas_totais': len(original_signatures),
-            'original_multi': original_multi,
-            'nome_assinante': getattr(ref_sig.signer_cert, 'subject', None) and ref_sig.signer_cert.subject.native.get("common_name"),
-            'valido': bool(getattr(orig_status, 'valid', False)) if orig_status is not None else None,
-            'intacto': bool(getattr(orig_status, 'intact', False)) if orig_status is not None else None,
-            'md_algorithm': orig_md_algo,
-            'digest_algo_hexdigest': orig_algo_digest,
-            'canonical_sha256': orig_canonical,
-            'byte_range': orig_br,
-        }
-
-        # processar assinaturas do pdfParaValidar
-        validar_signatures = list(reader_val.embedded_signatures) if reader_val.embedded_signatures else []
-        if not validar_signatures:
+        with stage('entrada'):
+            json_data = request_params(silent=True)
+            # original_id: original registrado em /comparar-assinatura/originais (não precisa reenviar o pdf)
+            original_id = json_data.get('original_id') if isinstance(json_data, dict) else None
+            if original_id:
+                original = PdfInput(get_original_store().open(original_id))
+            else:
+                original = load_pdf_input(json_data, 'pdf_original_b64', 'pdf_original')
+            validar = load_pdf_input(json_data, 'pdf_validar_b64', 'pdf_validar')
+        if original is None or validar is None:
             return jsonify({
                 'status': 'erro',
-                'message': 'pdf enviado para validar não contém assinaturas.',
-            }), 200
-
-        results = []
-        any_match = False
-        for idx, sig in enumerate(validar_signatures):
-            try:
-                st = validation.validate_pdf_signature(sig, signer_validation_context=Config.VC, skip_diff=True)
-            except Exception:
-                st = None
-
-            br = _extract_byte_range(sig)
-            signed_content = _signed_content_from_byte_range(validar_bytes, br) if br else None
-            canonical = _canonical_sha256(signed_content) if signed_content is not None else None
-
-            md_algo = getattr(st, 'md_algorithm', None) if st is not None else None
-            algo_digest = _digest_with_algo(signed_content, md_algo)
-
-            matches_original = False
-            # se temos canonical para ambos, comparar by canonical (SHA-256)
-            if orig_canonical is not None and canonical is not None:
-                matches_original = (orig_canonical == canonical)
-            else:
-                # fallback: se ambos têm digest pelo algoritmo declarado e os algoritmos coincidem, comparar esses digests
-                if orig_algo_digest and algo_digest and (orig_md_algo and md_algo) and (orig_md_algo == md_algo):
-                    matches_original = (orig_algo_digest == algo_digest)
-                else:
-                    matches_original = False
-
-            if matches_original:
-                any_match = True
-
-            results.append({
-                'nome_assinante': getattr(sig.signer_cert, 'subject', None) and sig.signer_cert.subject.native.get("common_name"),
-                'valido': bool(getattr(st, 'valid', False)) if st is not None else None,
-                'intacto': bool(getattr(st, 'intact', False)) if st is not None else None,
-                'md_algorithm': md_algo,
-                'digest_algo_hexdigest': algo_digest,
-                'canonical_sha256': canonical,
-                'byte_range': br,
-                'matches_original': matches_original,
-                'resumo_validacao': st.summary() if (st is not None and hasattr(st, 'summary')) else None,
-                'erros': [str(e) for e in getattr(st, 'errors', [])] if (st is not None and getattr(st, 'errors', None)) else [],
-                'avisos': [str(w) for w in getattr(st, 'warnings', [])] if (st is not None and getattr(st, 'warnings', None)) else [],
-            })
-
-        return jsonify({
-            'status': 'sucesso',
-            'match': any_match,
-            'original': original_info,
-            'para_validar': {
-                'assinado': True,
-                'signatures': results,
-            }
-        }), 200
+                'message': 'As chaves "pdf_original_b64" (ou "original_id") e "pdf_validar_b64" (base64) são obrigatórias.'
+            }), 400
+        modo = _validation_mode(json_data)
+        if modo is None:
+            return _invalid_mode()
+
+        if wants_async_job(json_data):
+            return enqueue('comparar', {'modo': modo}, {'original': original.stream, 'validar': validar.stream})
+
+        result = comparar_assinatura_logic(original.stream, validar.stream, modo, original_id or None)
+        with stage('resposta'):
+            return jsonify(result), deadline.status_code(result)
+
+    except OriginalNotFound:
+        return jsonify({'status': 'erro', 'message': '"original_id" desconhecido ou expirado; registre o original de novo.'}), 404
+
+    except OriginalNotSigned:
+        return jsonify({'status': 'erro', 'message': 'O pdf original não contém assinatura.'}), 400
 
     except Exception as e:
         tb = traceback.format_exc()
         logging.error(tb)
         return jsonify({'status': 'erro', 'message': f'Ocorreu um erro ao comparar assinaturas: {e}', 'traceback': tb}), 500
+
+    finally:
+        for pdf in (original, validar):
+            if pdf is not None:
+                pdf.close()
+
+
+@validation_bp.route('/comparar-assinatura/originais', methods=['POST'])
+def registrar_original():
+    # registra o original uma vez; as comparações seguintes mandam só "original_id" e o pdf candidato
+    original = None
+    try:
+        with stage('entrada'):
+            json_data = request_params(silent=True)
+            original = load_pdf_input(json_data, 'pdf_original_b64', 'pdf_original')
+        if original is None:
+            return jsonify({'status': 'erro', 'message': 'A chave "pdf_original_b64" (ou o pdf binário) é obrigatória.'}), 400
+        modo = _validation_mode(json_data)
+        if modo is None:
+            return _invalid_mode()
+
+        result = registrar_original_logic(original.stream, modo)
+        return jsonify(result), 200
+
+    except OriginalNotSigned:
+        return jsonify({'status': 'erro', 'message': 'O pdf original não contém assinatura.'}), 400
+
+    except Exception as e:
+        tb = traceback.format_exc()
+        logging.error(tb)
+        return jsonify({'status': 'erro', 'message': f'Ocorreu um erro ao registrar o original: {e}', 'traceback': tb}), 500
+
+    finally:
+        if original is not None:
+            original.close()
+
+@validation_bp.route('/comparar-assinatura/originais/<original_id>', methods=['DELETE'])
+def remover_original(original_id):
+    try:
+        removed = get_original_store().delete(original_id)
+    except OriginalNotFound:
+        removed = False
+    if not removed:
+        return jsonify({'status': 'erro', 'message': 'original não registrado'}), 404
+    return jsonify({'status': 'sucesso'}), 200
+
+@validation_bp.route('/comparar-assinatura/originais', methods=['GET'])
+def originais():
+    # cache_resumos é deste worker; os registrados são compartilhados
+    return jsonify({**get_original_store().stats(), 'cache_resumos': get_original_cache().stats()}), 200
+
+
+@validation_bp.route('/validar-pades/cache', methods=['GET'])
+def cache_validacao():
+    cache = get_validation_cache()
+    if cache is None:
+        return jsonify({'habilitado': False}), 200
+    return jsonify({'habilitado': True, **cache.stats()}), 200
+
+@validation_bp.route('/validar-pades/cache', methods=['DELETE'])
+def invalidar_cache_validacao():
+    # usar quando a configuração de confiança mudar fora do fingerprint (ex.: CRLs locais)
+    cache = get_validation_cache()
+    if cache is not None:
+        cache.invalidate()
+    return jsonify({'status': 'sucesso'}), 200
+
+
+@validation_bp.route('/validar-pades/trust-store', methods=['GET'])
+def trust_store():
+    return jsonify(get_trust_store_manager().stats()), 200
+
+@validation_bp.route('/validar-pades/trust-store/recarregar', methods=['POST'])
+def recarregar_trust_store():
+    # o diretório já é recarregado sozinho quando muda; isto força a releitura neste worker
+    manager = get_trust_store_manager()
+    manager.reload()
+    return jsonify(manager.stats()), 200
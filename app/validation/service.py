@@ -1,4 +1,27 @@
 import hashlib
+from contextlib import ExitStack
+from pyhanko.pdf_utils.reader import PdfFileReader
+from pyhanko.sign import validation
+from pyhanko.sign.validation.generic_cms import validate_sig_integrity
+from pyhanko.sign.validation.status import StandardCMSSignatureStatus, SignatureCoverageLevel
+
+from ..utils import run_sync, as_pdf_stream, buffer_of, release_buffer
+from .cache import get_validation_cache
+from .trust import current_validation_context, trust_fingerprint, document_certificates
+from .listing import read_signatures, open_reader
+from .originals import get_original_cache, get_original_store
+from ..metrics import stage, observe_signatures
+from .. import deadline
+
+# "completo": cadeia de confiança, revogação e pyhanko inteiro; "integridade": só digest e valor da assinatura
+MODE_FULL = 'completo'
+MODE_INTEGRITY = 'integridade'
+VALIDATION_MODES = (MODE_FULL, MODE_INTEGRITY)
+
+
+class OriginalNotSigned(ValueError):
+    """O pdf original do /comparar-assinatura não contém assinatura."""
+
 
 def _extract_byte_range(sig):
     br_obj = sig.sig_object.get('/ByteRange')
@@ -10,34 +33,522 @@ def _extract_byte_range(sig):
     return [int(x) for x in br_obj]
 
 
-def _signed_content_from_byte_range(pdf_bytes: bytes, byte_range: list[int]) -> bytes | None:
+HASH_CHUNK_SIZE = 256 * 1024
+
+
+def _hash_byte_range(pdf_bytes, byte_range: list[int], algos) -> dict[str, bytes] | None:
+    """
+    Calcula, numa única passada, o digest de cada algoritmo em `algos` sobre o
+    conteúdo coberto pelo ByteRange. Os segmentos são percorridos via memoryview
+    em blocos de HASH_CHUNK_SIZE (sem montar a concatenação) e cada bloco alimenta
+    todos os hashers enquanto ainda está em cache.
+    """
     if not byte_range or len(byte_range) % 2 != 0:
         return None
-    parts = []
-    try:
-        for i in range(0, len(byte_range), 2):
-            off = int(byte_range[i])
-            ln = int(byte_range[i + 1])
-            if off < 0 or ln < 0 or off + ln > len(pdf_bytes):
-                return None
-            parts.append(pdf_bytes[off: off + ln])
-        return b"".join(parts)
-    except Exception:
-        return None
+    view = memoryview(pdf_bytes)
+    segments = []
+    for i in range(0, len(byte_range), 2):
+        off = int(byte_range[i])
+        ln = int(byte_range[i + 1])
+        if off < 0 or ln < 0 or off + ln > len(view):
+            return None
+        segments.append((off, off + ln))
+
+    hashers = _new_hashers(algos)
+    updates = [h.update for h in hashers.values()]
+    for start, end in segments:
+        _feed(view, start, end, updates)
+    return {algo: h.digest() for algo, h in hashers.items()}
+
+
+def _feed(view, start: int, end: int, updates):
+    for pos in range(start, end, HASH_CHUNK_SIZE):
+        chunk = view[pos: min(pos + HASH_CHUNK_SIZE, end)]
+        for update in updates:
+            update(chunk)
+
+
+def _new_hashers(algos) -> dict:
+    hashers = {}
+    for algo in algos:
+        if algo and algo not in hashers:
+            try:
+                hashers[algo] = hashlib.new(algo)
+            except (ValueError, TypeError):
+                continue
+    return hashers
+
+
+def _hash_nested_byte_ranges(pdf_bytes, byte_ranges: list, algos_per_range: list) -> list:
+    """
+    Digests de várias assinaturas de revisões incrementais num único passe.
+
+    No ByteRange padrão [0, a, b, n] a assinatura cobre o arquivo até `a`, pula o
+    /Contents e cobre [b, b+n). Ordenando por `a`, um hasher "corrido" percorre o
+    arquivo uma vez; em cada `a` o estado é copiado (hash.copy()) e a cópia só
+    precisa receber o trecho final [b, b+n) da própria revisão. O custo total fica
+    O(tamanho do arquivo + caudas) em vez de O(assinaturas × tamanho do arquivo).
+    ByteRanges fora do padrão caem no _hash_byte_range individual.
+    """
+    view = memoryview(pdf_bytes)
+    results = [None] * len(byte_ranges)
+    nested = []
+    for idx, br in enumerate(byte_ranges):
+        if (br and len(br) == 4 and br[0] == 0 and min(br) >= 0
+                and br[1] <= br[2] and br[2] + br[3] <= len(view)):
+            nested.append((br[1], idx))
+        else:
+            results[idx] = _hash_byte_range(pdf_bytes, br, algos_per_range[idx])
+    if not nested:
+        return results
+
+    nested.sort()
+    running = _new_hashers(a for _, idx in nested for a in algos_per_range[idx])
+    running_updates = [h.update for h in running.values()]
+    pos = 0
+    for hole_start, idx in nested:
+        _feed(view, pos, hole_start, running_updates)
+        pos = hole_start
+        snapshot = {algo: running[algo].copy() for algo in dict.fromkeys(algos_per_range[idx]) if algo in running}
+        tail_start = byte_ranges[idx][2]
+        _feed(view, tail_start, tail_start + byte_ranges[idx][3], [h.update for h in snapshot.values()])
+        results[idx] = {algo: h.digest() for algo, h in snapshot.items()}
+    return results
+
+
+def _signature_algos(sig) -> tuple:
+    return 'sha256', sig.md_algorithm, sig.external_md_algorithm
+
+
+def _seed_digest(sig, digests):
+    # o digest do algoritmo externo é repassado ao pyhanko, que assim não refaz o hash na validação
+    if digests and sig.external_md_algorithm in digests:
+        sig.external_digests.setdefault(sig.external_md_algorithm, digests[sig.external_md_algorithm])
 
 
-def _canonical_sha256(data: bytes) -> str:
-    h = hashlib.sha256()
-    h.update(data)
-    return h.hexdigest()
+def _signature_digests(sig, pdf_buffer) -> dict[str, bytes] | None:
+    """
+    Digests do ByteRange de uma assinatura: SHA-256 canônico e o(s) algoritmo(s)
+    declarado(s) no CMS.
+    """
+    with stage("hash_byterange"):
+        digests = _hash_byte_range(pdf_buffer, _extract_byte_range(sig), _signature_algos(sig))
+    _seed_digest(sig, digests)
+    return digests
 
 
-def _digest_with_algo(data: bytes, algo_name: str) -> str | None:
-    if data is None or algo_name is None:
+def _signatures_digests(sigs: list, pdf_buffer) -> list:
+    """Como _signature_digests, mas para todas as assinaturas do documento num único passe."""
+    with stage("hash_byterange"):
+        all_digests = _hash_nested_byte_ranges(
+            pdf_buffer, [_extract_byte_range(sig) for sig in sigs], [_signature_algos(sig) for sig in sigs]
+        )
+    for sig, digests in zip(sigs, all_digests):
+        _seed_digest(sig, digests)
+    return all_digests
+
+
+def _hexdigest(digests: dict[str, bytes] | None, algo_name: str | None) -> str | None:
+    if not digests or algo_name is None or algo_name not in digests:
         return None
+    return digests[algo_name].hex()
+
+
+def _signature_summary(sig, status) -> dict:
+    # só a parte que não depende do documento (CMS, certificado do assinante, carimbos): é o que vai para o cache
+    return {
+        'nome_assinante': getattr(sig.signer_cert, 'subject', None) and sig.signer_cert.subject.native.get("common_name"),
+        'timestamp': getattr(status, 'signer_reported_dt', None),
+        'valido': bool(getattr(status, 'valid', False)),
+        'intacto': bool(getattr(status, 'intact', None)),
+        'pkcs7_signature_mechanism': getattr(status, 'pkcs7_signature_mechanism', None),
+        'md_algorithm': getattr(status, 'md_algorithm', None),
+        'campos_resumo': list(StandardCMSSignatureStatus.summary_fields(status)),
+        'erros': [str(e) for e in getattr(status, 'errors', [])] if getattr(status, 'errors', None) else [],
+        'avisos': [str(w) for w in getattr(status, 'warnings', [])] if getattr(status, 'warnings', None) else [],
+    }
+
+
+def _coverage_fields(coverage, docmdp_ok) -> list[str]:
+    """
+    Parte do resumo do pyhanko (PdfSignatureStatus.summary_fields) que depende do
+    documento: cobertura do ByteRange e alterações depois da revisão assinada.
+    A análise de diferenças não roda (skip_diff), então não há modification_level.
+    """
+    if coverage == SignatureCoverageLevel.ENTIRE_FILE:
+        fields = ['UNTOUCHED']
+    elif coverage == SignatureCoverageLevel.ENTIRE_REVISION:
+        fields = ['EXTENDED']
+    else:
+        fields = ['NONSTANDARD_COVERAGE']
+    if not docmdp_ok:
+        fields.append('ILLEGAL_MODIFICATIONS')
+    elif coverage != SignatureCoverageLevel.ENTIRE_FILE:
+        fields.append('ACCEPTABLE_MODIFICATIONS')
+    return fields
+
+
+def _with_coverage(summary: dict, coverage, docmdp_ok) -> dict:
+    # monta o resumo_validacao como o PdfSignatureStatus.summary() do pyhanko
+    result = {k: v for k, v in summary.items() if k != 'campos_resumo'}
+    if summary['intacto'] and summary['valido']:
+        result['resumo_validacao'] = 'INTACT:' + ','.join(summary['campos_resumo'] + _coverage_fields(coverage, docmdp_ok))
+    else:
+        result['resumo_validacao'] = 'INVALID'
+    return result
+
+
+async def validate_signature_cached_async(sig, digests: dict[str, bytes] | None) -> dict:
+    """
+    Resumo da validação de uma assinatura embutida, consultando antes o cache
+    compartilhado (a mesma assinatura no mesmo conteúdo não é validada de novo).
+    O cache guarda só a validação do CMS e do certificado; cobertura e alterações
+    posteriores dependem dos bytes depois do ByteRange e são recalculadas em cada
+    documento. `digests` vem de _signature_digests.
+    """
+    cache = get_validation_cache()
+    key = None
+    if cache is not None and digests and 'sha256' in digests:
+        key = cache.make_key(digests['sha256'], sig.pkcs7_content, trust_fingerprint())
+        cached = cache.get(key)
+        if cached is not None:
+            sig.compute_integrity_info(skip_diff=True)
+            integrity = sig.summarise_integrity_info()
+            return _with_coverage(cached, integrity['coverage'], integrity['docmdp_ok'])
+
+    # os certificados do CMS valem só para esta assinatura, não entram no contexto compartilhado
+    with stage("validar_assinatura"), document_certificates():
+        status = await validation.async_validate_pdf_signature(
+            sig, signer_validation_context=current_validation_context(), skip_diff=True
+        )
+    summary = _signature_summary(sig, status)
+    if key is not None:
+        cache.put(key, summary)
+    return _with_coverage(summary, status.coverage, status.docmdp_ok)
+
+
+def validate_signature_cached(sig, digests: dict[str, bytes] | None) -> dict:
+    return run_sync(validate_signature_cached_async(sig, digests))
+
+
+def check_signature_integrity(sig, digests: dict[str, bytes] | None) -> dict:
+    """
+    Verificação só de integridade: o digest do ByteRange (já calculado no passe
+    único de _signatures_digests) precisa bater com o messageDigest assinado e o
+    valor da assinatura precisa conferir com a chave pública do certificado
+    embutido. Não constrói nem valida cadeia, não consulta revogação e não faz a
+    análise de alterações posteriores, então `valido` fica None.
+    """
+    digest_ok = signature_ok = False
+    mecanismo = None
+    erros = []
+    with stage("verificar_integridade"):
+        try:
+            signer_info = sig.signer_info
+            mecanismo = signer_info['signature_algorithm']['algorithm'].native
+            eci = sig.signed_data['encap_content_info']
+            content_type = eci['content_type'].native
+            actual_digest = digests.get(sig.external_md_algorithm) if digests else None
+            if actual_digest is None:
+                raise ValueError('ByteRange inválido ou algoritmo de digest não suportado')
+            if content_type == 'tst_info':
+                # carimbo do documento: o ByteRange vai no messageImprint do TSTInfo e o messageDigest cobre o TSTInfo
+                imprint_ok = eci['content'].parsed['message_imprint']['hashed_message'].native == actual_digest
+                tst_digest = hashlib.new(sig.md_algorithm, eci['content'].contents).digest()
+                tst_ok, signature_ok = validate_sig_integrity(signer_info, sig.signer_cert, content_type, tst_digest)
+                digest_ok = imprint_ok and tst_ok
+            else:
+                digest_ok, signature_ok = validate_sig_integrity(signer_info, sig.signer_cert, content_type, actual_digest)
+        except Exception as e:
+            erros.append(str(e))
+
     try:
-        h = hashlib.new(algo_name)
-        h.update(data)
-        return h.hexdigest()
+        nome_assinante = sig.signer_cert.subject.native.get("common_name")
+        timestamp = sig.self_reported_timestamp
     except Exception:
-        return None
\ No newline at end of file
+        nome_assinante = timestamp = None
+    intacto = digest_ok and signature_ok
+    return {
+        'modo': MODE_INTEGRITY,
+        'nome_assinante': nome_assinante,
+        'timestamp': timestamp,
+        'valido': None,
+        'intacto': intacto,
+        'digest_confere': digest_ok,
+        'assinatura_confere': signature_ok,
+        'pkcs7_signature_mechanism': mecanismo,
+        'md_algorithm': sig.md_algorithm,
+        'resumo_validacao': ('INTACT' if intacto else 'INTEGRITY_FAILED') + ' (cadeia de confiança não avaliada)',
+        'erros': erros,
+        'avisos': [],
+    }
+
+
+async def check_signature_async(sig, digests: dict[str, bytes] | None, modo: str) -> dict:
+    if modo == MODE_INTEGRITY:
+        return check_signature_integrity(sig, digests)
+    return await validate_signature_cached_async(sig, digests)
+
+
+def _not_evaluated(sig) -> dict:
+    # assinatura que ficou de fora porque o prazo da requisição acabou
+    return {
+        'campo': sig.field_name,
+        'nome_assinante': getattr(sig.signer_cert, 'subject', None) and sig.signer_cert.subject.native.get("common_name"),
+        'avaliado': False,
+        'valido': None,
+        'intacto': None,
+        'md_algorithm': sig.md_algorithm,
+        'resumo_validacao': 'NAO_AVALIADA (prazo da requisição esgotado)',
+        'erros': [],
+        'avisos': [],
+    }
+
+
+async def _check_signatures(sigs: list, all_digests: list, modo: str) -> list:
+    # em ordem; depois que o prazo da requisição acaba, as restantes entram como não avaliadas
+    return [await _check_or_not_evaluated(sig, digests, modo) for sig, digests in zip(sigs, all_digests)]
+
+
+async def _check_or_not_evaluated(sig, digests: dict[str, bytes] | None, modo: str) -> dict:
+    # o prazo é checado antes de cada assinatura; a validação que já começou vai até o fim
+    if deadline.exceeded("validar_assinatura"):
+        return _not_evaluated(sig)
+    return await check_signature_async(sig, digests, modo)
+
+
+def _with_deadline_info(response: dict, results: list) -> dict:
+    nao_avaliadas = sum(1 for r in results if r.get('avaliado') is False)
+    if nao_avaliadas:
+        response['prazo_esgotado'] = True
+        response['nao_avaliadas'] = nao_avaliadas
+    return response
+
+
+async def _validar_integridade_async(stream) -> dict:
+    # modo integridade: assinaturas lidas direto do buffer (read_signatures, que cai no EmbeddedPdfSignature
+    # quando o dicionário foge do usual) e nada de pyhanko.validation
+    pdf_buffer = buffer_of(stream)
+    try:
+        with stage("ler_pdf"):
+            sigs = read_signatures(open_reader(stream, pdf_buffer), pdf_buffer)
+        observe_signatures(len(sigs))
+        if not sigs:
+            return {'assinado': False, 'modo': MODE_INTEGRITY,
+                    'message': 'O documento PDF não contém nenhuma assinatura.'}
+        if deadline.exceeded("hash_byterange"):
+            validation_results = [_not_evaluated(sig) for sig in sigs]
+        else:
+            validation_results = await _check_signatures(sigs, _signatures_digests(sigs, pdf_buffer), MODE_INTEGRITY)
+    finally:
+        release_buffer(pdf_buffer)
+    return _with_deadline_info({'assinado': True, 'modo': MODE_INTEGRITY, 'validacoes': validation_results}, validation_results)
+
+
+async def _validar_pdf_async(pdf, modo: str = MODE_FULL) -> dict:
+    # pdf: base64 ou stream binário seekable
+    stream = as_pdf_stream(pdf)
+    if modo == MODE_INTEGRITY:
+        return await _validar_integridade_async(stream)
+    with stage("ler_pdf"):
+        reader = PdfFileReader(stream)
+        sigs = list(reader.embedded_signatures)
+    observe_signatures(len(sigs))
+
+    # Verifica se há assinaturas no PDF
+    if not sigs:
+        return {'assinado': False,
+                'message': 'O documento PDF não contém nenhuma assinatura.'}
+
+    pdf_buffer = buffer_of(stream)
+    try:
+        if deadline.exceeded("hash_byterange"):
+            validation_results = [_not_evaluated(sig) for sig in sigs]
+        else:
+            validation_results = await _check_signatures(sigs, _signatures_digests(sigs, pdf_buffer), modo)
+    finally:
+        release_buffer(pdf_buffer)
+
+    return _with_deadline_info({'assinado': True, 'validacoes': validation_results}, validation_results)
+
+
+def validar_pdf_logic(pdf, modo: str = MODE_FULL) -> dict:
+    return run_sync(_validar_pdf_async(pdf, modo))
+
+
+def validar_pdf_item(pdf_b64: str, modo: str = MODE_FULL) -> dict:
+    # item do /validar-pades/lote, executado nos processos do pool; erros ficam isolados no item
+    if not pdf_b64:
+        return {'status': 'erro', 'message': 'A chave "pdf_base64" é obrigatória.'}
+    try:
+        return {'status': 'sucesso', **validar_pdf_logic(pdf_b64, modo)}
+    except Exception as e:
+        return {'status': 'erro', 'message': f'Ocorreu um erro ao processar o PDF: {e}'}
+
+
+async def _original_info_async(original_stream, original_bytes, modo: str) -> dict:
+    # resumo da assinatura de referência (a primeira) do original: o `original` da resposta
+    with stage("ler_pdf"):
+        if modo == MODE_INTEGRITY:
+            original_signatures = read_signatures(open_reader(original_stream, original_bytes), original_bytes)
+        else:
+            original_signatures = list(PdfFileReader(original_stream).embedded_signatures)
+    if not original_signatures:
+        raise OriginalNotSigned()
+
+    ref_sig = original_signatures[0]
+
+    # um único passe no ByteRange: SHA-256 canônico + algoritmo da assinatura
+    orig_digests = _signature_digests(ref_sig, original_bytes)
+    orig_status = await _check_or_not_evaluated(ref_sig, orig_digests, modo)
+    orig_md_algo = orig_status['md_algorithm']
+
+    original_info = {
+        'assinado': True,
+        'assinaturas_totais': len(original_signatures),
+        'original_multi': len(original_signatures) > 1,
+        'nome_assinante': orig_status['nome_assinante'],
+        'valido': orig_status['valido'],
+        'intacto': orig_status['intacto'],
+        'md_algorithm': orig_md_algo,
+        'digest_algo_hexdigest': _hexdigest(orig_digests, orig_md_algo),
+        'canonical_sha256': _hexdigest(orig_digests, 'sha256'),
+        'byte_range': _extract_byte_range(ref_sig),
+    }
+    if orig_status.get('avaliado') is False:
+        original_info['avaliado'] = False
+    return original_info
+
+
+async def original_info_cached_async(original_stream, original_bytes, modo: str,
+                                     original_sha256: str | None = None) -> dict:
+    """
+    `_original_info_async` consultando antes o cache por processo, pelo sha256 do
+    arquivo (ou o `original_id` já conhecido): comparações seguidas contra o mesmo
+    original só pagam pelo candidato.
+    """
+    if original_sha256 is None:
+        with stage("hash_original"):
+            original_sha256 = hashlib.sha256(original_bytes).hexdigest()
+    cache = get_original_cache()
+    key = (original_sha256, modo, trust_fingerprint())
+    original_info = cache.get(key)
+    if original_info is None:
+        original_info = await _original_info_async(original_stream, original_bytes, modo)
+        # resultado parcial (prazo esgotado) não vai para o cache
+        if original_info.get('avaliado') is not False:
+            cache.put(key, original_info)
+    return dict(original_info)
+
+
+async def _comparar_assinatura_async(original, validar, modo: str = MODE_FULL,
+                                          original_sha256: str | None = None) -> dict:
+    # original/validar: base64 ou stream binário seekable; original_sha256: `original_id` de um original registrado
+    original_stream = as_pdf_stream(original)
+    validar_stream = as_pdf_stream(validar)
+
+    with ExitStack() as stack:
+        # buffers sem cópia (mmap/memoryview) para extrair o conteúdo do ByteRange
+        original_bytes = buffer_of(original_stream)
+        stack.callback(release_buffer, original_bytes)
+        validar_bytes = buffer_of(validar_stream)
+        stack.callback(release_buffer, validar_bytes)
+
+        original_info = await original_info_cached_async(original_stream, original_bytes, modo, original_sha256)
+        orig_canonical = original_info['canonical_sha256']
+        orig_md_algo = original_info['md_algorithm']
+        orig_algo_digest = original_info['digest_algo_hexdigest']
+
+        with stage("ler_pdf"):
+            if modo == MODE_INTEGRITY:
+                validar_signatures = read_signatures(open_reader(validar_stream, validar_bytes), validar_bytes)
+            else:
+                validar_signatures = list(PdfFileReader(validar_stream).embedded_signatures)
+        observe_signatures(len(validar_signatures))
+
+        # processar assinaturas do pdfParaValidar
+        if not validar_signatures:
+            return {
+                'status': 'erro',
+                'message': 'pdf enviado para validar não contém assinaturas.',
+            }
+
+        results = []
+        any_match = False
+        # digests de todas as revisões num único passe sobre o documento
+        validar_digests = _signatures_digests(validar_signatures, validar_bytes)
+        for sig, digests in zip(validar_signatures, validar_digests):
+            br = _extract_byte_range(sig)
+            canonical = _hexdigest(digests, 'sha256')
+
+            try:
+                st = await _check_or_not_evaluated(sig, digests, modo)
+            except Exception:
+                st = None
+
+            md_algo = st['md_algorithm'] if st is not None else None
+            algo_digest = _hexdigest(digests, md_algo)
+
+            matches_original = False
+            # se temos canonical para ambos, comparar by canonical (SHA-256)
+            if orig_canonical is not None and canonical is not None:
+                matches_original = (orig_canonical == canonical)
+            else:
+                # fallback: se ambos têm digest pelo algoritmo declarado e os algoritmos coincidem, comparar esses digests
+                if orig_algo_digest and algo_digest and (orig_md_algo and md_algo) and (orig_md_algo == md_algo):
+                    matches_original = (orig_algo_digest == algo_digest)
+                else:
+                    matches_original = False
+
+            if matches_original:
+                any_match = True
+
+            results.append({
+                'nome_assinante': getattr(sig.signer_cert, 'subject', None) and sig.signer_cert.subject.native.get("common_name"),
+                'valido': st['valido'] if st is not None else None,
+                'intacto': st['intacto'] if st is not None else None,
+                'md_algorithm': md_algo,
+                'digest_algo_hexdigest': algo_digest,
+                'canonical_sha256': canonical,
+                'byte_range': br,
+                'matches_original': matches_original,
+                'resumo_validacao': st['resumo_validacao'] if st is not None else None,
+                'erros': st['erros'] if st is not None else [],
+                'avisos': st['avisos'] if st is not None else [],
+            })
+            if st is not None and st.get('avaliado') is False:
+                results[-1]['avaliado'] = False
+
+    response = {
+        'status': 'sucesso',
+        'match': any_match,
+        'original': original_info,
+        'para_validar': {
+            'assinado': True,
+            'signatures': results,
+        }
+    }
+    if modo == MODE_INTEGRITY:
+        response['modo'] = modo
+    return _with_deadline_info(response, [original_info, *results])
+
+
+def comparar_assinatura_logic(original, validar, modo: str = MODE_FULL, original_sha256: str | None = None) -> dict:
+    return run_sync(_comparar_assinatura_async(original, validar, modo, original_sha256))
+
+
+async def _registrar_original_async(original, modo: str = MODE_FULL) -> dict:
+    # valida antes de gravar no disco compartilhado: pdf inválido ou sem assinatura nunca é registrado, e uma
+    # falha aqui não tem o que apagar (o mesmo original pode ter sido registrado por outra requisição)
+    stream = as_pdf_stream(original)
+    original_bytes = buffer_of(stream)
+    try:
+        original_info = await original_info_cached_async(stream, original_bytes, modo)
+    finally:
+        release_buffer(original_bytes)
+    original_id = get_original_store().put(stream)
+    return {'status': 'sucesso', 'original_id': original_id, 'original': original_info}
+
+
+def registrar_original_logic(original, modo: str = MODE_FULL) -> dict:
+    return run_sync(_registrar_original_async(original, modo))
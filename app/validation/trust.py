@@ -0,0 +1,431 @@
+# app/validation/trust.py
+"""
+Trust store (raízes, intermediárias e CRLs de TRUST_STORE_DIR) e os
+ValidationContext compartilhados por intervalo de TRUST_TIME_BUCKET.
+
+O pyhanko não tem um ponto de extensão para reaproveitar a validação do
+certificado do assinante entre documentos: todo o caminho (construção,
+validação PKIX e revogação) passa por generic_cms.validate_cert_usage, chamada
+pelo nome dentro de cms_basic_validation. Por isso a função é trocada no módulo
+do pyhanko (e não só nos contextos daqui); a versão embrulhada só usa o cache
+quando o contexto é um TrustStoreValidationContext e, fora dele, repassa a
+chamada sem mudanças. A troca depende de detalhes internos do pyhanko: fora da
+versão testada (tests/test_trust.py) ela não é instalada e só a validação
+completa falha (check_patch_site); assinatura e modo integridade seguem normais.
+"""
+import os
+import time
+import hashlib
+import inspect
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections import OrderedDict
+from asn1crypto import pem, x509, crl
+from pyhanko import version as pyhanko_version
+from pyhanko.sign.validation import generic_cms
+from pyhanko_certvalidator import ValidationContext
+from pyhanko_certvalidator.registry import SimpleCertificateStore, CertificateRegistry
+
+from ..config import Config
+
+# subdiretórios do TRUST_STORE_DIR; arquivos PEM (um ou vários objetos) ou DER
+ROOTS_DIR = "raizes"
+INTERMEDIATES_DIR = "intermediarias"
+CRLS_DIR = "crls"
+
+_manager = None
+_manager_lock = threading.Lock()
+
+# certificados registrados durante a validação de um documento (os do CMS, via register_multiple do pyhanko)
+_document_certs: ContextVar[CertificateRegistry | None] = ContextVar("pades_document_certs", default=None)
+
+
+def _read_der_objects(path: str) -> list[bytes]:
+    with open(path, "rb") as f:
+        data = f.read()
+    if pem.detect(data):
+        return [der for _, _, der in pem.unarmor(data, multiple=True)]
+    return [data]
+
+
+def _list_files(directory: str) -> list[str]:
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if not name.startswith(".") and os.path.isfile(os.path.join(directory, name))
+    )
+
+
+def directory_snapshot(directory: str) -> tuple:
+    """(arquivo, mtime, tamanho) de tudo o que o trust store lê; mudou, recarrega."""
+    if not directory:
+        return ()
+    entries = []
+    for sub in (ROOTS_DIR, INTERMEDIATES_DIR, CRLS_DIR):
+        for path in _list_files(os.path.join(directory, sub)):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, st.st_mtime_ns, st.st_size))
+    return tuple(entries)
+
+
+class TrustStore:
+    """
+    Raízes, intermediárias e CRLs locais lidas de um diretório, com os
+    certificados indexados por subject e key identifier. Imutável depois de
+    carregado: uma mudança no diretório gera um TrustStore novo.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.roots: list[x509.Certificate] = []
+        self.intermediates: list[x509.Certificate] = []
+        self.crls: list[crl.CertificateList] = []
+        self.index = SimpleCertificateStore()
+        self.errors: list[str] = []
+        self.loaded_at = time.time()
+
+        h = hashlib.sha256()
+        if directory:
+            for sub, target in ((ROOTS_DIR, self.roots), (INTERMEDIATES_DIR, self.intermediates)):
+                for path in _list_files(os.path.join(directory, sub)):
+                    for cert in self._load(path, x509.Certificate):
+                        if self.index.register(cert):
+                            target.append(cert)
+                            h.update(sub.encode() + cert.sha256)
+            for path in _list_files(os.path.join(directory, CRLS_DIR)):
+                for item in self._load(path, crl.CertificateList):
+                    self.crls.append(item)
+                    h.update(CRLS_DIR.encode() + hashlib.sha256(item.dump()).digest())
+        h.update(repr((Config.TRUST_ALLOW_FETCHING, Config.TRUST_REVOCATION_MODE)).encode())
+        self.fingerprint = h.hexdigest()
+
+    def _load(self, path: str, spec) -> list:
+        try:
+            objs = [spec.load(der) for der in _read_der_objects(path)]
+            for obj in objs:
+                obj.native  # força o parse agora, e não na primeira validação
+            return objs
+        except Exception as e:
+            logging.warning("trust store: ignorando %s: %s", path, e)
+            self.errors.append(f"{os.path.relpath(path, self.directory)}: {e}")
+            return []
+
+    def lookup(self, subject: x509.Name | None = None, key_identifier: bytes | None = None) -> list:
+        if key_identifier is not None:
+            return list(self.index.retrieve_many_by_key_identifier(key_identifier))
+        if subject is not None:
+            return list(self.index.retrieve_by_name(subject))
+        return []
+
+    def build_validation_context(self, path_cache, cache_prefix: tuple) -> "TrustStoreValidationContext":
+        return TrustStoreValidationContext(
+            trust_roots=self.roots,
+            other_certs=self.intermediates,
+            crls=self.crls,
+            allow_fetching=Config.TRUST_ALLOW_FETCHING,
+            revocation_mode=Config.TRUST_REVOCATION_MODE,
+            path_cache=path_cache,
+            cache_prefix=cache_prefix,
+        )
+
+
+def _document_overlay() -> CertificateRegistry:
+    overlay = _document_certs.get()
+    if overlay is None:
+        overlay = CertificateRegistry()
+        _document_certs.set(overlay)
+    return overlay
+
+
+@contextmanager
+def document_certificates():
+    """Escopo de uma validação: o que o documento registrar no contexto compartilhado some no fim."""
+    token = _document_certs.set(CertificateRegistry())
+    try:
+        yield
+    finally:
+        _document_certs.reset(token)
+
+
+class DocumentScopedRegistry(CertificateRegistry):
+    """
+    Registro de certificados do ValidationContext compartilhado pelo intervalo.
+    Raízes e intermediárias do trust store entram antes de `seal()`; depois disso,
+    o que o pyhanko registrar (certificados do CMS, emissores buscados por AIA)
+    vai para o registro da validação corrente (document_certificates), então um
+    documento não muda os caminhos que o seguinte encontra.
+    """
+
+    def __init__(self, *, cert_fetcher=None):
+        super().__init__(cert_fetcher=cert_fetcher)
+        self._sealed = False
+
+    def seal(self):
+        self._sealed = True
+
+    def register(self, cert: x509.Certificate) -> bool:
+        if not self._sealed:
+            return super().register(cert)
+        if cert.issuer_serial in self.certs:
+            return False
+        return _document_overlay().register(cert)
+
+    def __iter__(self):
+        yield from super().__iter__()
+        overlay = _document_certs.get()
+        if overlay is not None:
+            yield from overlay
+
+    def retrieve_many_by_key_identifier(self, key_identifier: bytes):
+        overlay = _document_certs.get()
+        certs = super().retrieve_many_by_key_identifier(key_identifier)
+        return certs if overlay is None else certs + overlay.retrieve_many_by_key_identifier(key_identifier)
+
+    def retrieve_many_by_key_hash(self, key_hash: bytes):
+        overlay = _document_certs.get()
+        certs = super().retrieve_many_by_key_hash(key_hash)
+        return certs if overlay is None else certs + overlay.retrieve_many_by_key_hash(key_hash)
+
+    def retrieve_by_name(self, name: x509.Name, first_certificate: x509.Certificate | None = None):
+        overlay = _document_certs.get()
+        certs = super().retrieve_by_name(name, first_certificate)
+        if overlay is None:
+            return certs
+        certs = certs + overlay.retrieve_by_name(name)
+        if first_certificate is not None:
+            certs.sort(key=lambda c: c.sha256 != first_certificate.sha256)
+        return certs
+
+    def retrieve_by_issuer_serial(self, issuer_serial):
+        cert = super().retrieve_by_issuer_serial(issuer_serial)
+        overlay = _document_certs.get()
+        if cert is None and overlay is not None:
+            cert = overlay.retrieve_by_issuer_serial(issuer_serial)
+        return cert
+
+    def find_potential_issuers(self, cert: x509.Certificate, trust_manager):
+        yield from super().find_potential_issuers(cert, trust_manager)
+        overlay = _document_certs.get()
+        if overlay is not None:
+            # as raízes já saíram acima (o trust manager as devolve como TrustAnchor); aqui só os do documento
+            for issuer in overlay.find_potential_issuers(cert, trust_manager):
+                if isinstance(issuer, x509.Certificate):
+                    yield issuer
+
+
+class TrustStoreValidationContext(ValidationContext):
+    """ValidationContext de um intervalo de tempo, ligado ao cache de caminhos do processo."""
+
+    def __init__(self, *args, path_cache, cache_prefix: tuple, other_certs=(), **kwargs):
+        check_patch_site()
+        registry = DocumentScopedRegistry.build(other_certs)
+        super().__init__(*args, certificate_registry=registry, **kwargs)
+        # com o registro passado de fora o pyhanko não liga o buscador de certificados (AIA) a ele
+        fetchers = getattr(self.revinfo_manager, "_fetchers", None)
+        if fetchers is not None:
+            registry.fetcher = fetchers.cert_fetcher
+        registry.seal()
+        self.path_cache = path_cache
+        self.cache_prefix = cache_prefix
+
+
+class PathValidationCache:
+    """
+    Resultado da construção/validação de caminho e da revogação de cada
+    certificado (LRU em memória, por processo). A chave inclui o fingerprint
+    do trust store e o intervalo de tempo, então nada sobrevive a um reload.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entradas": len(self._entries)}
+
+
+class TrustStoreManager:
+    """
+    Mantém o TrustStore atual (recarregado quando o diretório muda, verificado
+    no máximo a cada `reload_interval` segundos) e um ValidationContext por
+    intervalo de `time_bucket` segundos, cujo instante de validação é o do
+    início do uso naquele intervalo.
+    """
+
+    def __init__(self, directory: str, reload_interval: float, time_bucket: int, max_entries: int):
+        self.directory = directory
+        self.reload_interval = reload_interval
+        self.time_bucket = max(1, time_bucket)
+        self.path_cache = PathValidationCache(max_entries)
+        self._lock = threading.Lock()
+        self._snapshot = directory_snapshot(directory)
+        self._store = TrustStore(directory)
+        self._checked = time.monotonic()
+        self._vc = None
+        self._vc_bucket = None
+        self.reloads = 0
+
+    def store(self) -> TrustStore:
+        if time.monotonic() - self._checked >= self.reload_interval:
+            with self._lock:
+                if time.monotonic() - self._checked >= self.reload_interval:
+                    self._checked = time.monotonic()
+                    snapshot = directory_snapshot(self.directory)
+                    if snapshot != self._snapshot:
+                        self._reload(snapshot)
+        return self._store
+
+    def reload(self):
+        with self._lock:
+            self._reload(directory_snapshot(self.directory))
+
+    def _reload(self, snapshot):
+        store = TrustStore(self.directory)
+        logging.info("trust store recarregado: %d raízes, %d intermediárias, %d CRLs",
+                     len(store.roots), len(store.intermediates), len(store.crls))
+        self._snapshot = snapshot
+        self._store = store
+        self._vc = None
+        self.path_cache.clear()
+        self.reloads += 1
+
+    def current_bucket(self) -> int:
+        return int(time.time() // self.time_bucket)
+
+    def validation_context(self) -> ValidationContext:
+        store = self.store()
+        bucket = self.current_bucket()
+        vc = self._vc
+        if vc is None or self._vc_bucket != bucket:
+            with self._lock:
+                if self._vc is None or self._vc_bucket != bucket:
+                    if self._vc_bucket is not None and self._vc_bucket != bucket:
+                        # resultados de intervalos anteriores não voltam a ser consultados
+                        self.path_cache.clear()
+                    self._vc = store.build_validation_context(self.path_cache, (store.fingerprint, bucket))
+                    self._vc_bucket = bucket
+                vc = self._vc
+        return vc
+
+    def stats(self) -> dict:
+        store = self.store()
+        return {
+            "diretorio": store.directory or None,
+            "raizes": len(store.roots),
+            "intermediarias": len(store.intermediates),
+            "crls": len(store.crls),
+            "fingerprint": store.fingerprint,
+            "carregado_em": store.loaded_at,
+            "recargas": self.reloads,
+            "erros": store.errors,
+            "cache_caminhos": self.path_cache.stats(),
+        }
+
+
+def get_trust_store_manager() -> TrustStoreManager:
+    # lido de Config (e não do current_app) porque também roda nos processos do pool
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = TrustStoreManager(
+                    Config.TRUST_STORE_DIR,
+                    Config.TRUST_STORE_RELOAD_INTERVAL,
+                    Config.TRUST_TIME_BUCKET,
+                    Config.TRUST_PATH_CACHE_MAX_ENTRIES,
+                )
+    return _manager
+
+
+def current_validation_context() -> ValidationContext:
+    return get_trust_store_manager().validation_context()
+
+
+def trust_fingerprint() -> str:
+    """
+    Identifica a configuração de confiança atual e o intervalo de TRUST_TIME_BUCKET
+    (entra na chave dos caches de validação): validade e revogação só são
+    reaproveitadas no intervalo em que foram avaliadas, como o ValidationContext.
+    """
+    manager = get_trust_store_manager()
+    return f"{manager.store().fingerprint}:{manager.current_bucket()}"
+
+
+# embrulho de generic_cms.validate_cert_usage (ver o docstring do módulo)
+PATCHED_PYHANKO_VERSION = "0.37."
+_VALIDATE_CERT_USAGE_PARAMS = ["cert", "validation_context", "key_usage_settings", "paths", "pkix_validation_params"]
+_validate_cert_usage = generic_cms.validate_cert_usage
+
+
+def _patch_site_error() -> str | None:
+    if not pyhanko_version.__version__.startswith(PATCHED_PYHANKO_VERSION):
+        return (f"trust.py foi escrito para o pyhanko {PATCHED_PYHANKO_VERSION}x; "
+                f"instalado {pyhanko_version.__version__}: revise o cache de caminhos")
+    if list(inspect.signature(_validate_cert_usage).parameters) != _VALIDATE_CERT_USAGE_PARAMS \
+            or "validate_cert_usage" not in generic_cms.cms_basic_validation.__code__.co_names:
+        return "generic_cms.validate_cert_usage mudou de assinatura ou de uso: revise o cache de caminhos"
+    return None
+
+
+def check_patch_site():
+    """Chamado ao montar cada TrustStoreValidationContext: sem o embrulho instalado, a validação completa falha."""
+    if _PATCH_ERROR is not None:
+        raise RuntimeError(_PATCH_ERROR)
+
+
+async def _validate_cert_usage_cached(cert, validation_context, key_usage_settings, paths,
+                                      pkix_validation_params=None):
+    cache = getattr(validation_context, "path_cache", None)
+    if cache is None:
+        return await _validate_cert_usage(cert, validation_context, key_usage_settings=key_usage_settings,
+                                          paths=paths, pkix_validation_params=pkix_validation_params)
+    # os certificados que o próprio documento trouxe entram na chave: mudam os caminhos possíveis
+    overlay = _document_certs.get()
+    document_certs = tuple(sorted(c.sha256 for c in overlay)) if overlay is not None else ()
+    key = validation_context.cache_prefix + (cert.sha256, document_certs, repr(key_usage_settings),
+                                             repr(pkix_validation_params))
+    result = cache.get(key)
+    if result is not None:
+        await paths.cancel()
+        return result
+    result = await _validate_cert_usage(cert, validation_context, key_usage_settings=key_usage_settings,
+                                        paths=paths, pkix_validation_params=pkix_validation_params)
+    cache.put(key, result)
+    return result
+
+
+_PATCH_ERROR = _patch_site_error()
+if _PATCH_ERROR is None:
+    generic_cms.validate_cert_usage = _validate_cert_usage_cached
+else:
+    logging.getLogger(__name__).error("%s; a validação completa fica indisponível", _PATCH_ERROR)
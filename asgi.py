@@ -0,0 +1,5 @@
+from app import create_app
+from app.asgi import AsgiAdapter
+from app.config import Config
+
+app = AsgiAdapter(create_app(), max_threads=Config.ASGI_THREADS)
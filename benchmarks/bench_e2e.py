@@ -0,0 +1,362 @@
+import os
+import sys
+import json
+import time
+import base64
+import signal
+import tempfile
+import argparse
+import platform
+import threading
+import subprocess
+from multiprocessing import Pool
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import make_pdf, create_local_ca, load_signer, sign_digest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STAGES = ("preparar", "assinar", "finalizar", "validar", "comparar")
+
+# estado de cada processo cliente (preenchido pelo initializer do Pool)
+_client = {}
+
+
+def _init_client(base_url, ca_paths, pdf_path, transport, timeout):
+    with open(pdf_path, "rb") as f:
+        pdf = f.read()
+    _client.update(
+        base_url=base_url.rstrip("/"),
+        session=requests.Session(),  # uma sessão (keep-alive) por processo, não por requisição
+        signer=load_signer(ca_paths),
+        pdf=pdf,
+        pdf_b64=base64.b64encode(pdf).decode(),
+        transport=transport,
+        timeout=timeout,
+    )
+
+
+def _post(path, **kwargs):
+    return _client["session"].post(_client["base_url"] + path, timeout=_client["timeout"], **kwargs)
+
+
+def _preparar():
+    if _client["transport"] == "binario":
+        r = _post("/preparar-pdf", data=_client["pdf"],
+                  headers={"Content-Type": "application/pdf", "Accept": "application/pdf"})
+        r.raise_for_status()
+        return r.content, base64.b64decode(r.headers["X-Digest-B64"]), r.headers["X-Prepared-Digest-B64"]
+    r = _post("/preparar-pdf", json={"pdf": _client["pdf_b64"]})
+    r.raise_for_status()
+    j = r.json()
+    return base64.b64decode(j["prepared_pdf_b64"]), base64.b64decode(j["digest_b64"]), j["prepared_digest_b64"]
+
+
+def _finalizar(prepared_pdf, prepared_digest_b64, p7s):
+    if _client["transport"] == "binario":
+        r = _post("/finalizar-assinatura", headers={"Accept": "application/pdf"}, files={
+            "prepared_pdf": ("preparado.pdf", prepared_pdf, "application/pdf"),
+            "prepared_digest": ("estado.bin", base64.b64decode(prepared_digest_b64)),
+            "p7s": ("assinatura.p7s", p7s),
+        })
+        r.raise_for_status()
+        return r.content
+    r = _post("/finalizar-assinatura", json={
+        "prepared_pdf_b64": base64.b64encode(prepared_pdf).decode(),
+        "prepared_digest_b64": prepared_digest_b64,
+        "p7s_b64": base64.b64encode(p7s).decode(),
+    })
+    r.raise_for_status()
+    return base64.b64decode(r.json()["pades_pdf_b64"])
+
+
+def _validar(signed_pdf):
+    if _client["transport"] == "binario":
+        r = _post("/validar-pades", data=signed_pdf, headers={"Content-Type": "application/pdf"})
+    else:
+        r = _post("/validar-pades", json={"pdf_base64": base64.b64encode(signed_pdf).decode()})
+    r.raise_for_status()
+    validacoes = r.json().get("validacoes") or []
+    if not validacoes or not all(v.get("intacto") for v in validacoes):
+        raise RuntimeError("assinatura não reconhecida como intacta")
+
+
+def _comparar(signed_pdf):
+    if _client["transport"] == "binario":
+        r = _post("/comparar-assinatura", files={
+            "pdf_original": ("original.pdf", signed_pdf, "application/pdf"),
+            "pdf_validar": ("validar.pdf", signed_pdf, "application/pdf"),
+        })
+    else:
+        signed_b64 = base64.b64encode(signed_pdf).decode()
+        r = _post("/comparar-assinatura", json={"pdf_original_b64": signed_b64, "pdf_validar_b64": signed_b64})
+    r.raise_for_status()
+    if not r.json().get("match"):
+        raise RuntimeError("comparação do documento com ele mesmo não deu match")
+
+
+def run_cycle(idx):
+    """Um ciclo completo; devolve (idx, [(etapa, segundos, erro)]). Uma etapa com erro interrompe o ciclo."""
+    timings = []
+    state = {}
+
+    def stage(name, fn):
+        t0 = time.perf_counter()
+        try:
+            result = fn()
+            timings.append((name, time.perf_counter() - t0, None))
+            return result
+        except Exception as e:
+            timings.append((name, time.perf_counter() - t0, f"{type(e).__name__}: {e}"[:300]))
+            raise
+
+    try:
+        state["prepared_pdf"], state["digest"], state["prepared_digest_b64"] = stage("preparar", _preparar)
+        state["p7s"] = stage("assinar", lambda: sign_digest(_client["signer"], state["digest"]))
+        state["signed"] = stage("finalizar", lambda: _finalizar(state["prepared_pdf"], state["prepared_digest_b64"], state["p7s"]))
+        stage("validar", lambda: _validar(state["signed"]))
+        stage("comparar", lambda: _comparar(state["signed"]))
+    except Exception:
+        pass
+    return idx, timings
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def _children(pid):
+    kids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            kids.append(int(entry))
+    return kids
+
+
+def tree_rss_bytes(pid):
+    """RSS somado do processo e descendentes (master do gunicorn + workers), via /proc."""
+    total = 0
+    stack = [pid]
+    while stack:
+        p = stack.pop()
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            continue
+        stack.extend(_children(p))
+    return total
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, pid, interval=0.25):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.samples.append(tree_rss_bytes(self.pid))
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.samples.append(tree_rss_bytes(self.pid))
+        return {
+            "inicio_bytes": self.samples[0],
+            "max_bytes": max(self.samples),
+            "fim_bytes": self.samples[-1],
+        }
+
+
+def start_server(base_url, workers, threads):
+    port = base_url.rstrip("/").rsplit(":", 1)[-1]
+    env = dict(os.environ,
+               GUNICORN_BIND=f"127.0.0.1:{port}",
+               GUNICORN_WORKERS=str(workers),
+               GUNICORN_THREADS=str(threads),
+               GUNICORN_LOGLEVEL="warning")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn_conf.py", "--access-logfile", "/dev/null", "wsgi:app"],
+        cwd=ROOT, env=env,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if requests.get(base_url.rstrip("/") + "/health", timeout=1).status_code == 200:
+                return proc
+        except requests.RequestException:
+            pass
+        if proc.poll() is not None:
+            raise RuntimeError("gunicorn terminou antes de responder ao /health")
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("gunicorn não respondeu ao /health em 60s")
+
+
+def summarize(results, wall):
+    stages = {}
+    cycles_ok = 0
+    for _, timings in results:
+        if len(timings) == len(STAGES) and all(err is None for _, _, err in timings):
+            cycles_ok += 1
+        for name, elapsed, err in timings:
+            s = stages.setdefault(name, {"ok": [], "erros": 0, "amostras_erro": []})
+            if err is None:
+                s["ok"].append(elapsed)
+            else:
+                s["erros"] += 1
+                if len(s["amostras_erro"]) < 5:
+                    s["amostras_erro"].append(err)
+
+    report = {}
+    for name in STAGES:
+        s = stages.get(name)
+        if s is None:
+            continue
+        ok = sorted(s["ok"])
+        total = len(ok) + s["erros"]
+        report[name] = {
+            "requisicoes": total,
+            "erros": s["erros"],
+            "taxa_erro": s["erros"] / total if total else 0.0,
+            "p50_ms": _ms(percentile(ok, 50)),
+            "p95_ms": _ms(percentile(ok, 95)),
+            "p99_ms": _ms(percentile(ok, 99)),
+            "media_ms": _ms(sum(ok) / len(ok)) if ok else None,
+            "max_ms": _ms(ok[-1]) if ok else None,
+            "amostras_erro": s["amostras_erro"],
+        }
+    return {
+        "ciclos": len(results),
+        "ciclos_ok": cycles_ok,
+        "tempo_total_s": wall,
+        "ciclos_por_s": cycles_ok / wall if wall else 0.0,
+        "etapas": report,
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def print_report(report):
+    print("=== RESULTS ===")
+    cfg = report["config"]
+    print(f"Ciclos: {report['ciclos']} (ok: {report['ciclos_ok']}) concorrência={cfg['concorrencia']} "
+          f"transporte={cfg['transporte']} pdf={cfg['pdf_bytes']} bytes/{cfg['paginas']} páginas")
+    print(f"Tempo total: {report['tempo_total_s']:.3f} s  throughput: {report['ciclos_por_s']:.2f} ciclos/s")
+    print(f"{'etapa':<11}{'req':>7}{'erros':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, s in report["etapas"].items():
+        cols = [s["p50_ms"], s["p95_ms"], s["p99_ms"], s["max_ms"]]
+        cols = "".join(f"{c:>10.1f}" if c is not None else f"{'-':>10}" for c in cols)
+        print(f"{name:<11}{s['requisicoes']:>7}{s['erros']:>7}{cols}")
+        for err in s["amostras_erro"][:3]:
+            print(f"    {err}")
+    rss = report.get("rss_servidor")
+    if rss:
+        mb = 1024 * 1024
+        print(f"RSS do servidor: início {rss['inicio_bytes'] / mb:.1f} MiB, "
+              f"máximo {rss['max_bytes'] / mb:.1f} MiB, fim {rss['fim_bytes'] / mb:.1f} MiB")
+
+
+def run_benchmark(base_url, num_cycles=50, concurrency=3, pages=5, size_kb=256, transport="json",
+                  timeout=60, warmup=2, server_pid=None, start=False, server_workers=2, server_threads=2):
+    workdir = tempfile.mkdtemp(prefix="pades-bench-")
+    ca_paths = create_local_ca(os.path.join(workdir, "ac"))
+    pdf = make_pdf(pages, size_kb)
+    pdf_path = os.path.join(workdir, "entrada.pdf")
+    with open(pdf_path, "wb") as f:
+        f.write(pdf)
+
+    server = None
+    if start:
+        server = start_server(base_url, server_workers, server_threads)
+        server_pid = server.pid
+    try:
+        print(f"Benchmark {num_cycles} ciclos preparar→assinar→finalizar→validar→comparar em {base_url} "
+              f"com concorrência={concurrency}")
+        init_args = (base_url, ca_paths, pdf_path, transport, timeout)
+        with Pool(processes=concurrency, initializer=_init_client, initargs=init_args) as pool:
+            if warmup:
+                pool.map(run_cycle, range(-warmup * concurrency, 0))
+            sampler = RssSampler(server_pid) if server_pid else None
+            if sampler:
+                sampler.start()
+            t0 = time.perf_counter()
+            results = pool.map(run_cycle, range(num_cycles), chunksize=1)
+            wall = time.perf_counter() - t0
+            rss = sampler.stop() if sampler else None
+    finally:
+        if server is not None:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=30)
+
+    report = summarize(results, wall)
+    report["rss_servidor"] = rss
+    report["config"] = {
+        "host": base_url,
+        "concorrencia": concurrency,
+        "transporte": transport,
+        "paginas": pages,
+        "pdf_bytes": len(pdf),
+        "aquecimento_ciclos": warmup * concurrency,
+        "python": platform.python_version(),
+        "timestamp": time.time(),
+    }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ponta a ponta: preparar → assinar (CMS local) → finalizar → validar → comparar")
+    parser.add_argument("--host", default="http://127.0.0.1:8005", help="Base host ex(http://127.0.0.1:8005)")
+    parser.add_argument("--n", type=int, default=50, help="Número de ciclos completos")
+    parser.add_argument("--c", type=int, default=3, help="Concorrência (processos clientes)")
+    parser.add_argument("--paginas", type=int, default=5, help="Páginas do pdf sintético")
+    parser.add_argument("--tamanho-kb", type=int, default=256, help="Tamanho aproximado do pdf sintético (KiB)")
+    parser.add_argument("--transporte", choices=("json", "binario"), default="json", help="Contrato base64/JSON ou upload binário")
+    parser.add_argument("--timeout", type=int, default=60, help="Timeout por requisição (segundos)")
+    parser.add_argument("--aquecimento", type=int, default=2, help="Ciclos de aquecimento por processo (não medidos)")
+    parser.add_argument("--server-pid", type=int, help="Pid do servidor (master do gunicorn) para medir o RSS")
+    parser.add_argument("--iniciar-servidor", action="store_true", help="Sobe um gunicorn local (gunicorn_conf.py) no porto do --host")
+    parser.add_argument("--workers", type=int, default=2, help="GUNICORN_WORKERS do servidor iniciado")
+    parser.add_argument("--threads", type=int, default=2, help="GUNICORN_THREADS do servidor iniciado")
+    parser.add_argument("--json", dest="json_out", help="Grava o relatório em JSON neste arquivo ('-' = stdout)")
+    args = parser.parse_args()
+
+    report = run_benchmark(
+        args.host, num_cycles=args.n, concurrency=args.c, pages=args.paginas, size_kb=args.tamanho_kb,
+        transport=args.transporte, timeout=args.timeout, warmup=args.aquecimento, server_pid=args.server_pid,
+        start=args.iniciar_servidor, server_workers=args.workers, server_threads=args.threads,
+    )
+    if args.json_out == "-":
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        print_report(report)
+        if args.json_out:
+            with open(args.json_out, "w") as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+
+    failed = any(s["erros"] for s in report["etapas"].values())
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+import pickle
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyhanko.sign.signers.pdf_byterange import PreparedByteRangeDigest
+from app.signatures.state import encode_prepared_state, decode_prepared_state
+
+
+def timed(fn, n):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def run_bench(n=100_000):
+    prepared_digest = PreparedByteRangeDigest(
+        document_digest=os.urandom(32),
+        reserved_region_start=123_456,
+        reserved_region_end=123_456 + 2 * 15302 + 2,
+    )
+    payload = {"prepared_digest": prepared_digest, "post_sign_instr": None}
+
+    pickled = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+    state = encode_prepared_state(prepared_digest)
+    assert decode_prepared_state(state)[0] == prepared_digest
+
+    rows = [
+        ("pickle", len(pickled),
+         timed(lambda: pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL), n),
+         timed(lambda: pickle.loads(pickled), n)),
+        ("token v1 (hmac)", len(state),
+         timed(lambda: encode_prepared_state(prepared_digest), n),
+         timed(lambda: decode_prepared_state(state), n)),
+    ]
+
+    print(f"=== prepared_digest: {n} iterações ===")
+    print(f"{'formato':<18}{'bytes':>8}{'base64':>8}{'encode (us)':>14}{'decode (us)':>14}")
+    for name, size, enc, dec in rows:
+        print(f"{name:<18}{size:>8}{(size + 2) // 3 * 4:>8}{enc:>14.2f}{dec:>14.2f}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmark do estado do preparo: pickle x token binário")
+    parser.add_argument("--n", type=int, default=100_000, help="Iterações por medida")
+    args = parser.parse_args()
+
+    run_bench(args.n)
@@ -0,0 +1,132 @@
+import io
+import os
+import random
+import asyncio
+import datetime
+
+from asn1crypto import x509 as asn1_x509, keys as asn1_keys
+from cryptography import x509
+from cryptography.x509.oid import NameOID
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from pyhanko.pdf_utils import generic
+from pyhanko.pdf_utils.writer import PdfFileWriter
+from pyhanko.sign import signers
+from pyhanko_certvalidator.registry import SimpleCertificateStore
+
+# Massa de teste sintética para os benchmarks: nada aqui acessa a rede.
+
+
+def make_pdf(pages: int = 1, size_kb: int = 0, seed: int = 0) -> bytes:
+    """
+    Pdf sintético com `pages` páginas; o conteúdo de cada página é completado com
+    bytes pseudoaleatórios (incompressíveis) até o documento ter ~`size_kb` KiB.
+    """
+    rnd = random.Random(seed)
+    pad_per_page = max(0, size_kb * 1024 // max(1, pages) - 200)
+    w = PdfFileWriter()
+    for i in range(pages):
+        content = b"BT /F1 12 Tf 72 712 Td (Pagina %d) Tj ET\n" % (i + 1)
+        if pad_per_page:
+            content += b"%" + rnd.randbytes(pad_per_page).hex().encode()[:pad_per_page] + b"\n"
+        page = generic.DictionaryObject({
+            generic.NameObject("/Type"): generic.NameObject("/Page"),
+            generic.NameObject("/MediaBox"): generic.ArrayObject(
+                [generic.NumberObject(0), generic.NumberObject(0), generic.NumberObject(612), generic.NumberObject(792)]
+            ),
+            generic.NameObject("/Contents"): w.add_object(generic.StreamObject(stream_data=content)),
+            generic.NameObject("/Resources"): generic.DictionaryObject(),
+        })
+        w.insert_page(page)
+    out = io.BytesIO()
+    w.write(out)
+    return out.getvalue()
+
+
+def _name(cn: str) -> x509.Name:
+    return x509.Name([
+        x509.NameAttribute(NameOID.COUNTRY_NAME, "BR"),
+        x509.NameAttribute(NameOID.ORGANIZATION_NAME, "Benchmark PAdES"),
+        x509.NameAttribute(NameOID.COMMON_NAME, cn),
+    ])
+
+
+def _write(path: str, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def create_local_ca(directory: str, signer_cn: str = "Assinante Benchmark") -> dict:
+    """
+    Gera uma AC raiz descartável e um certificado de assinante emitido por ela
+    (chaves RSA 2048). Grava ca.pem, signer.pem e signer.key em `directory`.
+    """
+    os.makedirs(directory, exist_ok=True)
+    now = datetime.datetime.now(datetime.timezone.utc)
+
+    ca_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    ca_name = _name("AC Local Benchmark")
+    ca_cert = (
+        x509.CertificateBuilder()
+        .subject_name(ca_name).issuer_name(ca_name)
+        .public_key(ca_key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=365))
+        .add_extension(x509.BasicConstraints(ca=True, path_length=0), critical=True)
+        .add_extension(x509.KeyUsage(False, False, False, False, False, True, True, False, False), critical=True)
+        .add_extension(x509.SubjectKeyIdentifier.from_public_key(ca_key.public_key()), critical=False)
+        .sign(ca_key, hashes.SHA256())
+    )
+
+    signer_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    signer_cert = (
+        x509.CertificateBuilder()
+        .subject_name(_name(signer_cn)).issuer_name(ca_name)
+        .public_key(signer_key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=90))
+        .add_extension(x509.BasicConstraints(ca=False, path_length=None), critical=True)
+        .add_extension(x509.KeyUsage(True, True, False, False, False, False, False, False, False), critical=True)
+        .add_extension(x509.AuthorityKeyIdentifier.from_issuer_public_key(ca_key.public_key()), critical=False)
+        .sign(ca_key, hashes.SHA256())
+    )
+
+    paths = {
+        "ca": os.path.join(directory, "ca.pem"),
+        "signer_cert": os.path.join(directory, "signer.pem"),
+        "signer_key": os.path.join(directory, "signer.key"),
+    }
+    _write(paths["ca"], ca_cert.public_bytes(serialization.Encoding.PEM))
+    _write(paths["signer_cert"], signer_cert.public_bytes(serialization.Encoding.PEM))
+    _write(paths["signer_key"], signer_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ))
+    return paths
+
+
+def _load_asn1_cert(path: str) -> asn1_x509.Certificate:
+    with open(path, "rb") as f:
+        cert = x509.load_pem_x509_certificate(f.read())
+    return asn1_x509.Certificate.load(cert.public_bytes(serialization.Encoding.DER))
+
+
+def load_signer(paths: dict) -> signers.SimpleSigner:
+    """Assinante local (chave em arquivo) com a cadeia até a AC no CMS."""
+    with open(paths["signer_key"], "rb") as f:
+        key = serialization.load_pem_private_key(f.read(), password=None)
+    signing_key = asn1_keys.PrivateKeyInfo.load(key.private_bytes(
+        serialization.Encoding.DER, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ))
+    return signers.SimpleSigner(
+        signing_cert=_load_asn1_cert(paths["signer_cert"]),
+        signing_key=signing_key,
+        cert_registry=SimpleCertificateStore.from_certs([_load_asn1_cert(paths["ca"])]),
+    )
+
+
+def sign_digest(signer: signers.SimpleSigner, digest: bytes, md_algorithm: str = "sha256") -> bytes:
+    """CMS destacado (p7s) sobre o digest devolvido pelo /preparar-pdf, como faria o assinador externo."""
+    cms = asyncio.run(signer.async_sign(digest, md_algorithm, use_pades=True))
+    return cms.dump()
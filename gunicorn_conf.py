@@ -1,9 +1,13 @@
 import multiprocessing
 import os
+import shutil
+import tempfile
 
 CPU_COUNT = multiprocessing.cpu_count()
 
 workers = int(os.getenv("GUNICORN_WORKERS", max(1, CPU_COUNT)))
+# o app divide CPUs (pool de lotes) e memória (admissão) pelo número de workers
+os.environ["GUNICORN_WORKERS"] = str(workers)
 
 threads = int(os.getenv("GUNICORN_THREADS", 2))
 
@@ -15,3 +19,34 @@ keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 2))
 accesslog = "-"   # stdout
 errorlog = "-"    # stderr
 loglevel = os.getenv("GUNICORN_LOGLEVEL", "info")
+
+# preload: imports pesados (pyhanko, asn1crypto, cryptography) e create_app rodam uma vez no master
+# e são compartilhados copy-on-write pelos workers
+preload_app = os.getenv("GUNICORN_PRELOAD", "1").lower() in ("1", "true", "yes")
+
+# métricas: os workers gravam no diretório multiprocesso do prometheus_client (ver app/metrics.py)
+METRICS_DIR = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "pades-metricas"))
+
+
+def on_starting(server):
+    # descarta os valores de execuções anteriores antes de subir os workers
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)
+    os.makedirs(METRICS_DIR, exist_ok=True)
+
+
+def post_worker_init(worker):
+    # roda antes do worker começar a aceitar conexões; o aquecimento fica só nos workers (nunca no master)
+    # para que SQLite, trust store e loop asyncio sejam abertos depois do fork, em cada processo
+    from app import startup
+    from app.jobs.service import start_dispatcher
+    startup.set_preload(worker.cfg.preload_app)
+    startup.run_warmup()
+    worker.log.info(startup.format_report(startup.startup_report()))
+    # cada worker também consome a fila de jobs assíncronos (nunca o master)
+    start_dispatcher()
+
+
+def child_exit(server, worker):
+    # gauges "livesum" (requisições em andamento) deixam de contar o worker que morreu
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
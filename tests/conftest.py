@@ -0,0 +1,61 @@
+import io
+import os
+import tempfile
+
+# Config lê o ambiente no import: os stores em disco dos testes ficam num diretório próprio
+_tmp = tempfile.mkdtemp(prefix="pades-testes-")
+for _name, _sub in (("VALIDATION_CACHE_PATH", "cache/validacao.sqlite3"), ("SESSION_STORE_DIR", "sessoes"),
+                    ("PREPARED_STATE_KEY_FILE", "estado/hmac.key"), ("PROMETHEUS_MULTIPROC_DIR", "metricas"),
+                    ("JOBS_DIR", "jobs"), ("DIGEST_INDEX_PATH", "indice/indice.sqlite3"),
+                    ("ORIGINALS_DIR", "originais")):
+    os.environ.setdefault(_name, os.path.join(_tmp, _sub))
+
+import pytest
+from pyhanko.sign import signers
+from pyhanko.pdf_utils import generic
+from pyhanko.pdf_utils.incremental_writer import IncrementalPdfFileWriter
+
+from benchmarks.fixtures import make_pdf, create_local_ca, load_signer
+
+
+@pytest.fixture(scope="session")
+def signer(tmp_path_factory):
+    return load_signer(create_local_ca(str(tmp_path_factory.mktemp("ac"))))
+
+
+def sign(pdf: bytes, signer, field_name: str, **metadata) -> bytes:
+    out = signers.sign_pdf(
+        IncrementalPdfFileWriter(io.BytesIO(pdf)), signers.PdfSignatureMetadata(field_name=field_name, **metadata),
+        signer=signer
+    )
+    return out.getvalue()
+
+
+def replace_page_content(pdf: bytes, content: bytes) -> bytes:
+    """Revisão incremental que troca o conteúdo da primeira página (alteração não permitida depois de assinar)."""
+    w = IncrementalPdfFileWriter(io.BytesIO(pdf))
+    page = w.root["/Pages"]["/Kids"][0].get_object()
+    page["/Contents"] = w.add_object(generic.StreamObject(stream_data=content))
+    w.update_container(page)
+    out = io.BytesIO()
+    w.write(out)
+    return out.getvalue()
+
+
+@pytest.fixture(scope="session")
+def signed_pdf(signer) -> bytes:
+    return sign(make_pdf(pages=2, size_kb=64), signer, "Assinatura1")
+
+
+@pytest.fixture(scope="session")
+def tampered_pdf(signed_pdf) -> bytes:
+    return replace_page_content(signed_pdf, b"BT /F1 12 Tf 72 712 Td (Adulterado) Tj ET")
+
+
+@pytest.fixture(scope="session")
+def multi_signed_pdf(signer) -> bytes:
+    # três revisões assinadas, com uma alteração de conteúdo no meio
+    pdf = sign(make_pdf(pages=3, size_kb=256), signer, "Assinatura1")
+    pdf = sign(pdf, signer, "Assinatura2")
+    pdf = replace_page_content(pdf, b"BT /F1 12 Tf 72 712 Td (Revisao) Tj ET")
+    return sign(pdf, signer, "Assinatura3")
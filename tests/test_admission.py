@@ -0,0 +1,62 @@
+import time
+import base64
+import threading
+
+import pytest
+
+from app import create_app, admission
+from app.admission import AdmissionController
+from app.config import Config
+
+from benchmarks.fixtures import make_pdf
+
+
+@pytest.fixture
+def controller(monkeypatch):
+    # orçamento mínimo e fila curta: qualquer requisição com outra em andamento passa do orçamento
+    controller = AdmissionController(budget=1, queue_timeout=0.05, max_queue=4)
+    monkeypatch.setattr(admission, "_controller", controller)
+    return controller
+
+
+def test_index_batch_over_budget_is_rejected(controller):
+    pdf = base64.b64encode(make_pdf(pages=1, size_kb=8)).decode()
+    controller.acquire(1)
+    response = create_app().test_client().post("/indice/documentos/lote", json={
+        "documentos": [{"referencia": f"doc-{i}", "pdf_base64": pdf} for i in range(3)],
+    })
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
+    assert controller.rejected == 1
+    assert controller.in_flight == 1
+
+
+def test_request_waits_in_queue_then_gets_503(controller, signed_pdf):
+    controller.acquire(1)
+    client = create_app().test_client()
+    t0 = time.monotonic()
+    response = client.post("/validar-pades", json={"pdf_base64": base64.b64encode(signed_pdf).decode()})
+    assert time.monotonic() - t0 >= controller.queue_timeout
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(Config.ADMISSION_RETRY_AFTER)
+    assert controller.waiting == 0
+
+
+def test_queued_request_is_admitted_when_memory_frees(controller, signed_pdf):
+    controller.queue_timeout = 5
+    controller.acquire(1)
+    threading.Timer(0.1, controller.release, (1,)).start()
+    response = create_app().test_client().post("/validar-pades", json={
+        "pdf_base64": base64.b64encode(signed_pdf).decode(),
+    })
+    assert response.status_code == 200
+    assert controller.in_flight == 0 and controller.in_flight_bytes == 0
+
+
+def test_full_queue_is_rejected_without_waiting(controller):
+    controller.max_queue = 0
+    controller.queue_timeout = 5
+    controller.acquire(1)
+    t0 = time.monotonic()
+    assert controller.acquire(1) is False
+    assert time.monotonic() - t0 < 1
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from app.__main__ import main
+
+from benchmarks.fixtures import make_pdf
+
+
+@pytest.fixture
+def acervo(tmp_path, signed_pdf):
+    directory = tmp_path / "acervo"
+    (directory / "sub").mkdir(parents=True)
+    (directory / "assinado.pdf").write_bytes(signed_pdf)
+    (directory / "sub" / "sem_assinatura.pdf").write_bytes(make_pdf(pages=1, size_kb=8))
+    return directory
+
+
+def _lines(path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_writes_one_ndjson_line_per_pdf(acervo, tmp_path):
+    (acervo / "corrompido.pdf").write_bytes(b"%PDF-1.7 corrompido")
+    saida = tmp_path / "resultado.ndjson"
+    assert main(["validar", str(acervo), "--modo", "integridade", "--workers", "1", "--saida", str(saida)]) == 1
+
+    results = {r["referencia"]: r for r in _lines(saida)}
+    assert sorted(results) == ["assinado.pdf", "corrompido.pdf", "sub/sem_assinatura.pdf"]
+    assert results["assinado.pdf"]["status"] == "sucesso"
+    assert results["assinado.pdf"]["validacoes"][0]["intacto"] is True
+    assert results["sub/sem_assinatura.pdf"]["assinado"] is False
+    assert results["corrompido.pdf"]["status"] == "erro"
+    assert all(r["arquivo"] == str(acervo / r["referencia"]) for r in results.values())
+
+
+def test_resumes_from_checkpoint(acervo, tmp_path, signed_pdf):
+    saida, checkpoint = tmp_path / "resultado.ndjson", tmp_path / "feitos.txt"
+    argv = ["validar", str(acervo), "--modo", "integridade", "--workers", "1",
+            "--saida", str(saida), "--checkpoint", str(checkpoint)]
+    assert main(argv) == 0
+    assert len(_lines(saida)) == 2
+
+    # segunda execução: só o pdf novo é processado e a saída é acrescentada
+    (acervo / "novo.pdf").write_bytes(signed_pdf)
+    assert main(argv) == 0
+    results = _lines(saida)
+    assert [r["referencia"] for r in results[2:]] == ["novo.pdf"]
+    assert sorted(checkpoint.read_text().splitlines()) == sorted(r["arquivo"] for r in results)
@@ -0,0 +1,45 @@
+import time
+import base64
+
+import pytest
+
+from app import create_app, deadline
+from app.config import Config
+from app.validation import service
+
+
+@pytest.fixture
+def slow_signatures(monkeypatch):
+    # a primeira assinatura termina depois do prazo: as seguintes não chegam a ser avaliadas
+    check = service.check_signature_async
+
+    async def slow(sig, digests, modo):
+        result = await check(sig, digests, modo)
+        time.sleep((deadline.remaining() or 0) + 0.01)
+        return result
+    monkeypatch.setattr(service, "check_signature_async", slow)
+
+
+@pytest.mark.parametrize("status_code", [200, 503])
+def test_expired_deadline_returns_partial_result(multi_signed_pdf, slow_signatures, monkeypatch, status_code):
+    monkeypatch.setattr(Config, "DEADLINE_STATUS_CODE", status_code)
+    response = create_app().test_client().post(
+        "/validar-pades", json={"pdf_base64": base64.b64encode(multi_signed_pdf).decode(), "modo": "integridade"},
+        headers={"X-Prazo": "1"},
+    )
+    assert response.status_code == status_code
+    result = response.get_json()
+    assert result["prazo_esgotado"] is True and result["nao_avaliadas"] == 2
+    first, *rest = result["validacoes"]
+    assert first["intacto"] is True and "avaliado" not in first
+    assert [r["avaliado"] for r in rest] == [False, False]
+
+
+def test_no_deadline_evaluates_everything(multi_signed_pdf, slow_signatures, monkeypatch):
+    monkeypatch.setattr(Config, "REQUEST_DEADLINE", 0)
+    response = create_app().test_client().post(
+        "/validar-pades", json={"pdf_base64": base64.b64encode(multi_signed_pdf).decode(), "modo": "integridade"},
+    )
+    result = response.get_json()
+    assert response.status_code == 200 and "prazo_esgotado" not in result
+    assert len(result["validacoes"]) == 3
@@ -0,0 +1,77 @@
+import io
+import hashlib
+
+import pytest
+from pyhanko.pdf_utils.reader import PdfFileReader
+
+from app.validation import service
+from app.validation.service import _hash_byte_range, _hash_nested_byte_ranges, _signatures_digests
+
+ALGOS = ("sha256", "sha512", "sha1")
+
+
+def naive_digest(pdf: bytes, byte_range: list, algo: str) -> bytes:
+    # referência: concatena os segmentos e faz um hash só
+    data = b"".join(pdf[byte_range[i]:byte_range[i] + byte_range[i + 1]] for i in range(0, len(byte_range), 2))
+    return hashlib.new(algo, data).digest()
+
+
+def byte_ranges(pdf: bytes) -> list:
+    return [[int(x) for x in sig.sig_object["/ByteRange"]] for sig in PdfFileReader(io.BytesIO(pdf)).embedded_signatures]
+
+
+@pytest.mark.parametrize("chunk_size", [service.HASH_CHUNK_SIZE, 4096, 7])
+def test_single_pass_matches_naive_hashing(multi_signed_pdf, monkeypatch, chunk_size):
+    # blocos pequenos forçam segmentos que começam e terminam no meio de um bloco
+    monkeypatch.setattr(service, "HASH_CHUNK_SIZE", chunk_size)
+    for br in byte_ranges(multi_signed_pdf):
+        digests = _hash_byte_range(multi_signed_pdf, br, ALGOS)
+        assert digests == {algo: naive_digest(multi_signed_pdf, br, algo) for algo in ALGOS}
+
+
+def test_matches_pyhanko_document_digest(multi_signed_pdf):
+    for sig in PdfFileReader(io.BytesIO(multi_signed_pdf)).embedded_signatures:
+        br = [int(x) for x in sig.sig_object["/ByteRange"]]
+        assert _hash_byte_range(multi_signed_pdf, br, (sig.md_algorithm,))[sig.md_algorithm] == sig.compute_digest()
+
+
+def test_repeated_and_unknown_algorithms_are_skipped(signed_pdf):
+    [br] = byte_ranges(signed_pdf)
+    digests = _hash_byte_range(memoryview(signed_pdf), br, ("sha256", None, "sha256", "nao-existe"))
+    assert digests == {"sha256": naive_digest(signed_pdf, br, "sha256")}
+
+
+@pytest.mark.parametrize("br", [None, [], [0, 10, 20], [0, 10, 20, 10 ** 9], [-1, 10, 20, 5]])
+def test_invalid_byte_range(signed_pdf, br):
+    assert _hash_byte_range(signed_pdf, br, ALGOS) is None
+
+
+@pytest.mark.parametrize("chunk_size", [service.HASH_CHUNK_SIZE, 7])
+def test_nested_pass_matches_naive_hashing(multi_signed_pdf, monkeypatch, chunk_size):
+    monkeypatch.setattr(service, "HASH_CHUNK_SIZE", chunk_size)
+    ranges = byte_ranges(multi_signed_pdf)
+    assert len(ranges) == 3
+    # fora de ordem e com algoritmos diferentes por assinatura
+    ranges = ranges[::-1]
+    algos = [("sha256",), ("sha256", "sha512"), ("sha1", "sha256")]
+    results = _hash_nested_byte_ranges(multi_signed_pdf, ranges, algos)
+    for br, algos_of_range, digests in zip(ranges, algos, results):
+        assert digests == {algo: naive_digest(multi_signed_pdf, br, algo) for algo in algos_of_range}
+
+
+def test_nested_pass_with_nonstandard_and_invalid_ranges(multi_signed_pdf):
+    # fora do padrão [0, a, b, n] vai para o _hash_byte_range individual; inválido vira None
+    ranges = byte_ranges(multi_signed_pdf) + [[10, 20, 40, 5], [0, 10, 20, 10 ** 9], [0, 10, 20]]
+    results = _hash_nested_byte_ranges(multi_signed_pdf, ranges, [ALGOS] * len(ranges))
+    for br, digests in zip(ranges[:4], results):
+        assert digests == {algo: naive_digest(multi_signed_pdf, br, algo) for algo in ALGOS}
+    assert results[4:] == [None, None]
+
+
+def test_signatures_digests_seed_pyhanko(multi_signed_pdf):
+    sigs = list(PdfFileReader(io.BytesIO(multi_signed_pdf)).embedded_signatures)
+    all_digests = _signatures_digests(sigs, memoryview(multi_signed_pdf))
+    for sig, digests in zip(sigs, all_digests):
+        assert sig.external_digests[sig.md_algorithm] == digests[sig.md_algorithm]
+        sig.external_digests.clear()
+        assert sig.compute_digest() == digests[sig.md_algorithm]
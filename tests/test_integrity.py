@@ -0,0 +1,39 @@
+import io
+
+from pyhanko.pdf_utils.reader import PdfFileReader
+
+from app.validation.service import validar_pdf_logic, MODE_FULL, MODE_INTEGRITY
+
+from .test_listing import trapped_pdf  # noqa: F401 (fixture)
+
+
+def test_integrity_agrees_with_full_validation(multi_signed_pdf, tampered_pdf):
+    for pdf in (multi_signed_pdf, tampered_pdf):
+        # os dois modos devolvem as assinaturas em ordem de revisão
+        full = validar_pdf_logic(pdf, MODE_FULL)["validacoes"]
+        integrity = validar_pdf_logic(pdf, MODE_INTEGRITY)["validacoes"]
+        assert len(integrity) == len(full)
+        for result, expected in zip(integrity, full):
+            assert result["modo"] == MODE_INTEGRITY and result["valido"] is None
+            assert result["intacto"] == expected["intacto"]
+
+
+def test_integrity_detects_rewritten_signature_dictionary(trapped_pdf):
+    # o /Reason foi reescrito depois de assinar: o ByteRange verdadeiro é lido e o digest não confere
+    [result] = validar_pdf_logic(trapped_pdf, MODE_INTEGRITY)["validacoes"]
+    assert result["intacto"] is False and result["digest_confere"] is False and result["assinatura_confere"] is True
+    [full] = validar_pdf_logic(trapped_pdf, MODE_FULL)["validacoes"]
+    assert full["intacto"] is False
+
+
+def test_integrity_reports_malformed_signer_info(signed_pdf):
+    # troca a tag do OID do signatureAlgorithm do SignerInfo (logo antes do valor da assinatura) por OCTET STRING;
+    # o /Contents fica fora do ByteRange, então o pdf continua legível
+    sig = PdfFileReader(io.BytesIO(signed_pdf)).embedded_signatures[0]
+    algorithm = sig.signer_info['signature_algorithm'].dump().hex().upper().encode()
+    pos = signed_pdf.rfind(algorithm + b"0482")
+    broken = algorithm[:4] + b"04" + algorithm[6:]
+    pdf = signed_pdf[:pos] + broken + signed_pdf[pos + len(algorithm):]
+    [result] = validar_pdf_logic(pdf, MODE_INTEGRITY)["validacoes"]
+    assert result["intacto"] is False and result["pkcs7_signature_mechanism"] is None
+    assert "SignedDigestAlgorithm" in result["erros"][0]
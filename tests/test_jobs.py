@@ -0,0 +1,119 @@
+import io
+import os
+import sys
+import time
+import subprocess
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.config import Config
+from app.jobs import service
+from app.jobs.store import JobStore, get_job_store, QUEUED, RUNNING, DONE, FAILED
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    store = JobStore(str(tmp_path), max_queue=10, result_ttl=60, timeout=60, max_attempts=2)
+    monkeypatch.setattr(service, "get_job_store", lambda: store)
+    return store
+
+
+@pytest.fixture(scope="module")
+def dead_pid() -> int:
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+def _submit(store, pdf: bytes) -> str:
+    return store.submit("validar", {"modo": "integridade"}, {"pdf": io.BytesIO(pdf)})
+
+
+def test_submit_claim_done(store, signed_pdf):
+    job_id = _submit(store, signed_pdf)
+    assert store.get(job_id)["estado"] == QUEUED
+    assert store.claim(os.getpid())["id"] == job_id
+    assert store.claim(os.getpid()) is None
+
+    service.executar_job(job_id)
+    job = store.get(job_id)
+    assert job["estado"] == DONE and job["status_http"] == 200
+    assert job["resultado"]["validacoes"][0]["intacto"] is True
+
+
+def test_job_of_dead_owner_is_requeued(store, signed_pdf, dead_pid):
+    job_id = _submit(store, signed_pdf)
+    store.claim(dead_pid)
+    store.sweep()
+    job = store.get(job_id)
+    assert job["estado"] == QUEUED and job["tentativas"] == 1
+
+    # esgotadas as tentativas, vira erro
+    store.claim(dead_pid)
+    store.sweep()
+    job = store.get(job_id)
+    assert job["estado"] == FAILED and job["status_http"] == 500
+
+
+def test_timed_out_job_answers_504(store, signed_pdf):
+    store.timeout = 0
+    job_id = _submit(store, signed_pdf)
+    store.claim(os.getpid())
+    store.sweep()
+    job = store.get(job_id)
+    assert job["estado"] == FAILED and job["status_http"] == 504
+    # o processo que ainda rodava não sobrescreve o 504
+    store.finish(job_id, 200, {"status": "sucesso"})
+    assert store.get(job_id)["status_http"] == 504
+
+
+class _Pool:
+    def __init__(self):
+        self.shut_down = False
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+def _failed(exc) -> Future:
+    future = Future()
+    future.set_exception(exc)
+    return future
+
+
+def test_late_callback_of_broken_pool_keeps_new_pool(store, signed_pdf, monkeypatch):
+    with monkeypatch.context() as m:
+        # sem a thread de despacho: os callbacks são chamados direto
+        m.setattr(service.threading.Thread, "start", lambda self: None)
+        dispatcher = service.JobDispatcher(pool_size=2, poll_interval=0.1)
+    old_pool, new_pool = _Pool(), _Pool()
+    dispatcher._pool = new_pool
+    jobs = [_submit(store, signed_pdf) for _ in range(3)]
+    for _ in jobs:
+        store.claim(os.getpid())
+    dispatcher._running = len(jobs)
+
+    dispatcher._done(jobs[0], old_pool, _failed(BrokenProcessPool()))
+    assert dispatcher._pool is new_pool and not new_pool.shut_down
+
+    cancelled = Future()
+    cancelled.cancel()
+    dispatcher._done(jobs[1], new_pool, cancelled)
+    assert dispatcher._pool is None and new_pool.shut_down
+
+    dispatcher._done(jobs[2], new_pool, _failed(BrokenProcessPool()))
+    assert dispatcher._running == 0
+    assert [store.get(job_id)["estado"] for job_id in jobs] == [QUEUED] * 3
+
+
+def test_dispatcher_runs_job_in_pool(signed_pdf, monkeypatch):
+    # despachante real deste processo, com o pool de jobs e a fila de JOBS_DIR
+    monkeypatch.setattr(Config, "JOBS_POLL_INTERVAL", 0.1)
+    job_id = service.submit_job("validar", {"modo": "integridade"}, {"pdf": io.BytesIO(signed_pdf)})
+    deadline = time.monotonic() + 60
+    while get_job_store().get(job_id)["estado"] in (QUEUED, RUNNING) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    job = get_job_store().get(job_id)
+    assert job["estado"] == DONE and job["status_http"] == 200
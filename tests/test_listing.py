@@ -0,0 +1,85 @@
+import io
+
+import pytest
+from pyhanko.pdf_utils.reader import PdfFileReader
+
+from app.validation import listing
+from app.validation.listing import RawSignature, read_signatures, listar_assinaturas_logic
+
+from benchmarks.fixtures import make_pdf
+from .conftest import sign
+
+REASON = "r" * 80
+TRAP = b"/ByteRange [0 1 2 3] /Type /DocTimeStamp /SubFilter /ETSI.RFC3161"
+
+
+def _read(pdf: bytes) -> list:
+    return read_signatures(PdfFileReader(io.BytesIO(pdf)), memoryview(pdf))
+
+
+def _with_trap_first(pdf: bytes) -> bytes:
+    """
+    Move o /Reason para logo depois do /Contents, antes das chaves verdadeiras, com
+    chaves falsas escritas literalmente na string (o pyhanko as escreveria em octal).
+    O tamanho não muda, então os offsets da xref continuam valendo.
+    """
+    entry = b"\n/Reason (" + REASON.encode() + b")"
+    trap = b"\n/Reason (" + TRAP.ljust(len(REASON)) + b")"
+    assert len(trap) == len(entry) and pdf.count(entry) == 1
+    contents = pdf.rindex(b"/Contents <")
+    hex_end = pdf.index(b">", contents) + 1
+    tail = pdf[hex_end:pdf.index(b"endobj", hex_end)].replace(entry, b"")
+    return pdf[:hex_end] + trap + tail + pdf[hex_end + len(trap) + len(tail):]
+
+
+@pytest.fixture(scope="module")
+def trapped_pdf(signer) -> bytes:
+    return _with_trap_first(sign(make_pdf(pages=1, size_kb=8), signer, "Assinatura1", reason=REASON))
+
+
+def test_raw_reader_matches_pyhanko(multi_signed_pdf):
+    reader = PdfFileReader(io.BytesIO(multi_signed_pdf))
+    raw = _read(multi_signed_pdf)
+    assert all(isinstance(sig, RawSignature) for sig in raw)
+    assert [(sig.field_name, sig.signed_revision, sig.byte_range, sig.sig_object_type, sig.sig_object["/SubFilter"])
+            for sig in raw] == [
+        (sig.field_name, sig.signed_revision, list(sig.byte_range), sig.sig_object_type, sig.sig_object["/SubFilter"])
+        for sig in reader.embedded_signatures
+    ]
+
+
+def test_keys_inside_strings_are_ignored(trapped_pdf):
+    [sig] = _read(trapped_pdf)
+    assert isinstance(sig, RawSignature)
+    assert sig.byte_range[:2] != [0, 1]
+    assert sig.sig_object_type == "/Sig"
+    assert sig.sig_object["/SubFilter"] == "/adbe.pkcs7.detached"
+
+    [listed] = listar_assinaturas_logic(trapped_pdf)["assinaturas"]
+    assert (listed["tipo"], listed["subfilter"], listed["byte_range"]) == \
+        ("Sig", "adbe.pkcs7.detached", sig.byte_range)
+
+
+@pytest.mark.parametrize("body, keys", [
+    (b"<< /A << /ByteRange [0 1 2 3] >> /ByteRange [4 5 6 7] >>", {b"/A": b"<< /ByteRange [0 1 2 3] >>",
+                                                                   b"/ByteRange": b"[4 5 6 7]"}),
+    (b"<</Name(a (/Type /X) \\) b)/Type/Sig>>", {b"/Name": b"(a (/Type /X) \\) b)", b"/Type": b"/Sig"}),
+    (b"<< /Contents <2f54797065> % /Type /X\n /V 12 0 R /P 3 >>", {b"/Contents": b"<2f54797065>",
+                                                                   b"/V": b"12 0 R", b"/P": b"3"}),
+])
+def test_scan_dictionary(body, keys):
+    pdf = b"7 0 obj\n" + body + b"\nendobj\n"
+    entries, end = listing._scan_dictionary(pdf, 0, len(pdf))
+    assert {key: pdf[start:stop] for key, (start, stop) in entries.items()} == keys
+    assert pdf[:end].endswith(b">>")
+
+
+@pytest.mark.parametrize("body", [
+    b"<< /Type /Sig /Type /DocTimeStamp >>",
+    b"<< /Reason (sem fim >>",
+    b"<< /ByteRange [0 1 2 3] ",
+    b"[0 1 2 3]",
+])
+def test_scan_dictionary_rejects_ambiguous_or_broken(body):
+    pdf = b"7 0 obj\n" + body
+    assert listing._scan_dictionary(pdf, 0, len(pdf)) is None
@@ -0,0 +1,22 @@
+import os
+import sys
+import subprocess
+
+from benchmarks.fixtures import make_pdf
+
+
+def test_cli_does_not_write_server_metrics(signed_pdf, tmp_path):
+    # a CLI e o pool dela não podem gravar no diretório multiprocesso do servidor
+    metrics_dir = tmp_path / "metricas"
+    metrics_dir.mkdir()
+    (tmp_path / "acervo").mkdir()
+    (tmp_path / "acervo" / "assinado.pdf").write_bytes(signed_pdf)
+    (tmp_path / "acervo" / "sem_assinatura.pdf").write_bytes(make_pdf(pages=1, size_kb=8))
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(metrics_dir)}
+    result = subprocess.run(
+        [sys.executable, "-m", "app", "validar", str(tmp_path / "acervo"), "--workers", "1",
+         "--saida", str(tmp_path / "resultado.ndjson")],
+        env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert (tmp_path / "resultado.ndjson").read_text().count("\n") == 2, result.stderr
+    assert list(metrics_dir.iterdir()) == []
@@ -0,0 +1,64 @@
+import hashlib
+
+import pytest
+
+from app.utils import run_sync
+from app.validation import service
+from app.validation.originals import OriginalCache, OriginalStore
+from app.validation.service import registrar_original_logic, comparar_assinatura_logic, OriginalNotSigned
+
+from benchmarks.fixtures import make_pdf
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = OriginalCache(max_entries=10, ttl=60)
+    monkeypatch.setattr(service, "get_original_cache", lambda: cache)
+    return cache
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    store = OriginalStore(str(tmp_path), ttl=60, max_bytes=10 * 1024 * 1024)
+    monkeypatch.setattr(service, "get_original_store", lambda: store)
+    return store
+
+
+def test_registered_original_is_reused(signed_pdf, cache, store):
+    registered = registrar_original_logic(signed_pdf)
+    assert registered["original_id"] == hashlib.sha256(signed_pdf).hexdigest()
+    assert cache.stats() == {"hits": 0, "misses": 1, "entradas": 1}
+
+    with store.open(registered["original_id"]) as original:
+        result = comparar_assinatura_logic(original, signed_pdf, original_sha256=registered["original_id"])
+    assert result["original"] == registered["original"]
+    assert cache.stats()["hits"] == 1
+
+
+def test_failed_registration_keeps_existing_original(signed_pdf, cache, store, monkeypatch):
+    original_id = registrar_original_logic(signed_pdf)["original_id"]
+    cache.clear()
+
+    async def failing(*args):
+        raise RuntimeError("falha na validação")
+    monkeypatch.setattr(service, "_original_info_async", failing)
+    with pytest.raises(RuntimeError):
+        registrar_original_logic(signed_pdf)
+    store.open(original_id).close()
+
+
+def test_unsigned_original_is_not_stored(cache, store):
+    with pytest.raises(OriginalNotSigned):
+        registrar_original_logic(make_pdf(pages=1, size_kb=8))
+    assert store.stats() == {"registrados": 0, "bytes": 0}
+
+
+def test_partial_result_is_not_cached(signed_pdf, cache, monkeypatch):
+    # prazo esgotado antes da assinatura de referência: o resumo parcial não pode servir às próximas comparações
+    async def partial(*args):
+        return {"assinado": True, "avaliado": False}
+    monkeypatch.setattr(service, "_original_info_async", partial)
+    for _ in range(2):
+        info = run_sync(service.original_info_cached_async(None, signed_pdf, service.MODE_FULL))
+        assert info["avaliado"] is False
+    assert cache.stats() == {"hits": 0, "misses": 2, "entradas": 0}
@@ -0,0 +1,39 @@
+import json
+import base64
+
+import pytest
+
+from app import create_app, profiling
+from app.config import Config
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(Config, "PROFILING_ALLOWLIST", frozenset({"segredo"}))
+    monkeypatch.setattr(Config, "PROFILING_DIR", str(tmp_path))
+    return create_app().test_client()
+
+
+def _validar(client, signed_pdf):
+    return client.post("/validar-pades", json={"pdf_base64": base64.b64encode(signed_pdf).decode()},
+                       headers={"X-Perfilar": "segredo"})
+
+
+def test_profile_is_written(client, signed_pdf, monkeypatch, tmp_path):
+    monkeypatch.setattr(Config, "PROFILING_TOP_FUNCTIONS", 2)
+    response = _validar(client, signed_pdf)
+    assert response.status_code == 200
+    profile_id = response.headers["X-Perfil-Id"]
+    assert (tmp_path / f"{profile_id}.folded").exists()
+    summary = json.loads((tmp_path / f"{profile_id}.json").read_text())
+    assert 0 < len(summary["top_cpu"]) <= 2 and len(summary["top_alocacoes"]) > 2
+    assert not profiling._lock.locked()
+
+
+def test_failed_profile_start_releases_lock(client, signed_pdf, monkeypatch):
+    def failing(endpoint):
+        raise RuntimeError("thread não iniciou")
+    monkeypatch.setattr(profiling, "Profile", failing)
+    response = _validar(client, signed_pdf)
+    assert response.status_code == 200 and "X-Perfil-Id" not in response.headers
+    assert not profiling._lock.locked()
@@ -0,0 +1,39 @@
+import base64
+
+import pytest
+
+from app import create_app
+from app.signatures.store import MemorySessionStore, DiskSessionStore, SessionTooLarge, SessionNotFound
+
+from benchmarks.fixtures import make_pdf
+
+
+@pytest.fixture(params=["memory", "disk"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemorySessionStore(ttl=60, max_bytes=1000)
+    return DiskSessionStore(str(tmp_path), ttl=60, max_bytes=1000)
+
+
+def test_round_trip(store):
+    token = store.put(b"a" * 600, b"estado")
+    assert store.get(token) == (b"a" * 600, b"estado")
+    assert store.get_state(token) == b"estado"
+    store.delete(token)
+    with pytest.raises(SessionNotFound):
+        store.get(token)
+
+
+def test_document_larger_than_budget_is_rejected(store):
+    with pytest.raises(SessionTooLarge):
+        store.put(b"x" * 1001, b"")
+
+
+def test_route_answers_413_for_oversized_session():
+    app = create_app()
+    app.config.update(SESSION_STORE_BACKEND="memory", SESSION_STORE_MAX_BYTES=1000)
+    response = app.test_client().post("/preparar-pdf", json={
+        "pdf": base64.b64encode(make_pdf(pages=1, size_kb=8)).decode(), "sessao": True,
+    })
+    assert response.status_code == 413
+    assert "SESSION_STORE_MAX_BYTES" in response.get_json()["message"]
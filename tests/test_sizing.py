@@ -0,0 +1,123 @@
+import base64
+import asyncio
+import datetime
+
+import pytest
+from asn1crypto import keys, x509 as asn1_x509
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+from pyhanko.sign import signers, timestamps
+from pyhanko.sign.signers.pdf_byterange import PreparedByteRangeDigest
+
+from app import create_app
+from app.signatures.sizing import parse_certificates, InvalidCertificates, auto_bytes_reserved, check_p7s_fit
+
+from benchmarks.fixtures import make_pdf, sign_digest
+
+DIGEST = bytes(range(32))
+
+
+@pytest.fixture(scope="session")
+def signer_pem(signer) -> bytes:
+    return x509.load_der_x509_certificate(signer.signing_cert.dump()).public_bytes(serialization.Encoding.PEM)
+
+
+def test_accepted_formats(signer, signer_pem):
+    der = signer.signing_cert.dump()
+    for value in (signer_pem, signer_pem.decode(), [base64.b64encode(der).decode()],
+                  base64.b64encode(der).decode(), [base64.b64encode(signer_pem).decode()]):
+        certs = parse_certificates(value)
+        assert [c.dump() for c in certs] == [der]
+
+
+@pytest.mark.parametrize("value", ["abc", ["bm8gY2VydA=="]])
+def test_garbage_is_rejected(value):
+    with pytest.raises(InvalidCertificates):
+        parse_certificates(value)
+
+
+def test_truncated_der_is_rejected(signer):
+    with pytest.raises(InvalidCertificates):
+        parse_certificates([base64.b64encode(signer.signing_cert.dump()[:200]).decode()])
+
+
+def _chain(signer) -> list:
+    return [signer.signing_cert, *(c for c in signer.cert_registry if c.dump() != signer.signing_cert.dump())]
+
+
+def _sign(signer, timestamper=None, md_algo: str = "sha256", digest: bytes = DIGEST) -> bytes:
+    return asyncio.run(signer.async_sign(digest, md_algo, use_pades=True, timestamper=timestamper)).dump()
+
+
+@pytest.fixture(scope="session")
+def ed25519_signer():
+    key = ed25519.Ed25519PrivateKey.generate()
+    name = x509.Name([x509.NameAttribute(x509.NameOID.COMMON_NAME, "Assinante Ed25519")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+            .serial_number(x509.random_serial_number()).not_valid_before(now)
+            .not_valid_after(now + datetime.timedelta(days=1)).sign(key, None))
+    return signers.SimpleSigner(
+        signing_cert=asn1_x509.Certificate.load(cert.public_bytes(serialization.Encoding.DER)),
+        signing_key=keys.PrivateKeyInfo.load(key.private_bytes(
+            serialization.Encoding.DER, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )),
+        cert_registry=None,
+    )
+
+
+def test_estimate_fits_actual_cms(signer):
+    assert len(_sign(signer)) * 2 <= auto_bytes_reserved(_chain(signer), "sha256")
+
+
+def test_estimate_with_timestamp_fits_actual_cms(signer):
+    # a própria chave do assinante faz as vezes da TSA, com a cadeia embutida no carimbo
+    timestamper = timestamps.DummyTimeStamper(signer.signing_cert, signer.signing_key, signer.cert_registry)
+    p7s = _sign(signer, timestamper)
+    assert len(p7s) * 2 > auto_bytes_reserved(_chain(signer), "sha256")
+    assert len(p7s) * 2 <= auto_bytes_reserved(_chain(signer), "sha256", carimbo_tempo=True)
+
+
+def test_estimate_for_ed25519_key(ed25519_signer):
+    # Ed25519 implica SHA-512
+    p7s = _sign(ed25519_signer, md_algo="sha512", digest=bytes(64))
+    assert len(p7s) * 2 <= auto_bytes_reserved([ed25519_signer.signing_cert], "sha512")
+
+
+def _prepared(bytes_reserved: int, digest: bytes = DIGEST) -> PreparedByteRangeDigest:
+    # região reservada = hex do CMS + "<" e ">"
+    return PreparedByteRangeDigest(document_digest=digest, reserved_region_start=1000,
+                                   reserved_region_end=1000 + bytes_reserved + 2)
+
+
+def test_p7s_fit(signer):
+    p7s = _sign(signer)
+    fit = check_p7s_fit(_prepared(len(p7s) * 2), p7s)
+    assert fit["cabe"] and fit["folga_bytes"] == 0 and fit["cms_valido"] and fit["digest_confere"]
+
+    overflow = check_p7s_fit(_prepared(len(p7s) * 2 - 2), p7s)
+    assert not overflow["cabe"] and overflow["folga_bytes"] == -1
+
+    mismatch = check_p7s_fit(_prepared(len(p7s) * 2, hashes.Hash(hashes.SHA256()).finalize()), p7s)
+    assert mismatch["cabe"] and mismatch["digest_confere"] is False
+
+
+@pytest.mark.parametrize("case", ["cabe", "estouro", "digest"])
+def test_verify_route(signer, signer_pem, case):
+    client = create_app().test_client()
+    params = {"pdf": base64.b64encode(make_pdf(pages=1, size_kb=8)).decode()}
+    if case == "estouro":
+        params["bytes_reserved"] = 1024
+    else:
+        params["certificados_b64"] = [base64.b64encode(c.dump()).decode() for c in _chain(signer)]
+    prepared = client.post("/preparar-pdf", json=params).get_json()
+    digest = base64.b64decode(prepared["digest_b64"])
+    p7s = sign_digest(signer, digest if case != "digest" else bytes(len(digest)))
+    response = client.post("/finalizar-assinatura/verificar", json={
+        "p7s_b64": base64.b64encode(p7s).decode(), "prepared_digest_b64": prepared["prepared_digest_b64"],
+    })
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result["cabe"] is (case != "estouro")
+    assert result["digest_confere"] is (case != "digest")
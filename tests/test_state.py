@@ -0,0 +1,96 @@
+import pytest
+from pyhanko.sign.signers.pdf_byterange import PreparedByteRangeDigest
+
+from app.config import Config
+from app.signatures import state
+from app.signatures.state import InvalidPreparedState, encode_prepared_state, decode_prepared_state
+
+PREPARED = PreparedByteRangeDigest(document_digest=bytes(range(32)), reserved_region_start=1234, reserved_region_end=9876)
+
+
+def test_round_trip():
+    prepared, post_sign_instr = decode_prepared_state(encode_prepared_state(PREPARED))
+    assert post_sign_instr is None
+    assert (prepared.document_digest, prepared.reserved_region_start, prepared.reserved_region_end) == \
+        (PREPARED.document_digest, PREPARED.reserved_region_start, PREPARED.reserved_region_end)
+
+
+@pytest.mark.parametrize("position", [0, 2, 6, 14, 22, 40, -1])
+def test_tampered_byte_is_rejected(position):
+    blob = bytearray(encode_prepared_state(PREPARED))
+    blob[position] ^= 0x01
+    with pytest.raises(InvalidPreparedState, match="adulterado"):
+        decode_prepared_state(bytes(blob))
+
+
+def test_truncated_is_rejected():
+    with pytest.raises(InvalidPreparedState, match="truncado"):
+        decode_prepared_state(encode_prepared_state(PREPARED)[:20])
+
+
+def test_other_key_is_rejected(monkeypatch):
+    blob = encode_prepared_state(PREPARED)
+    monkeypatch.setattr(state, "_key", b"k" * 32)
+    with pytest.raises(InvalidPreparedState, match="adulterado"):
+        decode_prepared_state(blob)
+
+
+def test_expired_is_rejected(monkeypatch):
+    blob = encode_prepared_state(PREPARED)
+    monkeypatch.setattr(Config, "PREPARED_STATE_MAX_AGE", 60)
+    monkeypatch.setattr(state.time, "time", lambda: state._HEADER.unpack_from(blob)[2] + 61)
+    with pytest.raises(InvalidPreparedState, match="expirado"):
+        decode_prepared_state(blob)
+
+
+def test_unknown_version_is_rejected():
+    # versão trocada com um HMAC válido: recusada pela versão, não pela assinatura
+    body = encode_prepared_state(PREPARED)[:-state._MAC_SIZE]
+    body = bytes([state.FORMAT_VERSION + 1]) + body[1:]
+    with pytest.raises(InvalidPreparedState, match="versão"):
+        decode_prepared_state(body + state._mac(body))
+
+
+def test_post_sign_instructions_are_refused():
+    with pytest.raises(ValueError):
+        encode_prepared_state(PREPARED, post_sign_instr=object())
+
+
+def test_missing_key_fails_fast_when_required(monkeypatch):
+    monkeypatch.setattr(Config, "PREPARED_STATE_KEY", "")
+    monkeypatch.setattr(Config, "PREPARED_STATE_KEY_REQUIRED", True)
+    with pytest.raises(RuntimeError, match="PREPARED_STATE_KEY"):
+        state.check_key_config()
+
+
+def test_missing_key_warns(monkeypatch, caplog):
+    monkeypatch.setattr(Config, "PREPARED_STATE_KEY", "")
+    monkeypatch.setattr(Config, "PREPARED_STATE_KEY_REQUIRED", False)
+    state.check_key_config()
+    assert "PREPARED_STATE_KEY não configurada" in caplog.text
+
+
+@pytest.fixture
+def key_file(monkeypatch, tmp_path):
+    path = tmp_path / "estado" / "hmac.key"
+    monkeypatch.setattr(Config, "PREPARED_STATE_KEY", "")
+    monkeypatch.setattr(Config, "PREPARED_STATE_KEY_FILE", str(path))
+    monkeypatch.setattr(state, "_key", None)
+    return path
+
+
+def test_generated_key_is_shared(key_file, monkeypatch):
+    key = state._load_key()
+    assert len(key) == 32 and key_file.read_bytes() == key
+    assert [p.name for p in key_file.parent.iterdir()] == ["hmac.key"]
+    # outro worker encontra o arquivo já publicado
+    monkeypatch.setattr(state, "_key", None)
+    assert state._load_key() == key
+
+
+def test_partial_key_file_is_refused(key_file):
+    key_file.parent.mkdir()
+    key_file.write_bytes(b"k" * 10)
+    with pytest.raises(RuntimeError, match="32 bytes"):
+        state._load_key()
+    assert state._key is None
@@ -0,0 +1,128 @@
+import os
+import datetime
+
+import pytest
+from asn1crypto import x509 as asn1_x509, keys as asn1_keys
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from pyhanko.sign import signers
+from pyhanko.sign.validation import generic_cms
+from pyhanko_certvalidator.registry import SimpleCertificateStore
+
+from app.validation import service, trust
+from app.validation.service import validar_pdf_logic, MODE_INTEGRITY
+
+from benchmarks.fixtures import make_pdf
+from .conftest import sign
+
+NOW = datetime.datetime.now(datetime.timezone.utc)
+
+
+def _issue(cn: str, key, issuer_cn: str, issuer_key, ca: bool):
+    name = lambda value: x509.Name([x509.NameAttribute(x509.NameOID.COMMON_NAME, value)])
+    usage = (False, False, False, False, False, True, True, False, False) if ca else \
+        (True, True, False, False, False, False, False, False, False)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name(cn)).issuer_name(name(issuer_cn))
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(NOW - datetime.timedelta(days=1))
+        .not_valid_after(NOW + datetime.timedelta(days=30))
+        .add_extension(x509.BasicConstraints(ca=ca, path_length=None), critical=True)
+        .add_extension(x509.KeyUsage(*usage), critical=True)
+        .add_extension(x509.SubjectKeyIdentifier.from_public_key(key.public_key()), critical=False)
+        .add_extension(x509.AuthorityKeyIdentifier.from_issuer_public_key(issuer_key.public_key()), critical=False)
+        .sign(issuer_key, hashes.SHA256())
+    )
+    return asn1_x509.Certificate.load(cert.public_bytes(serialization.Encoding.DER))
+
+
+def _signer(cert, key, chain) -> signers.SimpleSigner:
+    return signers.SimpleSigner(
+        signing_cert=cert,
+        signing_key=asn1_keys.PrivateKeyInfo.load(key.private_bytes(
+            serialization.Encoding.DER, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )),
+        cert_registry=SimpleCertificateStore.from_certs(chain),
+    )
+
+
+@pytest.fixture(scope="module")
+def chain(tmp_path_factory):
+    """Raiz no trust store -> intermediária só no CMS -> dois assinantes."""
+    keys = {name: rsa.generate_private_key(public_exponent=65537, key_size=2048)
+            for name in ("raiz", "intermediaria", "a", "b")}
+    root = _issue("Raiz Teste", keys["raiz"], "Raiz Teste", keys["raiz"], ca=True)
+    intermediate = _issue("Intermediaria Teste", keys["intermediaria"], "Raiz Teste", keys["raiz"], ca=True)
+    cert_a = _issue("Assinante A", keys["a"], "Intermediaria Teste", keys["intermediaria"], ca=False)
+    cert_b = _issue("Assinante B", keys["b"], "Intermediaria Teste", keys["intermediaria"], ca=False)
+
+    directory = tmp_path_factory.mktemp("trust")
+    os.makedirs(directory / trust.ROOTS_DIR)
+    (directory / trust.ROOTS_DIR / "raiz.der").write_bytes(root.dump())
+    pdf = make_pdf(pages=1, size_kb=8)
+    return {
+        "dir": str(directory),
+        # A traz a intermediária no CMS; B não traz, então sozinho não tem caminho até a raiz
+        "com_intermediaria": sign(pdf, _signer(cert_a, keys["a"], [intermediate]), "Assinatura1"),
+        "sem_intermediaria": sign(pdf, _signer(cert_b, keys["b"], []), "Assinatura1"),
+    }
+
+
+@pytest.fixture
+def manager(chain, monkeypatch):
+    manager = trust.TrustStoreManager(chain["dir"], reload_interval=3600, time_bucket=3600, max_entries=100)
+    monkeypatch.setattr(trust, "_manager", manager)
+    monkeypatch.setattr(service, "get_validation_cache", lambda: None)
+    return manager
+
+
+def _trusted(pdf: bytes) -> bool:
+    # `valido` é só a criptografia; a confiança no caminho sai no resumo (TRUSTED/UNTRUSTED)
+    [result] = validar_pdf_logic(pdf)["validacoes"]
+    return "TRUSTED" in result["resumo_validacao"].split(":")[1].split(",")
+
+
+def test_patch_site_matches_installed_pyhanko():
+    trust.check_patch_site()
+    assert generic_cms.validate_cert_usage is trust._validate_cert_usage_cached
+
+
+def test_unsupported_pyhanko_fails_only_full_validation(chain, manager, monkeypatch):
+    monkeypatch.setattr(trust, "_PATCH_ERROR", "pyhanko não suportado")
+    with pytest.raises(RuntimeError, match="não suportado"):
+        validar_pdf_logic(chain["com_intermediaria"])
+    [result] = validar_pdf_logic(chain["com_intermediaria"], MODE_INTEGRITY)["validacoes"]
+    assert result["intacto"] is True
+
+
+def test_document_certificates_do_not_leak_into_shared_context(chain, manager):
+    assert _trusted(chain["com_intermediaria"]) is True
+    # a intermediária do documento anterior não fica no registro compartilhado
+    assert _trusted(chain["sem_intermediaria"]) is False
+    registry = manager.validation_context().certificate_registry
+    assert [c.subject.native["common_name"] for c in registry] == ["Raiz Teste"]
+
+
+def test_path_cache_is_keyed_by_document_certificates(chain, manager):
+    assert _trusted(chain["sem_intermediaria"]) is False
+    assert _trusted(chain["com_intermediaria"]) is True
+    assert _trusted(chain["sem_intermediaria"]) is False
+    assert _trusted(chain["com_intermediaria"]) is True
+    assert manager.path_cache.hits == 2
+
+
+def test_registry_overlay_is_scoped(chain, manager):
+    registry = manager.validation_context().certificate_registry
+    root = next(iter(registry))
+    other = asn1_x509.Certificate.load(root.dump())
+    with trust.document_certificates():
+        assert registry.register(other) is False  # já está na base
+    extra = _issue("Outro", rsa.generate_private_key(public_exponent=65537, key_size=2048), "Raiz Teste",
+                   rsa.generate_private_key(public_exponent=65537, key_size=2048), ca=True)
+    with trust.document_certificates():
+        assert registry.register(extra) is True
+        assert registry.retrieve_by_name(extra.subject) == [extra]
+    assert registry.retrieve_by_name(extra.subject) == []
@@ -0,0 +1,55 @@
+import pytest
+
+from app.validation import service
+from app.validation.trust import get_trust_store_manager
+from app.validation.cache import ValidationCache
+
+
+@pytest.fixture
+def fresh_cache(tmp_path, monkeypatch):
+    cache = ValidationCache(str(tmp_path / "validacao.sqlite3"), ttl=3600, max_entries=100)
+    monkeypatch.setattr(service, "get_validation_cache", lambda: cache)
+    return cache
+
+
+def _summary(pdf: bytes) -> str:
+    return service.validar_pdf_logic(pdf)["validacoes"][0]["resumo_validacao"]
+
+
+def test_uncached_summary(signed_pdf, tampered_pdf, monkeypatch):
+    monkeypatch.setattr(service, "get_validation_cache", lambda: None)
+    assert _summary(signed_pdf).endswith(",UNTOUCHED")
+    assert _summary(tampered_pdf).endswith(",EXTENDED,ILLEGAL_MODIFICATIONS")
+
+
+@pytest.mark.parametrize("first, second", [("signed_pdf", "tampered_pdf"), ("tampered_pdf", "signed_pdf")])
+def test_cache_does_not_carry_coverage_between_documents(first, second, fresh_cache, request):
+    # a mesma assinatura em outro arquivo (revisão incremental adulterada) não pode herdar a cobertura do cache
+    expected = {}
+    for name in (first, second):
+        expected[name] = _summary(request.getfixturevalue(name))
+        fresh_cache.invalidate()
+
+    assert _summary(request.getfixturevalue(first)) == expected[first]
+    assert _summary(request.getfixturevalue(second)) == expected[second]
+    assert fresh_cache.stats()["hits"] >= 1
+
+
+def test_cached_result_matches_uncached(signed_pdf, fresh_cache):
+    first = service.validar_pdf_logic(signed_pdf)
+    second = service.validar_pdf_logic(signed_pdf)
+    assert fresh_cache.stats()["hits"] == 1
+    assert first == second
+
+
+def test_cache_is_scoped_to_trust_time_bucket(signed_pdf, fresh_cache, monkeypatch):
+    # revogação avaliada num intervalo de TRUST_TIME_BUCKET não é reaproveitada no seguinte
+    manager = get_trust_store_manager()
+    bucket = manager.current_bucket()
+    monkeypatch.setattr(manager, "current_bucket", lambda: bucket)
+    service.validar_pdf_logic(signed_pdf)
+    service.validar_pdf_logic(signed_pdf)
+    assert fresh_cache.stats()["hits"] == 1
+    monkeypatch.setattr(manager, "current_bucket", lambda: bucket + 1)
+    service.validar_pdf_logic(signed_pdf)
+    assert fresh_cache.stats() == {"hits": 1, "misses": 2, "entradas": 2}